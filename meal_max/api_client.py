@@ -1,17 +1,480 @@
-import requests
+import json
+import logging
 import os
+import random
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError, wait
+from typing import Dict, List, Optional
+
+import redis
+import requests
+from requests.adapters import HTTPAdapter
+
+from meal_max.utils.food_table import FoodTable, load_food_table
+from meal_max.utils.logger import configure_logger
+
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+
+NUTRITION_CACHE_TTL = int(os.environ.get('NUTRITION_CACHE_TTL', 24 * 60 * 60))
+NUTRITION_NEGATIVE_CACHE_TTL = int(os.environ.get('NUTRITION_NEGATIVE_CACHE_TTL', 10 * 60))
+NUTRITION_LOCAL_CACHE_TTL = int(os.environ.get('NUTRITION_LOCAL_CACHE_TTL', 5 * 60))
+NUTRITION_LOCAL_CACHE_SIZE = int(os.environ.get('NUTRITION_LOCAL_CACHE_SIZE', 1024))
+
+CALORIE_NINJAS_API_URL = os.environ.get('CALORIE_NINJAS_API_URL', 'https://api.calorieninjas.com/v1')
+CALORIE_NINJAS_POOL_SIZE = int(os.environ.get('CALORIE_NINJAS_POOL_SIZE', 10))
+CALORIE_NINJAS_CONNECT_TIMEOUT = float(os.environ.get('CALORIE_NINJAS_CONNECT_TIMEOUT', 3.05))
+CALORIE_NINJAS_READ_TIMEOUT = float(os.environ.get('CALORIE_NINJAS_READ_TIMEOUT', 5))
+CALORIE_NINJAS_MAX_RETRIES = int(os.environ.get('CALORIE_NINJAS_MAX_RETRIES', 2))
+CALORIE_NINJAS_BACKOFF = float(os.environ.get('CALORIE_NINJAS_BACKOFF', 0.25))
+CALORIE_NINJAS_BREAKER_THRESHOLD = int(os.environ.get('CALORIE_NINJAS_BREAKER_THRESHOLD', 5))
+CALORIE_NINJAS_BREAKER_RESET = float(os.environ.get('CALORIE_NINJAS_BREAKER_RESET', 30))
+
+NUTRITION_BATCH_QUERY_CHARS = int(os.environ.get('NUTRITION_BATCH_QUERY_CHARS', 1000))
+NUTRITION_LOCK_TTL = float(os.environ.get('NUTRITION_LOCK_TTL', 10))
+NUTRITION_LOCK_POLL_INTERVAL = float(os.environ.get('NUTRITION_LOCK_POLL_INTERVAL', 0.05))
+NUTRITION_FANOUT_WORKERS = int(os.environ.get('NUTRITION_FANOUT_WORKERS', 8))
+NUTRITION_FANOUT_DEADLINE = float(os.environ.get('NUTRITION_FANOUT_DEADLINE', 10))
+
+RETRYABLE_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+DEADLINE_EXCEEDED = {"error": 504, "message": "Nutrition lookup exceeded its deadline"}
+
+
+def normalize_query(query: str) -> str:
+    """
+    Normalizes a food query so equivalent spellings share a cache entry.
+
+    Args:
+        query (str): The raw food or ingredient query string.
+
+    Returns:
+        str: The query lowercased with surrounding and repeated whitespace removed.
+    """
+    return ' '.join(query.lower().split())
+
+
+class NutritionCache:
+    """
+    Two-tier cache for CalorieNinjas responses.
+
+    A bounded per-process LRU answers repeat lookups without leaving the worker,
+    and a shared Redis tier lets every worker reuse responses fetched by the others.
+    Entries expire on their own TTLs in both tiers; empty and 404 responses are
+    stored under the shorter negative TTL so unknown foods do not hammer upstream.
+
+    Attributes:
+        hits (int): Lookups answered by either tier.
+        local_hits (int): Lookups answered by the in-process LRU.
+        redis_hits (int): Lookups answered by Redis.
+        misses (int): Lookups that neither tier could answer.
+    """
+
+    def __init__(self, redis_client=None, ttl: int = NUTRITION_CACHE_TTL,
+                 negative_ttl: int = NUTRITION_NEGATIVE_CACHE_TTL,
+                 local_ttl: int = NUTRITION_LOCAL_CACHE_TTL,
+                 max_entries: int = NUTRITION_LOCAL_CACHE_SIZE,
+                 key_prefix: str = 'nutrition:'):
+        """
+        Initializes the cache.
+
+        Args:
+            redis_client (redis.Redis, optional): Shared Redis tier. When omitted only
+                                                  the in-process LRU is used.
+            ttl (int): Seconds a positive response lives in Redis.
+            negative_ttl (int): Seconds an empty or 404 response lives in either tier.
+            local_ttl (int): Seconds a positive response lives in the in-process LRU.
+            max_entries (int): Maximum number of entries held by the in-process LRU.
+            key_prefix (str): Prefix for Redis keys.
+        """
+        self.redis_client = redis_client
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.local_ttl = local_ttl
+        self.max_entries = max_entries
+        self.key_prefix = key_prefix
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+        self.local_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+
+    @property
+    def hits(self) -> int:
+        return self.local_hits + self.redis_hits
+
+    def get(self, key: str) -> Optional[dict]:
+        """
+        Looks up a normalized query in the local tier, then in Redis.
+
+        Args:
+            key (str): The normalized query.
+
+        Returns:
+            dict: The cached response, or None on a miss.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._local.move_to_end(key)
+                    self.local_hits += 1
+                    return value
+                del self._local[key]
+
+        raw = self._redis_get(key)
+        if raw is not None:
+            value = json.loads(raw)
+            self._store_local(key, value, self._ttl_for(value, self.local_ttl))
+            with self._lock:
+                self.redis_hits += 1
+            return value
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key: str, value: dict) -> None:
+        """
+        Stores a response in both tiers.
+
+        Args:
+            key (str): The normalized query.
+            value (dict): The parsed response to cache.
+        """
+        self._store_local(key, value, self._ttl_for(value, self.local_ttl))
+        if self.redis_client is None:
+            return
+        try:
+            self.redis_client.setex(self.key_prefix + key, self._ttl_for(value, self.ttl), json.dumps(value))
+        except redis.RedisError as e:
+            logger.warning("Failed to write nutrition cache entry for '%s' to Redis: %s", key, e)
+
+    def get_shared(self, key: str) -> Optional[dict]:
+        """
+        Reads a normalized query from the Redis tier only, without touching the counters.
+
+        Used while waiting on another process that holds the fetch lock for `key`.
+
+        Args:
+            key (str): The normalized query.
+
+        Returns:
+            dict: The cached response, or None if Redis does not have it (yet).
+        """
+        raw = self._redis_get(key)
+        if raw is None:
+            return None
+        value = json.loads(raw)
+        self._store_local(key, value, self._ttl_for(value, self.local_ttl))
+        return value
+
+    def iter_items(self, scan_count: int = 1000):
+        """
+        Yields every food item held in positive cache entries of either tier.
+
+        Items may repeat when they are cached under several queries or in both tiers.
+        Redis is walked with SCAN, so this never blocks the shared server, and each
+        SCAN batch of keys is read back with one MGET.
+
+        Args:
+            scan_count (int): SCAN and MGET batch size for the Redis tier.
+
+        Yields:
+            dict: CalorieNinjas items.
+        """
+        with self._lock:
+            values = [value for _, value in self._local.values()]
+        for value in values:
+            yield from value.get("items", [])
+
+        if self.redis_client is None:
+            return
+        lock_prefix = f"{self.key_prefix}lock:".encode()
+        try:
+            cursor = 0
+            while True:
+                cursor, redis_keys = self.redis_client.scan(cursor, match=f"{self.key_prefix}*", count=scan_count)
+                redis_keys = [redis_key for redis_key in redis_keys if not redis_key.startswith(lock_prefix)]
+                for raw in self.redis_client.mget(redis_keys) if redis_keys else []:
+                    if raw is not None:
+                        yield from json.loads(raw).get("items", [])
+                if not cursor:
+                    break
+        except redis.RedisError as e:
+            logger.warning("Failed to scan nutrition cache in Redis: %s", e)
+
+    def clear(self) -> None:
+        """Drops every entry from the in-process tier and resets the counters."""
+        with self._lock:
+            self._local.clear()
+            self.local_hits = 0
+            self.redis_hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        """
+        Reports the cache counters.
+
+        Returns:
+            dict: Hit/miss counts and the current size of the in-process tier.
+        """
+        with self._lock:
+            return {
+                "hits": self.local_hits + self.redis_hits,
+                "local_hits": self.local_hits,
+                "redis_hits": self.redis_hits,
+                "misses": self.misses,
+                "local_size": len(self._local),
+            }
+
+    @staticmethod
+    def is_negative(value: dict) -> bool:
+        """Returns True for responses that mean "no such food" (404 or no items)."""
+        return value.get("error") == 404 or value.get("items") == []
+
+    def _ttl_for(self, value: dict, positive_ttl: int) -> int:
+        return min(self.negative_ttl, positive_ttl) if self.is_negative(value) else positive_ttl
+
+    def _store_local(self, key: str, value: dict, ttl: int) -> None:
+        with self._lock:
+            self._local[key] = (time.monotonic() + ttl, value)
+            self._local.move_to_end(key)
+            while len(self._local) > self.max_entries:
+                self._local.popitem(last=False)
+
+    def _redis_get(self, key: str) -> Optional[bytes]:
+        if self.redis_client is None:
+            return None
+        try:
+            return self.redis_client.get(self.key_prefix + key)
+        except redis.RedisError as e:
+            logger.warning("Failed to read nutrition cache entry for '%s' from Redis: %s", key, e)
+            return None
+
+
+class CircuitBreaker:
+    """
+    Fails fast once the upstream has failed too many times in a row.
+
+    The breaker starts closed. After `failure_threshold` consecutive failures it
+    opens and rejects calls for `reset_timeout` seconds, then lets a single trial
+    call through (half-open). A success closes it again; a failure re-opens it.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = CALORIE_NINJAS_BREAKER_THRESHOLD,
+                 reset_timeout: float = CALORIE_NINJAS_BREAKER_RESET):
+        """
+        Initializes the breaker in the closed state.
+
+        Args:
+            failure_threshold (int): Consecutive failures that open the breaker.
+            reset_timeout (float): Seconds to stay open before allowing a trial call.
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state()
+
+    def allow_request(self) -> bool:
+        """
+        Decides whether a call may go upstream.
+
+        Returns:
+            bool: False while the breaker is open or a half-open trial is already running.
+        """
+        with self._lock:
+            state = self._state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        """Closes the breaker and resets the failure count."""
+        with self._lock:
+            self.failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def release(self) -> None:
+        """Gives back a half-open trial slot without counting a success or a failure."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        """Counts a failure, opening the breaker once the threshold is reached."""
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    logger.error("CalorieNinjas circuit opened after %d consecutive failures", self.failures)
+                self._opened_at = time.monotonic()
+
+    def _state(self) -> str:
+        if self._opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls for the same key into a single call.
+
+    The first caller for a key (the leader) runs the function; callers that arrive
+    while it is in flight wait on the leader's future and share its result.
+
+    Attributes:
+        calls (int): Calls that actually ran the function.
+        shared (int): Calls that were answered by another caller's in-flight result.
+    """
+
+    def __init__(self, timeout: Optional[float] = None):
+        """
+        Initializes an empty in-flight table.
+
+        Args:
+            timeout (float, optional): Seconds a waiting caller blocks on the leader
+                                       before giving up with a TimeoutError.
+        """
+        self.timeout = timeout
+        self.calls = 0
+        self.shared = 0
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, fn, timeout: Optional[float] = None):
+        """
+        Runs `fn()` once per key among concurrent callers.
+
+        Args:
+            key (str): Identifies calls that may share a result.
+            fn (callable): The zero-argument function producing the result.
+            timeout (float, optional): Overrides the waiting timeout for this call.
+
+        Returns:
+            The result of the leader's call to `fn`.
+
+        Raises:
+            TimeoutError: If a waiting caller gives up on the leader.
+            Exception: Whatever the leader's call to `fn` raised.
+        """
+        with self._lock:
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._in_flight[key] = future
+                self.calls += 1
+            else:
+                self.shared += 1
+
+        if not leader:
+            return future.result(timeout=self.timeout if timeout is None else timeout)
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+
 
 class CalorieNinjasAPIClient:
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, cache: Optional[NutritionCache] = None,
+                 pool_size: int = CALORIE_NINJAS_POOL_SIZE,
+                 connect_timeout: float = CALORIE_NINJAS_CONNECT_TIMEOUT,
+                 read_timeout: float = CALORIE_NINJAS_READ_TIMEOUT,
+                 max_retries: int = CALORIE_NINJAS_MAX_RETRIES,
+                 backoff: float = CALORIE_NINJAS_BACKOFF,
+                 circuit_breaker: Optional[CircuitBreaker] = None,
+                 max_workers: int = NUTRITION_FANOUT_WORKERS,
+                 deadline: float = NUTRITION_FANOUT_DEADLINE,
+                 api_url: str = CALORIE_NINJAS_API_URL,
+                 local_foods: Optional[FoodTable] = None):
         """
         Initializes the API client with the given API key.
+
+        Args:
+            api_key (str): The CalorieNinjas API key.
+            cache (NutritionCache, optional): Response cache. Defaults to a cache backed
+                                              by the shared Redis client.
+            pool_size (int): Keep-alive connections held open to the upstream.
+            connect_timeout (float): Seconds to wait for a TCP/TLS connection.
+            read_timeout (float): Seconds to wait for the upstream to respond.
+            max_retries (int): Retries after the first attempt for transient failures.
+            backoff (float): Base delay in seconds for jittered exponential backoff.
+            circuit_breaker (CircuitBreaker, optional): Breaker guarding the upstream.
+            max_workers (int): Upper bound on concurrent upstream calls for multi-food lookups.
+            deadline (float): Seconds a multi-food lookup may take in total; upstream
+                              calls made for it are cut short once it has passed.
+            api_url (str): Base URL of the CalorieNinjas API.
+            local_foods (FoodTable, optional): Offline food table consulted before the
+                                               cache and upstream. Defaults to the
+                                               bundled table, if one is available.
         """
-        self.api_url = 'https://api.calorieninjas.com/v1'
+        self.api_url = api_url
         self.headers = {'X-Api-Key': api_key}
+        if cache is None:
+            from meal_max.clients.redis_client import redis_client
+            cache = NutritionCache(redis_client=redis_client)
+        self.cache = cache
+        self.local_foods = local_foods if local_foods is not None else load_food_table()
+        self.local_food_hits = 0
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.circuit_breaker = circuit_breaker or CircuitBreaker()
+        self.max_workers = max_workers
+        self.deadline = deadline
+        self.single_flight = SingleFlight(timeout=deadline)
+        self.lock_ttl = NUTRITION_LOCK_TTL
+        self.lock_waits = 0
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self._call_deadline = threading.local()
+
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(pool_size, max_workers))
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
 
     def get_nutrition(self, query: str):
         """
-        Makes a GET request to fetch nutritional information for a given query.
+        Fetches nutritional information for a given query, consulting the local food
+        table and then the cache first.
+
+        Successful responses are cached under the normalized query. Empty and 404
+        responses are cached for a shorter time; other errors are never cached.
 
         Args:
             query (str): The food or ingredient query string.
@@ -19,9 +482,391 @@ class CalorieNinjasAPIClient:
         Returns:
             dict: JSON response with nutritional data or error information.
         """
-        url = f"{self.api_url}/nutrition?query={query}"
-        response = requests.get(url, headers=self.headers)
-        return self._handle_response(response)
+        key = normalize_query(query)
+        local = self._lookup_local(key)
+        if local is not None:
+            return local
+
+        cached = self.cache.get(key)
+        if cached is not None:
+            logger.debug("Nutrition cache hit for '%s'", key)
+            return cached
+
+        return self._fetch_coalesced(key)
+
+    def get_nutrition_batch(self, queries: List[str]) -> Dict[str, dict]:
+        """
+        Fetches nutritional information for many foods with as few upstream calls as possible.
+
+        Queries are normalized and de-duplicated, foods in the local table and cached
+        entries are served directly, and the misses are packed into comma-separated
+        multi-item queries of at most NUTRITION_BATCH_QUERY_CHARS characters. The items of each packed response are
+        split back per food by name; if any item cannot be matched unambiguously, every
+        food of that pack is looked up on its own and the pack's split is not cached.
+        Both rounds share one deadline of `self.deadline` seconds; foods not resolved
+        by then are reported as 504 errors.
+
+        Args:
+            queries (List[str]): Food or ingredient query strings.
+
+        Returns:
+            Dict[str, dict]: Responses keyed by normalized query, in first-seen order.
+        """
+        order = []
+        seen = set()
+        results = {}
+        misses = []
+        for query in queries:
+            key = normalize_query(query)
+            if key in seen:
+                continue
+            seen.add(key)
+            order.append(key)
+            cached = self._lookup_local(key)
+            if cached is None:
+                cached = self.cache.get(key)
+            if cached is not None:
+                results[key] = cached
+            else:
+                misses.append(key)
+
+        deadline_at = time.monotonic() + self.deadline
+        unmatched = []
+        chunks = self._pack_queries(misses)
+        chunk_results_list = self._run_concurrently(
+            self._resolve_chunk, chunks, deadline_at,
+            on_timeout=lambda chunk: {key: dict(DEADLINE_EXCEEDED) for key in chunk}
+        )
+        for chunk_results in chunk_results_list:
+            for key, data in chunk_results.items():
+                if data is None:
+                    logger.debug("No unambiguous match for '%s' in packed query; looking it up alone", key)
+                    unmatched.append(key)
+                else:
+                    results[key] = data
+
+        results.update(zip(unmatched, self._run_concurrently(self._fetch_coalesced, unmatched, deadline_at)))
+        return {key: results[key] for key in order}
+
+    def get_nutrition_many(self, queries: List[str], deadline: Optional[float] = None) -> Dict[str, dict]:
+        """
+        Fetches nutritional information for several foods concurrently.
+
+        Each distinct query goes through get_nutrition on a bounded thread pool, so the
+        call takes about as long as the slowest lookup rather than the sum of them.
+        Lookups that have not finished by the deadline are reported as 504 errors.
+
+        Args:
+            queries (List[str]): Food or ingredient query strings.
+            deadline (float, optional): Seconds to wait for the lookups. Defaults to
+                                        the client's deadline.
+
+        Returns:
+            Dict[str, dict]: Responses keyed by normalized query, in first-seen order.
+        """
+        keys = list(dict.fromkeys(normalize_query(query) for query in queries))
+        deadline_at = time.monotonic() + (self.deadline if deadline is None else deadline)
+        return dict(zip(keys, self._run_concurrently(self.get_nutrition, keys, deadline_at)))
+
+    def _resolve_chunk(self, chunk: List[str]) -> Dict[str, Optional[dict]]:
+        """
+        Resolves one packed chunk of cache misses with a single upstream call.
+
+        Returns:
+            Dict[str, Optional[dict]]: Responses keyed by query; None for every query
+                                       when the packed response cannot be split.
+        """
+        if len(chunk) == 1:
+            return {chunk[0]: self._fetch_coalesced(chunk[0])}
+
+        data = self._request_nutrition(', '.join(chunk))
+        if "items" not in data:
+            return {key: data for key in chunk}
+
+        split = self._split_items(chunk, data["items"])
+        if split is None:
+            return {key: None for key in chunk}
+        results = {}
+        for key, items in split.items():
+            results[key] = {"items": items}
+            self.cache.set(key, results[key])
+        return results
+
+    def _run_concurrently(self, fn, args: list, deadline_at: Optional[float] = None, on_timeout=None) -> list:
+        """
+        Applies `fn` to each argument on the client's thread pool.
+
+        A single argument runs inline on the calling thread. Every call runs under
+        `deadline_at` (a time.monotonic() value, defaulting to `self.deadline` from
+        now), which bounds the upstream calls it makes; calls still running at the
+        deadline are not waited for and are reported as `on_timeout(arg)`, which
+        defaults to a 504 error dict.
+
+        Returns:
+            list: One result per argument, in argument order.
+        """
+        if deadline_at is None:
+            deadline_at = time.monotonic() + self.deadline
+        if len(args) <= 1:
+            return [self._call_with_deadline(deadline_at, fn, arg) for arg in args]
+
+        remaining = deadline_at - time.monotonic()
+        if remaining <= 0:
+            return [on_timeout(arg) if on_timeout else dict(DEADLINE_EXCEEDED) for arg in args]
+
+        executor = self._get_executor()
+        futures = [executor.submit(self._call_with_deadline, deadline_at, fn, arg) for arg in args]
+        _, not_done = wait(futures, timeout=remaining)
+
+        results = []
+        for arg, future in zip(args, futures):
+            if future in not_done:
+                logger.warning("Nutrition lookup for '%s' exceeded its deadline", arg)
+                results.append(on_timeout(arg) if on_timeout else dict(DEADLINE_EXCEEDED))
+            else:
+                results.append(future.result())
+        return results
+
+    def _call_with_deadline(self, deadline_at: float, fn, arg):
+        """Runs `fn(arg)` with `deadline_at` bounding the upstream calls of this thread."""
+        previous = getattr(self._call_deadline, 'at', None)
+        self._call_deadline.at = deadline_at
+        try:
+            return fn(arg)
+        finally:
+            self._call_deadline.at = previous
+
+    def _remaining(self) -> Optional[float]:
+        """Seconds left before this thread's deadline, or None when it has none."""
+        deadline_at = getattr(self._call_deadline, 'at', None)
+        if deadline_at is None:
+            return None
+        return deadline_at - time.monotonic()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix='nutrition-fanout')
+            return self._executor
+
+    def _lookup_local(self, key: str) -> Optional[dict]:
+        """Answers a normalized query from the local food table, if it lists the food."""
+        if self.local_foods is None:
+            return None
+        item = self.local_foods.lookup(key)
+        if item is None:
+            return None
+        self.local_food_hits += 1
+        return {"items": [item]}
+
+    def _fetch_coalesced(self, key: str) -> dict:
+        """
+        Fetches a cache miss so that a stampede costs one upstream call instead of N.
+
+        Within the process, concurrent callers share one in-flight future. Across
+        processes, the leader takes a short Redis lock; other processes poll the shared
+        cache tier until the lock holder publishes the response, and only fetch on
+        their own if the lock expires first.
+        """
+        remaining = self._remaining()
+        try:
+            return self.single_flight.do(key, lambda: self._fetch_with_lock(key),
+                                         timeout=None if remaining is None else max(remaining, 0))
+        except FutureTimeoutError:
+            logger.warning("Timed out waiting for in-flight nutrition lookup of '%s'", key)
+            return dict(DEADLINE_EXCEEDED)
+
+    def _fetch_with_lock(self, key: str) -> dict:
+        redis_client = self.cache.redis_client
+        if redis_client is None:
+            return self._fetch_and_cache(key)
+
+        lock_key = f"{self.cache.key_prefix}lock:{key}"
+        token = uuid.uuid4().hex
+        try:
+            acquired = redis_client.set(lock_key, token, nx=True, px=int(self.lock_ttl * 1000))
+        except redis.RedisError as e:
+            logger.warning("Failed to take nutrition fetch lock for '%s': %s", key, e)
+            return self._fetch_and_cache(key)
+
+        if acquired:
+            try:
+                return self._fetch_and_cache(key)
+            finally:
+                self._release_lock(lock_key, token)
+
+        self.lock_waits += 1
+        logger.debug("Another worker is fetching '%s'; waiting for the shared cache", key)
+        give_up_at = time.monotonic() + self.lock_ttl
+        remaining = self._remaining()
+        if remaining is not None:
+            give_up_at = min(give_up_at, time.monotonic() + remaining)
+        while time.monotonic() < give_up_at:
+            time.sleep(NUTRITION_LOCK_POLL_INTERVAL)
+            cached = self.cache.get_shared(key)
+            if cached is not None:
+                return cached
+            try:
+                if not redis_client.exists(lock_key):
+                    break
+            except redis.RedisError:
+                break
+        return self.cache.get_shared(key) or self._fetch_and_cache(key)
+
+    def _release_lock(self, lock_key: str, token: str) -> None:
+        """Deletes the fetch lock only if this worker still owns it."""
+        try:
+            with self.cache.redis_client.pipeline() as pipe:
+                pipe.watch(lock_key)
+                if pipe.get(lock_key) == token.encode():
+                    pipe.multi()
+                    pipe.delete(lock_key)
+                    pipe.execute()
+        except redis.WatchError:
+            pass
+        except redis.RedisError as e:
+            logger.warning("Failed to release nutrition fetch lock %s: %s", lock_key, e)
+
+    def _fetch_and_cache(self, key: str) -> dict:
+        data = self._request_nutrition(key)
+        if "items" in data or NutritionCache.is_negative(data):
+            self.cache.set(key, data)
+        return data
+
+    @staticmethod
+    def _pack_queries(keys: List[str]) -> List[List[str]]:
+        """Groups normalized queries into chunks whose joined query fits the length budget."""
+        chunks = []
+        current = []
+        length = 0
+        for key in keys:
+            added = len(key) + (2 if current else 0)
+            if current and length + added > NUTRITION_BATCH_QUERY_CHARS:
+                chunks.append(current)
+                current, length, added = [], 0, len(key)
+            current.append(key)
+            length += added
+        if current:
+            chunks.append(current)
+        return chunks
+
+    @staticmethod
+    def _split_items(keys: List[str], items: List[dict]) -> Optional[Dict[str, List[dict]]]:
+        """
+        Attributes the items of a packed response back to the queries that produced them.
+
+        An item belongs to a query if its name equals the query or every word of the
+        name appears in it (allowing a plural "s"/"es"). The split is only trusted if
+        every item belongs to exactly one query and every query gets at least one
+        item; otherwise (e.g. "rice" in a chunk with "chicken and rice") part of a
+        query's items could end up with another, so the chunk is unsplittable.
+
+        Returns:
+            Dict[str, List[dict]]: Items keyed by query, or None if the chunk is unsplittable.
+        """
+        def words_match(name: str, key: str) -> bool:
+            key_words = set(key.split())
+            return all(w in key_words or w + 's' in key_words or w + 'es' in key_words for w in name.split())
+
+        matched = {key: [] for key in keys}
+        for item in items:
+            name = normalize_query(str(item.get("name", "")))
+            candidates = [key for key in keys if name and (name == key or words_match(name, key))]
+            if len(candidates) != 1:
+                return None
+            matched[candidates[0]].append(item)
+        if not all(matched.values()):
+            return None
+        return matched
+
+    def _request_nutrition(self, query: str) -> dict:
+        """
+        Calls the upstream with timeouts, bounded retries and the circuit breaker.
+
+        Connection errors, timeouts and 429/5xx responses are retried up to
+        `max_retries` times with full-jitter exponential backoff. While the breaker
+        is open the call fails fast without touching the network. Under a deadline
+        (see _run_concurrently), the socket timeouts are shortened to the time left
+        and no retry starts after it has passed.
+
+        Args:
+            query (str): The normalized query string.
+
+        Returns:
+            dict: The parsed response, or an error dict when the upstream is unavailable.
+
+        Raises:
+            Exception: Anything unexpected from the response handling, after it has
+                       been recorded as a breaker failure.
+        """
+        if self._deadline_passed():
+            return dict(DEADLINE_EXCEEDED)
+        if not self.circuit_breaker.allow_request():
+            logger.warning("CalorieNinjas circuit open; failing fast for '%s'", query)
+            return {"error": 503, "message": "Nutrition service temporarily unavailable"}
+
+        # Whatever happens below, the trial slot taken by allow_request() is
+        # given back, so an unexpected exception cannot wedge the breaker open.
+        # `healthy` stays None when only our own deadline cut the call short.
+        healthy = False
+        try:
+            url = f"{self.api_url}/nutrition"
+            for attempt in range(self.max_retries + 1):
+                if attempt:
+                    delay = random.uniform(0, self.backoff * (2 ** (attempt - 1)))
+                    remaining = self._remaining()
+                    time.sleep(delay if remaining is None else min(delay, max(remaining, 0)))
+                    if self._deadline_passed():
+                        logger.warning("Giving up on '%s' after %d attempts: deadline exceeded", query, attempt)
+                        break
+                try:
+                    response = self.session.get(url, params={'query': query}, timeout=self._request_timeout())
+                except requests.exceptions.Timeout as e:
+                    if self._deadline_passed():
+                        logger.warning("CalorieNinjas request for '%s' cut short by its deadline", query)
+                        healthy = None if attempt == 0 else False
+                        return dict(DEADLINE_EXCEEDED)
+                    logger.warning("CalorieNinjas request for '%s' timed out (attempt %d): %s", query, attempt + 1, e)
+                    data = {"error": 504, "message": "Request to nutrition service timed out"}
+                    continue
+                except requests.exceptions.RequestException as e:
+                    logger.warning("CalorieNinjas request for '%s' failed (attempt %d): %s", query, attempt + 1, e)
+                    data = {"error": 502, "message": "Request to nutrition service failed"}
+                    continue
+
+                try:
+                    data = self._handle_response(response)
+                except ValueError as e:
+                    logger.warning("CalorieNinjas sent an unreadable response for '%s' (attempt %d): %s",
+                                   query, attempt + 1, e)
+                    data = {"error": 502, "message": "Invalid response from nutrition service"}
+                    continue
+                if response.status_code not in RETRYABLE_STATUS_CODES:
+                    healthy = True
+                    return data
+                logger.warning("CalorieNinjas returned %d for '%s' (attempt %d)", response.status_code, query, attempt + 1)
+
+            return data
+        finally:
+            if healthy is None:
+                self.circuit_breaker.release()
+            elif healthy:
+                self.circuit_breaker.record_success()
+            else:
+                self.circuit_breaker.record_failure()
+
+    def _deadline_passed(self) -> bool:
+        remaining = self._remaining()
+        return remaining is not None and remaining <= 0
+
+    def _request_timeout(self) -> tuple:
+        """The (connect, read) timeouts for the next upstream call, capped by the deadline."""
+        remaining = self._remaining()
+        if remaining is None:
+            return self.timeout
+        remaining = max(remaining, 0.001)
+        return tuple(min(timeout, remaining) for timeout in self.timeout)
 
     def _handle_response(self, response: requests.Response) -> dict:
         """
@@ -1,27 +1,51 @@
-from flask import Flask, request, jsonify, make_response, Response 
-from flask_sqlalchemy import SQLAlchemy
+from flask import Flask, request, jsonify, make_response, Response
 from dotenv import load_dotenv
-from api_client import CalorieNinjasAPIClient  # Change from 'get_nutrition' to the class
-import os
 
 # Load environment variables from .env file
 load_dotenv()
 
-# Access the API key
-API_KEY = os.getenv('API_KEY')
+from meal_max.db import db
+from meal_max.food_routes import food_blueprint, suggest_index
+from meal_max.health_routes import health_blueprint
+from meal_max.nutrition_routes import nutrition_blueprint
+from meal_max.user_routes import user_blueprint
 
-# Initialize the API client
-api_client = CalorieNinjasAPIClient(api_key=API_KEY)
 
-# Initialize the Flask app
-app = Flask(__name__)
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///calorie_tracker.db'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+def create_app(config_class=None):
+    """
+    Create and configure the Flask app.
 
-# Initialize the database
-db = SQLAlchemy(app)
+    Args:
+        config_class: Optional configuration object (e.g. config.TestConfig).
 
-# Create the database tables
-with app.app_context():
-    db.create_all()
+    Returns:
+        Flask: The configured application with all blueprints registered.
+    """
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///calorie_tracker.db'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    if config_class is not None:
+        app.config.from_object(config_class)
 
+    # Initialize the database
+    db.init_app(app)
+
+    app.register_blueprint(health_blueprint)
+    app.register_blueprint(nutrition_blueprint)
+    app.register_blueprint(food_blueprint)
+    app.register_blueprint(user_blueprint)
+
+    # Create the database tables
+    with app.app_context():
+        db.create_all()
+
+    # Build the food suggest index off the request path
+    if not app.testing:
+        suggest_index.start()
+
+    return app
+
+
+if __name__ == '__main__':
+    app = create_app()
+    app.run(host='0.0.0.0', port=5000)
@@ -0,0 +1,86 @@
+import logging
+import os
+import threading
+from typing import Any, Callable, List, Optional
+
+from meal_max.utils.logger import configure_logger
+
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+
+_clients: List['LazyClient'] = []
+
+
+class LazyClient:
+    """
+    Stands in for a client that is created on first use rather than on import.
+
+    Attribute access is forwarded to the real client, so a LazyClient can be used
+    wherever the client itself was. Nothing connects until the first call, and a
+    process forked after that (e.g. a gunicorn worker of a preloaded app) creates
+    its own client instead of sharing the parent's sockets. The parent's client is
+    left alone in the child, since closing it there could disturb the parent.
+    """
+
+    def __init__(self, name: str, create: Callable[[], Any], close: Optional[Callable[[Any], None]] = None):
+        """
+        Initializes the stand-in without creating the client.
+
+        Args:
+            name (str): Name used in logs.
+            create (Callable): Builds the client.
+            close (Callable, optional): Releases a client on reset().
+        """
+        self.name = name
+        self._create = create
+        self._close = close
+        self._client = None
+        self._pid = None
+        self._lock = threading.Lock()
+        _clients.append(self)
+
+    @property
+    def created(self) -> bool:
+        """Whether this process has created the client yet."""
+        return self._client is not None and self._pid == os.getpid()
+
+    def get(self) -> Any:
+        """
+        Returns the client, creating it if this process has none yet.
+
+        Returns:
+            The client.
+        """
+        if not self.created:
+            with self._lock:
+                if not self.created:
+                    if self._client is not None:
+                        logger.info("Re-creating %s client after fork", self.name)
+                    self._client = self._create()
+                    self._pid = os.getpid()
+        return self._client
+
+    def reset(self) -> None:
+        """Closes the client, if this process created one; the next use creates a new one."""
+        with self._lock:
+            client, owned = self._client, self._pid == os.getpid()
+            self._client = self._pid = None
+        if client is not None and owned and self._close is not None:
+            self._close(client)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.get(), name)
+
+    def __getitem__(self, key: Any) -> Any:
+        return self.get()[key]
+
+    def __repr__(self) -> str:
+        return f"<LazyClient {self.name} ({'created' if self.created else 'not created'})>"
+
+
+def reset_clients() -> None:
+    """Closes every client created so far, e.g. at shutdown or after changing settings."""
+    for client in reversed(_clients):
+        client.reset()
@@ -1,8 +1,11 @@
 import logging
 import os
+import threading
 
 from pymongo import MongoClient
+from pymongo.monitoring import ConnectionPoolListener
 
+from meal_max.clients.factory import LazyClient
 from meal_max.utils.logger import configure_logger
 
 
@@ -12,8 +15,122 @@ configure_logger(logger)
 
 MONGO_HOST = os.environ.get('MONGO_HOST', 'localhost')
 MONGO_PORT = int(os.environ.get('MONGO_PORT', 27017))
+MONGO_DB = os.environ.get('MONGO_DB', 'meal_max')
+MONGO_MAX_POOL_SIZE = int(os.environ.get('MONGO_MAX_POOL_SIZE', 50))
+MONGO_MIN_POOL_SIZE = int(os.environ.get('MONGO_MIN_POOL_SIZE', 0))
+# Timeouts in milliseconds, as pymongo takes them.
+MONGO_CONNECT_TIMEOUT_MS = int(os.environ.get('MONGO_CONNECT_TIMEOUT_MS', 2000))
+MONGO_SOCKET_TIMEOUT_MS = int(os.environ.get('MONGO_SOCKET_TIMEOUT_MS', 5000))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', 2000))
+# How long an operation waits for a free pooled connection.
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.environ.get('MONGO_WAIT_QUEUE_TIMEOUT_MS', 1000))
 
-logger.info("Connecting to MongoDB at %s:%d", MONGO_HOST, MONGO_PORT)
-mongo_client = MongoClient(host=MONGO_HOST, port=MONGO_PORT)
-db = mongo_client['meal_max']
-sessions_collection = db['sessions']
\ No newline at end of file
+
+class PoolGauge(ConnectionPoolListener):
+    """Counts the connections of a MongoClient's pools from pymongo's pool events."""
+
+    def __init__(self, max_pool_size: int):
+        self.max_pool_size = max_pool_size
+        self.open = self.in_use = self.checkout_failures = 0
+        self._lock = threading.Lock()
+
+    def _add(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            setattr(self, name, max(getattr(self, name) + amount, 0))
+
+    def connection_created(self, event) -> None:
+        self._add('open')
+
+    def connection_closed(self, event) -> None:
+        self._add('open', -1)
+
+    def connection_checked_out(self, event) -> None:
+        self._add('in_use')
+
+    def connection_checked_in(self, event) -> None:
+        self._add('in_use', -1)
+
+    def connection_check_out_failed(self, event) -> None:
+        self._add('checkout_failures')
+
+    def pool_created(self, event) -> None:
+        pass
+
+    def pool_ready(self, event) -> None:
+        pass
+
+    def pool_cleared(self, event) -> None:
+        pass
+
+    def pool_closed(self, event) -> None:
+        pass
+
+    def connection_ready(self, event) -> None:
+        pass
+
+    def connection_check_out_started(self, event) -> None:
+        pass
+
+    def stats(self) -> dict:
+        """
+        Reports the pool gauges, summed over the servers the client talks to.
+
+        Returns:
+            dict: 'max_pool_size' (per server), connections 'open' and 'in_use',
+                  'utilization' (in use over the maximum) and 'checkout_failures'.
+        """
+        with self._lock:
+            return {
+                "max_pool_size": self.max_pool_size,
+                "open": self.open,
+                "in_use": self.in_use,
+                "utilization": round(self.in_use / self.max_pool_size, 3),
+                "checkout_failures": self.checkout_failures,
+            }
+
+
+def create_mongo_client(**options) -> MongoClient:
+    """
+    Builds a MongoClient with the configured pool and timeouts. It does not connect
+    until the first operation.
+
+    Args:
+        **options: Overrides for the MongoClient options.
+
+    Returns:
+        MongoClient: The client; its PoolGauge is at `client.pool_gauge`.
+    """
+    settings = dict(
+        host=MONGO_HOST,
+        port=MONGO_PORT,
+        maxPoolSize=MONGO_MAX_POOL_SIZE,
+        minPoolSize=MONGO_MIN_POOL_SIZE,
+        connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+        socketTimeoutMS=MONGO_SOCKET_TIMEOUT_MS,
+        serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        waitQueueTimeoutMS=MONGO_WAIT_QUEUE_TIMEOUT_MS,
+    )
+    settings.update(options)
+    gauge = PoolGauge(settings['maxPoolSize'])
+    logger.info("Creating MongoDB client for %s:%s (pool of %d)", settings['host'], settings['port'],
+                settings['maxPoolSize'])
+    client = MongoClient(connect=False, event_listeners=[gauge], **settings)
+    client.pool_gauge = gauge
+    return client
+
+
+def mongo_pool_stats() -> dict:
+    """
+    Reports the gauges of this process's MongoDB pool without creating the client.
+
+    Returns:
+        dict: PoolGauge.stats(), plus whether the client was 'created'.
+    """
+    if not mongo_client.created:
+        return {"created": False}
+    return {"created": True, **mongo_client.pool_gauge.stats()}
+
+
+mongo_client = LazyClient('mongo', create_mongo_client, MongoClient.close)
+db = LazyClient('mongo database', lambda: mongo_client.get()[MONGO_DB])
+sessions_collection = LazyClient('mongo sessions', lambda: db.get()['sessions'])
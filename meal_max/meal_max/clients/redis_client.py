@@ -1,8 +1,10 @@
 import logging
 import os
+import threading
 
 import redis
 
+from meal_max.clients.factory import LazyClient
 from meal_max.utils.logger import configure_logger
 
 
@@ -13,6 +15,111 @@ configure_logger(logger)
 REDIS_HOST = os.environ.get('REDIS_HOST', 'localhost')
 REDIS_PORT = os.environ.get('REDIS_PORT', 6379)
 REDIS_DB = os.environ.get('REDIS_DB', 0)
+REDIS_MAX_CONNECTIONS = int(os.environ.get('REDIS_MAX_CONNECTIONS', 50))
+# Seconds a command waits for a free pooled connection before failing.
+REDIS_POOL_TIMEOUT = float(os.environ.get('REDIS_POOL_TIMEOUT', 1))
+REDIS_CONNECT_TIMEOUT = float(os.environ.get('REDIS_CONNECT_TIMEOUT', 1))
+REDIS_SOCKET_TIMEOUT = float(os.environ.get('REDIS_SOCKET_TIMEOUT', 2))
+REDIS_HEALTH_CHECK_INTERVAL = int(os.environ.get('REDIS_HEALTH_CHECK_INTERVAL', 30))
 
-logger.info("Connecting to Redis at %s:%s", REDIS_HOST, REDIS_PORT)
-redis_client = redis.StrictRedis(host=REDIS_HOST, port=REDIS_PORT, db=REDIS_DB)
\ No newline at end of file
+
+class GaugedConnectionPool(redis.BlockingConnectionPool):
+    """
+    A bounded Redis connection pool that counts its connections.
+
+    At most `max_connections` connections are ever opened; beyond that, commands
+    wait up to `timeout` seconds for one to be released instead of opening more,
+    so a burst of requests cannot turn into a connection storm.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self._gauge_lock = threading.Lock()
+        self.opened = self.in_use = self.checkout_failures = 0
+        super().__init__(*args, **kwargs)
+
+    def reset(self) -> None:
+        super().reset()
+        with self._gauge_lock:
+            self.opened = self.in_use = 0
+
+    def make_connection(self):
+        connection = super().make_connection()
+        with self._gauge_lock:
+            self.opened += 1
+        return connection
+
+    def get_connection(self, *args, **kwargs):
+        try:
+            connection = super().get_connection(*args, **kwargs)
+        except redis.ConnectionError:
+            with self._gauge_lock:
+                self.checkout_failures += 1
+            raise
+        with self._gauge_lock:
+            self.in_use += 1
+        return connection
+
+    def release(self, connection) -> None:
+        super().release(connection)
+        with self._gauge_lock:
+            self.in_use = max(self.in_use - 1, 0)
+
+    def stats(self) -> dict:
+        """
+        Reports the pool gauges.
+
+        Returns:
+            dict: 'max_connections', connections 'open' and 'in_use', 'utilization'
+                  (in use over the maximum) and 'checkout_failures' (timeouts and
+                  connection errors).
+        """
+        with self._gauge_lock:
+            return {
+                "max_connections": self.max_connections,
+                "open": self.opened,
+                "in_use": self.in_use,
+                "utilization": round(self.in_use / self.max_connections, 3),
+                "checkout_failures": self.checkout_failures,
+            }
+
+
+def create_redis_client(**connection_kwargs) -> redis.StrictRedis:
+    """
+    Builds a Redis client on a bounded pool with the configured timeouts. Connections
+    are opened on first use.
+
+    Args:
+        **connection_kwargs: Overrides for the pool and connection settings.
+
+    Returns:
+        redis.StrictRedis: The client.
+    """
+    settings = dict(
+        host=REDIS_HOST,
+        port=REDIS_PORT,
+        db=REDIS_DB,
+        max_connections=REDIS_MAX_CONNECTIONS,
+        timeout=REDIS_POOL_TIMEOUT,
+        socket_connect_timeout=REDIS_CONNECT_TIMEOUT,
+        socket_timeout=REDIS_SOCKET_TIMEOUT,
+        health_check_interval=REDIS_HEALTH_CHECK_INTERVAL,
+    )
+    settings.update(connection_kwargs)
+    logger.info("Creating Redis client for %s:%s (pool of %d)",
+                settings['host'], settings['port'], settings['max_connections'])
+    return redis.StrictRedis(connection_pool=GaugedConnectionPool(**settings))
+
+
+def redis_pool_stats() -> dict:
+    """
+    Reports the gauges of this process's Redis pool without creating the client.
+
+    Returns:
+        dict: GaugedConnectionPool.stats(), plus whether the client was 'created'.
+    """
+    if not redis_client.created:
+        return {"created": False}
+    return {"created": True, **redis_client.connection_pool.stats()}
+
+
+redis_client = LazyClient('redis', create_redis_client, lambda client: client.connection_pool.disconnect())
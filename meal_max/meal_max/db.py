@@ -1,12 +1,34 @@
-from flask import Flask, request, jsonify
+"""
+The canonical schema: every table the application stores in SQL is defined here.
+
+Per-user tables reference users.id with ON DELETE CASCADE, so deleting a user is a
+single DELETE and the database removes the user's logs and rollups. Every
+per-user table is indexed on (user_id, <date column>), which serves the per-user
+range scans of the hot paths and the cascade's lookups by user_id. Existing
+databases are brought to this schema with `python -m meal_max.migrations`.
+"""
 from flask_sqlalchemy import SQLAlchemy
-from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy import case, event, insert
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Engine
+from datetime import date, datetime, timedelta
 import os
+import sqlite3
+
+from meal_max.utils.password_hasher import password_hasher
+
+db = SQLAlchemy()
 
-app = Flask(__name__)
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///calorie_tracker.db'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-db = SQLAlchemy(app)
+# Goal given to accounts created without one (the reference intake used on nutrition labels).
+DEFAULT_CALORIE_GOAL = 2000
+
+@event.listens_for(Engine, 'connect')
+def _enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+    """SQLite enforces foreign keys, and so ON DELETE CASCADE, only when asked to on each connection."""
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA foreign_keys=ON')
+        cursor.close()
 
 # Database Models
 class User(db.Model):
@@ -17,18 +39,29 @@ class User(db.Model):
         id (int): Primary key, unique identifier for each user.
         username (str): Unique username for the user.
         calorie_goal (int): Daily calorie goal set by the user.
-        starting_weight (float): User's starting weight.
+        starting_weight (float): User's starting weight, if known.
         salt (str): Salt used for password hashing.
         password_hash (str): Hashed password for the user.
+        calorie_logs (relationship): The user's calorie intake logs.
+        weight_logs (relationship): The user's weight logs.
     """
+    __tablename__ = 'users'
+
     id = db.Column(db.Integer, primary_key=True)
-    username = db.Column(db.String(50), unique=True, nullable=False)
-    calorie_goal = db.Column(db.Integer, nullable=False)
-    starting_weight = db.Column(db.Integer, nullable=False)
+    # unique=True creates the index every username lookup uses.
+    username = db.Column(db.String(80), unique=True, nullable=False)
+    calorie_goal = db.Column(db.Integer, nullable=False, default=DEFAULT_CALORIE_GOAL)
+    starting_weight = db.Column(db.Float)
     salt = db.Column(db.String(128), nullable=False)
-    password_hash = db.Column(db.String(128), nullable=False)
+    password_hash = db.Column(db.String(192), nullable=False)
+
+    # passive_deletes leaves unloaded logs to the database's ON DELETE CASCADE.
+    calorie_logs = db.relationship('CalorieIntake', backref='user', lazy=True,
+                                   cascade='all, delete-orphan', passive_deletes=True)
+    weight_logs = db.relationship('WeightLog', backref='user', lazy=True,
+                                  cascade='all, delete-orphan', passive_deletes=True)
 
-    def __init__(self, username, password, calorie_goal, starting_weight):
+    def __init__(self, username, password, calorie_goal=DEFAULT_CALORIE_GOAL, starting_weight=None):
         """
         Initializes a new user with the provided details.
 
@@ -36,7 +69,7 @@ class User(db.Model):
             username (str): The username of the user.
             password (str): The raw password of the user.
             calorie_goal (int): Daily calorie goal set by the user.
-            starting_weight (float): User's starting weight.
+            starting_weight (float, optional): User's starting weight.
         """
         self.username = username
         self.salt = self.generate_salt()
@@ -49,125 +82,301 @@ class User(db.Model):
         return os.urandom(16).hex()
 
     def generate_password_hash(self, password):
-        """Generate password hash using salt"""
-        return generate_password_hash(password + self.salt)
+        """Generate password hash using salt, on the shared hashing pool"""
+        return password_hasher.hash(password + self.salt)
 
     def check_password(self, password):
-        """Check if the provided password matches the stored hash"""
-        return check_password_hash(self.password_hash, password + self.salt)
+        """Check if the provided password matches the stored hash, on the shared hashing pool"""
+        return password_hasher.verify(self.password_hash, password + self.salt)
+
+    def password_needs_rehash(self):
+        """Check if the stored hash was made with other parameters than the current hash method"""
+        return password_hasher.needs_rehash(self.password_hash)
 
     def __repr__(self):
         """Return a more readable representation of the User object"""
         return f"<User(username='{self.username}', calorie_goal={self.calorie_goal}, starting_weight={self.starting_weight})>"
 
-# Routes
+class CalorieIntake(db.Model):
+    """
+    Represents one day's calorie intake for a user.
+
+    Attributes:
+        id (int): Primary key, unique identifier for each entry.
+        user_id (int): ID of the user the entry belongs to.
+        date (date): Day the calories were consumed.
+        calories (int): Number of calories consumed.
+    """
+    __tablename__ = 'calorie_intake'
+    __table_args__ = (
+        # Covers per-user history scans ordered by (date, id); SQLite appends the rowid.
+        db.Index('ix_calorie_intake_user_id_date', 'user_id', 'date'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    date = db.Column(db.Date, nullable=False)
+    calories = db.Column(db.Integer, nullable=False)
+
+    def __repr__(self):
+        """Return a more readable representation of the CalorieIntake object"""
+        return f"<CalorieIntake(user_id={self.user_id}, date={self.date}, calories={self.calories})>"
+
+    @staticmethod
+    def parse_calories(value):
+        """
+        Coerce a calorie count from a request to a positive int.
+
+        Args:
+            value: An int or a string of digits, as sent in JSON.
+
+        Returns:
+            int: The calorie count.
+
+        Raises:
+            ValueError: If the value is not a positive integer.
+        """
+        if isinstance(value, str) and value.strip().isdigit():
+            value = int(value)
+        if isinstance(value, bool) or not isinstance(value, int) or value <= 0:
+            raise ValueError('Calories must be a positive integer')
+        return value
+
+    @classmethod
+    def bulk_log(cls, user_id, entries):
+        """
+        Log many calorie intakes for one user in a single transaction.
+
+        Entries are validated up front, existing dates are found with one range
+        query, and the new rows are written with one executemany and one commit,
+        so the cost is a constant number of round trips rather than one per entry.
+
+        Args:
+            user_id (int): ID of the user logging calories.
+            entries (list): Dicts with 'date' (date or YYYY-MM-DD string) and 'calories' (positive int,
+                            or a string of digits).
+
+        Returns:
+            list: One status dict per entry, in input order, with 'index', 'date' and
+                  'status' ('created', 'duplicate' or 'invalid', plus 'error' when invalid).
+        """
+        results = []
+        pending = {}
+        for index, entry in enumerate(entries):
+            raw_date = entry.get('date') if isinstance(entry, dict) else None
+            calories = entry.get('calories') if isinstance(entry, dict) else None
+            result = {'index': index, 'date': raw_date.isoformat() if isinstance(raw_date, date) else raw_date}
+            results.append(result)
+            try:
+                log_date = raw_date if isinstance(raw_date, date) else datetime.strptime(raw_date, '%Y-%m-%d').date()
+            except (TypeError, ValueError):
+                result.update(status='invalid', error='Invalid date format. Use YYYY-MM-DD')
+                continue
+            try:
+                calories = cls.parse_calories(calories)
+            except ValueError as e:
+                result.update(status='invalid', error=str(e))
+                continue
+            if log_date in pending:
+                result['status'] = 'duplicate'
+                continue
+            pending[log_date] = (result, calories)
+
+        if pending:
+            existing = {
+                row.date for row in db.session.query(cls.date).filter(
+                    cls.user_id == user_id,
+                    cls.date.between(min(pending), max(pending))
+                )
+            }
+            rows = []
+            for log_date, (result, calories) in pending.items():
+                if log_date in existing:
+                    result['status'] = 'duplicate'
+                else:
+                    result['status'] = 'created'
+                    rows.append({'user_id': user_id, 'date': log_date, 'calories': calories})
+            try:
+                if rows:
+                    db.session.execute(insert(cls), rows)
+                    rollup_calories(user_id, ((row['date'], row['calories']) for row in rows))
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+        return results
 
-# 1. Register a user and set a calorie goal (Create Account)
-@app.route('/create-account', methods=['POST'])
-def create_account():
+class WeightLog(db.Model):
     """
-    Create a new user account.
+    Represents a weight measurement for a user.
 
-    Request:
-        - username (str): The username for the account.
-        - password (str): The password for the account.
-        - calorie_goal (int): The daily calorie goal for the user.
-        - starting_weight (float): The starting weight of the user.
+    Attributes:
+        id (int): Primary key, unique identifier for each entry.
+        user_id (int): ID of the user the entry belongs to.
+        date (date): Day the weight was measured.
+        weight (float): Measured weight.
+    """
+    __tablename__ = 'weight_log'
+    __table_args__ = (
+        db.Index('ix_weight_log_user_id_date', 'user_id', 'date'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    date = db.Column(db.Date, nullable=False)
+    weight = db.Column(db.Float, nullable=False)
+
+    def __repr__(self):
+        """Return a more readable representation of the WeightLog object"""
+        return f"<WeightLog(user_id={self.user_id}, date={self.date}, weight={self.weight})>"
 
-    Response:
-        - 201: Account created successfully.
-        - 400: Missing fields or user already exists.
+class DailyRollup(db.Model):
     """
-    data = request.get_json()
-    username = data.get('username')
-    password = data.get('password')
-    calorie_goal = data.get('calorie_goal')
-    starting_weight = data.get('starting_weight')
+    Materialized per-user, per-day totals, kept in step with the raw logs.
 
-    if not username or not password or not calorie_goal or not starting_weight:
-        return jsonify({'error': 'Username, password, calorie goal, and starting weight are required'}), 400
+    Attributes:
+        user_id (int): ID of the user the rollup belongs to.
+        day (date): The day being rolled up.
+        total_calories (int): Sum of the day's calorie intake entries.
+        entry_count (int): Number of calorie intake entries on the day.
+        last_weight (float): The most recently logged weight on the day, if any.
+    """
+    __tablename__ = 'daily_rollup'
 
-    existing_user = User.query.filter_by(username=username).first()
-    if existing_user:
-        return jsonify({'error': 'User already exists'}), 400
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    total_calories = db.Column(db.Integer, nullable=False, default=0)
+    entry_count = db.Column(db.Integer, nullable=False, default=0)
+    last_weight = db.Column(db.Float)
 
-    new_user = User(username=username, password=password, calorie_goal=calorie_goal, starting_weight=starting_weight)
-    db.session.add(new_user)
-    db.session.commit()
-    return jsonify({'message': 'User created successfully'}), 201
+class WeeklyRollup(db.Model):
+    """
+    Materialized per-user, per-week totals, kept in step with the raw logs.
 
-# 2. Login (Authenticate User)
-@app.route('/login', methods=['POST'])
-def login():
+    Attributes:
+        user_id (int): ID of the user the rollup belongs to.
+        week_start (date): The Monday the week starts on.
+        total_calories (int): Sum of the week's calorie intake entries.
+        entry_count (int): Number of calorie intake entries in the week.
+        last_weight (float): The weight logged on the latest day of the week, if any.
+        last_weight_date (date): The day `last_weight` was logged.
     """
-    Authenticate a user with their username and password.
+    __tablename__ = 'weekly_rollup'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    week_start = db.Column(db.Date, primary_key=True)
+    total_calories = db.Column(db.Integer, nullable=False, default=0)
+    entry_count = db.Column(db.Integer, nullable=False, default=0)
+    last_weight = db.Column(db.Float)
+    last_weight_date = db.Column(db.Date)
 
-    Request:
-        - username (str): The username for the account.
-        - password (str): The password for the account.
+def week_start(day):
+    """Return the Monday of the week `day` falls in."""
+    return day - timedelta(days=day.weekday())
 
-    Response:
-        - 200: Login successful.
-        - 400: Missing fields.
-        - 404: User not found.
-        - 401: Invalid password.
+def rollup_calories(user_id, entries, removed=False):
     """
-    data = request.get_json()
-    username = data.get('username')
-    password = data.get('password')
+    Apply calorie intake entries to the user's daily and weekly rollups.
+
+    Entries are folded per day and per week first, so each table gets a single
+    executemany upsert. Nothing is committed; call this before the commit that
+    writes (or deletes) the raw rows so both land in the same transaction.
 
-    if not username or not password:
-        return jsonify({'error': 'Username and password are required'}), 400
+    Args:
+        user_id (int): ID of the user the entries belong to.
+        entries (iterable): (date, calories) pairs.
+        removed (bool): Whether the entries are being deleted rather than added.
+    """
+    mark_user_changed(user_id)
+    sign = -1 if removed else 1
+    days = {}
+    for log_date, calories in entries:
+        total, count = days.get(log_date, (0, 0))
+        days[log_date] = (total + sign * calories, count + sign)
+    if not days:
+        return
+    weeks = {}
+    for log_date, (total, count) in days.items():
+        week_total, week_count = weeks.get(week_start(log_date), (0, 0))
+        weeks[week_start(log_date)] = (week_total + total, week_count + count)
 
-    user = User.query.filter_by(username=username).first()
-    if not user:
-        return jsonify({'error': 'User not found'}), 404
+    for model, key, periods in ((DailyRollup, 'day', days), (WeeklyRollup, 'week_start', weeks)):
+        stmt = _upsert(model)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['user_id', key],
+            set_={
+                'total_calories': model.total_calories + stmt.excluded.total_calories,
+                'entry_count': model.entry_count + stmt.excluded.entry_count,
+            }
+        )
+        db.session.execute(stmt, [
+            {'user_id': user_id, key: period, 'total_calories': total, 'entry_count': count}
+            for period, (total, count) in periods.items()
+        ])
+        if removed:
+            model.query.filter(
+                model.user_id == user_id,
+                getattr(model, key).in_(list(periods)),
+                model.entry_count <= 0,
+                model.last_weight.is_(None)
+            ).delete(synchronize_session=False)
 
-    # Check if the password matches the hashed password
-    if not user.check_password(password):
-        return jsonify({'error': 'Invalid password'}), 401
+def rollup_weight(user_id, log_date, weight):
+    """
+    Apply a newly logged weight to the user's daily and weekly rollups.
 
-    return jsonify({'message': 'Login successful'}), 200
+    Like rollup_calories, this does not commit.
 
-# 3. Update password
-@app.route('/update-password', methods=['PUT'])
-def update_password():
+    Args:
+        user_id (int): ID of the user the weight belongs to.
+        log_date (date): Day the weight was measured.
+        weight (float): Measured weight.
     """
-    Update a user's password.
+    mark_user_changed(user_id)
+    stmt = _upsert(DailyRollup).values(user_id=user_id, day=log_date, total_calories=0, entry_count=0,
+                                       last_weight=weight)
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=['user_id', 'day'],
+        set_={'last_weight': stmt.excluded.last_weight}
+    ))
 
-    Request:
-        - username (str): The username for the account.
-        - current_password (str): The current password of the user.
-        - new_password (str): The new password to set.
+    stmt = _upsert(WeeklyRollup).values(user_id=user_id, week_start=week_start(log_date), total_calories=0,
+                                        entry_count=0, last_weight=weight, last_weight_date=log_date)
+    is_latest = (WeeklyRollup.last_weight_date.is_(None)) | (stmt.excluded.last_weight_date >= WeeklyRollup.last_weight_date)
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=['user_id', 'week_start'],
+        set_={
+            'last_weight': case((is_latest, stmt.excluded.last_weight), else_=WeeklyRollup.last_weight),
+            'last_weight_date': case((is_latest, stmt.excluded.last_weight_date), else_=WeeklyRollup.last_weight_date),
+        }
+    ))
 
-    Response:
-        - 200: Password updated successfully.
-        - 400: Missing fields.
-        - 404: User not found.
-        - 401: Incorrect current password.
+def mark_user_changed(user_id):
     """
-    data = request.get_json()
-    username = data.get('username')
-    current_password = data.get('current_password')
-    new_password = data.get('new_password')
+    Record that the current transaction changes the user's logged data or goal.
+
+    The IDs collect in the session's info dict; listeners on the session's
+    after_commit event (such as the response cache) can act on them once the
+    change is visible to other connections.
 
-    if not username or not current_password or not new_password:
-        return jsonify({'error': 'Username, current password, and new password are required'}), 400
+    Args:
+        user_id (int): ID of the user whose data changes.
+    """
+    db.session.info.setdefault('changed_user_ids', set()).add(user_id)
 
-    user = User.query.filter_by(username=username).first()
-    if not user:
-        return jsonify({'error': 'User not found'}), 404
+@event.listens_for(db.session, 'after_flush')
+def _record_changed_accounts(session, flush_context):
+    """
+    Collect the usernames of User rows the flush updated or deleted.
 
-    # Check if the current password matches
-    if not user.check_password(current_password):
-        return jsonify({'error': 'Incorrect current password'}), 401
+    They gather in session.info['changed_usernames'], so an after_commit listener
+    (the user profile cache) sees every account change, whichever code path made it.
+    """
+    for obj in list(session.dirty) + list(session.deleted):
+        if isinstance(obj, User):
+            session.info.setdefault('changed_usernames', set()).add(obj.username)
 
-    # Hash the new password and update
-    user.password_hash = user.generate_password_hash(new_password)
-    db.session.commit()
-    return jsonify({'message': 'Password updated successfully'}), 200
-
-if __name__ == '__main__':
-    with app.app_context():
-        db.create_all()  # Create database tables if they don't exist
-    app.run(debug=True)
+def _upsert(model):
+    """Return a dialect-specific INSERT for `model` that supports on_conflict_do_update."""
+    dialect = postgresql if db.session.get_bind().dialect.name == 'postgresql' else sqlite
+    return dialect.insert(model)
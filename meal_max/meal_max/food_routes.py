@@ -0,0 +1,47 @@
+from flask import Blueprint, jsonify, request
+import os
+
+from meal_max.nutrition_routes import api_client
+from meal_max.utils.food_suggest import FoodSuggestIndex, SUGGEST_MAX_LIMIT
+
+food_blueprint = Blueprint('food', __name__)
+
+suggest_index = FoodSuggestIndex(local_foods=api_client.local_foods, cache=api_client.cache)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=suggest_index.after_fork)
+
+@food_blueprint.route('/foods/suggest', methods=['GET'])
+def suggest_foods():
+    """
+    Route to get ranked food-name completions for type-ahead.
+
+    Completions come from an in-memory index over the local food table and cached
+    upstream responses, so no request ever calls the nutrition API. When nothing
+    starts with the query, close spellings from the local food table are returned.
+
+    Query Parameters:
+        q (str): What the user has typed so far.
+        limit (int, optional): Maximum number of completions (default 10, at most 25).
+
+    Returns:
+        JSON: {"query": q, "suggestions": [...]}, best match first.
+        HTTP Status Codes:
+            - 200: Completions returned (possibly none).
+            - 400: Missing query or invalid limit.
+    """
+    query = request.args.get('q', '')
+    if not query.strip():
+        return jsonify({"error": "Query parameter 'q' is required"}), 400
+
+    try:
+        limit = int(request.args.get('limit', 10))
+    except ValueError:
+        return jsonify({"error": "Limit must be an integer"}), 400
+    if not 1 <= limit <= SUGGEST_MAX_LIMIT:
+        return jsonify({"error": f"Limit must be between 1 and {SUGGEST_MAX_LIMIT}"}), 400
+
+    suggestions = suggest_index.suggest(query, limit)
+    if not suggestions and suggest_index.local_foods is not None:
+        suggestions = suggest_index.local_foods.fuzzy_search(query, limit)
+
+    return jsonify({"query": query, "suggestions": suggestions})
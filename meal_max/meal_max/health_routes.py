@@ -0,0 +1,73 @@
+import logging
+import time
+
+from flask import Blueprint, jsonify, request
+from sqlalchemy import text
+
+from meal_max.clients.mongo_client import mongo_client, mongo_pool_stats
+from meal_max.clients.redis_client import redis_client, redis_pool_stats
+from meal_max.db import db
+from meal_max.utils.logger import configure_logger
+from meal_max.utils.random_utils import random_pool
+
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+
+health_blueprint = Blueprint('health', __name__)
+
+
+@health_blueprint.route('/api/health', methods=['GET'])
+def healthcheck():
+    """
+    Route to check that the application is running.
+
+    Plain checks touch no dependency, so they stay cheap enough for a load
+    balancer. With `dependencies=true`, the database, Redis and MongoDB are each
+    pinged once and their latencies reported alongside the client pool gauges and
+    the random number pool's buffer depth and counters; each ping is bounded by
+    that client's connect and socket timeouts.
+
+    Query Parameters:
+        dependencies (str, optional): 'true' to probe the dependencies.
+
+    Returns:
+        JSON: {"status": "healthy"}, or with dependencies also
+              {"dependencies": {name: {"status": "up" | "down", "latency_ms", "error"?}},
+               "pools": {"redis": {...}, "mongo": {...}}, "random_pool": {...}} and a
+              status of "degraded" if any dependency is down.
+        HTTP Status Codes:
+            - 200: Healthy.
+            - 503: A dependency is down.
+    """
+    if request.args.get('dependencies', '').lower() not in ('true', '1', 'yes'):
+        return jsonify({"status": "healthy"}), 200
+
+    dependencies = {
+        "database": _probe(lambda: db.session.execute(text('SELECT 1'))),
+        "redis": _probe(redis_client.ping),
+        "mongo": _probe(lambda: mongo_client.admin.command('ping')),
+    }
+    healthy = all(check["status"] == "up" for check in dependencies.values())
+    return jsonify({
+        "status": "healthy" if healthy else "degraded",
+        "dependencies": dependencies,
+        "pools": {"redis": redis_pool_stats(), "mongo": mongo_pool_stats()},
+        "random_pool": random_pool.stats(),
+    }), 200 if healthy else 503
+
+
+def _probe(ping) -> dict:
+    """Run one dependency ping and report its status and latency."""
+    started = time.monotonic()
+    try:
+        ping()
+    except Exception as e:
+        logger.error("Health check failed: %s", e)
+        return {"status": "down", "latency_ms": _elapsed_ms(started), "error": str(e)}
+    return {"status": "up", "latency_ms": _elapsed_ms(started)}
+
+
+def _elapsed_ms(started: float) -> float:
+    return round((time.monotonic() - started) * 1000, 2)
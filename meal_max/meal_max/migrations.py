@@ -0,0 +1,179 @@
+"""
+Brings an existing database up to the schema defined in meal_max.db.
+
+    python -m meal_max.migrations [--database-uri URI]
+
+Migrations run in order, each in its own transaction, and are recorded in the
+schema_migrations table, so running the command again only applies new ones. A
+fresh database needs no migrating: creating the tables from meal_max.db already
+yields the current schema, and the migrations find nothing to change.
+"""
+import argparse
+import logging
+import os
+from datetime import datetime
+from typing import Callable, List, Optional, Tuple
+
+from sqlalchemy import (Column, DateTime, MetaData, String, Table, column, create_engine, event, func, inspect,
+                        literal, select, table, text)
+from sqlalchemy.engine import Connection, Engine
+
+from meal_max.db import db, DEFAULT_CALORIE_GOAL, User
+from meal_max.utils.logger import configure_logger
+from meal_max.utils.password_hasher import LEGACY_SHA256_PREFIX
+
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+
+MIGRATIONS_DATABASE_URI = os.environ.get('DATABASE_URL', 'sqlite:///calorie_tracker.db')
+
+# Per-user tables, in the order their rows are copied back when rebuilt.
+USER_DATA_TABLES = ('calorie_intake', 'weight_log', 'daily_rollup', 'weekly_rollup')
+
+schema_migrations = Table(
+    'schema_migrations', MetaData(),
+    Column('id', String(64), primary_key=True),
+    Column('applied_at', DateTime, nullable=False),
+)
+
+
+def migrate(database_uri: str = MIGRATIONS_DATABASE_URI) -> List[str]:
+    """
+    Applies every migration that has not been applied to the database yet.
+
+    Args:
+        database_uri (str): SQLAlchemy URI of the database.
+
+    Returns:
+        List[str]: IDs of the migrations applied by this call, in order.
+    """
+    engine = _make_engine(database_uri)
+    try:
+        with engine.begin() as conn:
+            schema_migrations.create(conn, checkfirst=True)
+            done = set(conn.scalars(select(schema_migrations.c.id)))
+
+        applied = []
+        for migration_id, apply in MIGRATIONS:
+            if migration_id in done:
+                continue
+            with engine.begin() as conn:
+                logger.info("Applying migration %s", migration_id)
+                apply(conn)
+                conn.execute(schema_migrations.insert().values(id=migration_id, applied_at=datetime.utcnow()))
+            applied.append(migration_id)
+        return applied
+    finally:
+        engine.dispose()
+
+
+def _unify_users(conn: Connection) -> None:
+    """
+    Moves accounts into the single `users` table and adds ON DELETE CASCADE.
+
+    Older databases have up to two account tables: `user` (the full profile, which
+    the per-user tables reference) and `users` (username and an unsalted SHA-256
+    password only). Profiles keep their IDs so their logs stay attached. Accounts
+    only in the old `users` table get the default calorie goal, and their hashes
+    are kept in a legacy format that User verifies and replaces on the next login.
+    Per-user tables whose foreign key does not cascade from users.id are rebuilt,
+    dropping rows that belong to no user.
+    """
+    inspector = inspect(conn)
+    tables = set(inspector.get_table_names())
+    rebuild = [name for name in USER_DATA_TABLES if name in tables and not _cascades_from_users(inspector, name)]
+    old_profiles = 'user' in tables
+    old_accounts = 'users' in tables and 'password_hash' not in {c['name'] for c in inspector.get_columns('users')}
+    if not (rebuild or old_profiles or old_accounts):
+        return
+
+    # Copy to temporary tables, drop, recreate from the models, copy back. Works the
+    # same on SQLite (which cannot alter constraints) and PostgreSQL, and leaves no
+    # old index or constraint names behind to collide with the new ones.
+    saved = {}
+    for name in rebuild + ['user'] * old_profiles + ['users'] * old_accounts:
+        legacy = f"_legacy_{name}"
+        conn.execute(text(f"CREATE TEMPORARY TABLE {legacy} AS SELECT * FROM {_quote(conn, name)}"))
+        saved[name] = table(legacy, *(column(c['name']) for c in inspector.get_columns(name)))
+    for name in saved:
+        conn.execute(text(f"DROP TABLE {_quote(conn, name)}"))
+    db.metadata.create_all(conn)
+
+    users = User.__table__
+    if old_profiles:
+        old = saved['user']
+        conn.execute(users.insert().from_select(
+            ['id', 'username', 'calorie_goal', 'starting_weight', 'salt', 'password_hash'],
+            select(old.c.id, old.c.username, old.c.calorie_goal, old.c.starting_weight, old.c.salt,
+                   old.c.password_hash)
+            .where(old.c.username.not_in(select(users.c.username)), old.c.id.not_in(select(users.c.id)))
+        ))
+    if old_accounts:
+        old = saved['users']
+        conn.execute(users.insert().from_select(
+            ['username', 'calorie_goal', 'salt', 'password_hash'],
+            select(old.c.username, literal(DEFAULT_CALORIE_GOAL), old.c.salt,
+                   literal(LEGACY_SHA256_PREFIX) + old.c.password)
+            .where(old.c.username.not_in(select(users.c.username)))
+        ))
+    for name in rebuild:
+        old, new = saved[name], db.metadata.tables[name]
+        names = [c.name for c in new.columns if c.name in old.c]
+        result = conn.execute(new.insert().from_select(
+            names, select(*(old.c[c] for c in names)).where(old.c.user_id.in_(select(users.c.id)))
+        ))
+        dropped = conn.scalar(select(func.count()).select_from(old)) - result.rowcount
+        if dropped:
+            logger.warning("Dropped %d rows of %s that belong to no user", dropped, name)
+    for legacy in saved.values():
+        conn.execute(text(f"DROP TABLE {legacy.name}"))
+
+    if conn.dialect.name == 'postgresql':
+        # Rows were copied with their IDs; move the sequences past them.
+        for name in ['users'] + [name for name in rebuild if 'id' in db.metadata.tables[name].c]:
+            conn.execute(text(f"SELECT setval(pg_get_serial_sequence('{name}', 'id'), "
+                              f"COALESCE(MAX(id), 0) + 1, false) FROM {name}"))
+    logger.info("Unified user tables (rebuilt: %s)", ', '.join(saved) or 'none')
+
+
+def _cascades_from_users(inspector, name: str) -> bool:
+    return any(fk['referred_table'] == 'users' and (fk.get('options') or {}).get('ondelete', '').upper() == 'CASCADE'
+               for fk in inspector.get_foreign_keys(name))
+
+
+def _quote(conn: Connection, name: str) -> str:
+    return conn.dialect.identifier_preparer.quote(name)
+
+
+def _make_engine(database_uri: str) -> Engine:
+    engine = create_engine(database_uri)
+    if engine.dialect.name == 'sqlite':
+        # pysqlite commits before DDL by default; take over transaction control so
+        # each migration is all-or-nothing.
+        @event.listens_for(engine, 'connect')
+        def _disable_implicit_transactions(dbapi_connection, connection_record):
+            dbapi_connection.isolation_level = None
+
+        @event.listens_for(engine, 'begin')
+        def _begin(conn):
+            conn.exec_driver_sql('BEGIN')
+    return engine
+
+
+MIGRATIONS: List[Tuple[str, Callable[[Connection], None]]] = [
+    ('0001_unify_users', _unify_users),
+]
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog='python -m meal_max.migrations', description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--database-uri', default=MIGRATIONS_DATABASE_URI, help='SQLAlchemy database URI')
+    args = parser.parse_args(argv)
+    applied = migrate(args.database_uri)
+    print(f"Applied {len(applied)} migration(s){': ' + ', '.join(applied) if applied else ''}")
+
+
+if __name__ == '__main__':
+    main()
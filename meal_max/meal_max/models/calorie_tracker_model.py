@@ -1,71 +1,22 @@
-from dataclasses import asdict, dataclass
-from db import CalorieIntake, WeightLog
 import logging
-from typing import Any, List
 from datetime import date
-from sqlalchemy.orm import relationship
+from typing import List
+
+from meal_max.db import db, CalorieIntake, User, WeightLog, rollup_calories, rollup_weight
+from meal_max.models.stats_model import get_user_summary
 
-from sqlalchemy import event
-from sqlalchemy.exc import IntegrityError
 
-import logging 
-from db import db
 logger = logging.getLogger(__name__)
 
 
-@dataclass
-class CalorieTrackerModel(db.Model):
-    """
-    Represents a user in the calorie tracker application.
-
-    Attributes:
-        id (int): Primary key, unique identifier for each user.
-        username (str): Unique username for the user.
-        calorie_goal (int): Daily calorie goal set by the user.
-        starting_weight (float): User's starting weight.
-        salt (str): Salt used for password hashing.
-        password_hash (str): Hashed password for the user.
-        calorie_logs (relationship): Relationship to calorie intake logs.
-        weight_logs (relationship): Relationship to weight logs.
+class CalorieTrackerModel(User):
     """
-    __tablename__ = 'users'
-
-    id = db.Column(db.Integer, primary_key=True)
-    username = db.Column(db.String(50), unique=True, nullable=False)
-    calorie_goal = db.Column(db.Integer, nullable=False)
-    starting_weight = db.Column(db.Float, nullable=False)
-    salt = db.Column(db.String(128), nullable=False)
-    password_hash = db.Column(db.String(128), nullable=False)
+    A user together with the calorie and weight tracking operations.
 
-    # Relationships
-    calorie_logs = relationship('CalorieIntake', backref='user', lazy=True)
-    weight_logs = relationship('WeightLog', backref='user', lazy=True)
-
-    def __init__(self, username, password, calorie_goal, starting_weight):
-        """
-        Initializes a new user with the provided details.
-
-        Args:
-            username (str): The username of the user.
-            password (str): The raw password of the user.
-            calorie_goal (int): Daily calorie goal set by the user.
-            starting_weight (float): User's starting weight.
-        """
-        self.username = username
-        self.salt = self.generate_salt()
-        self.password_hash = self.generate_password_hash(password)
-        self.calorie_goal = calorie_goal
-        self.starting_weight = starting_weight
-
-    def generate_salt(self):
-        """Generate a random salt for password hashing."""
-        # Implement salt generation logic
-        pass
-
-    def generate_password_hash(self, password: str):
-        """Generate a hashed password using the salt."""
-        # Implement password hashing logic using self.salt
-        pass
+    This adds behaviour only: it maps to the same `users` table as User (single-table
+    inheritance without a discriminator), so rows created through either class are
+    the same accounts. See User for the columns.
+    """
 
     def find_user(self, username: str):
         """
@@ -109,8 +60,25 @@ class CalorieTrackerModel(db.Model):
 
         calorie_log = CalorieIntake(user_id=user_id, date=log_date, calories=calories)
         db.session.add(calorie_log)
+        rollup_calories(user_id, [(log_date, calories)])
         db.session.commit()
 
+    def log_calories_bulk(self, user_id: int, entries: List[dict]) -> List[dict]:
+        """
+        Logs many calorie intakes for a user in a single transaction.
+
+        Args:
+            user_id (int): ID of the user logging calories.
+            entries (List[dict]): Dicts with 'date' (date or YYYY-MM-DD string) and 'calories'.
+
+        Returns:
+            List[dict]: Per-entry status ('created', 'duplicate' or 'invalid'), in input order.
+        """
+        results = CalorieIntake.bulk_log(user_id, entries)
+        created = sum(1 for result in results if result['status'] == 'created')
+        logger.info(f"Bulk logged {created} of {len(entries)} calorie entries for user {user_id}.")
+        return results
+
     def log_weight(self, user_id: int, weight: float, log_date: date = None):
         """
         Logs weight for the user.
@@ -129,6 +97,7 @@ class CalorieTrackerModel(db.Model):
         log_date = log_date or date.today()
         weight_log = WeightLog(user_id=user_id, date=log_date, weight=weight)
         db.session.add(weight_log)
+        rollup_weight(user_id, log_date, weight)
         db.session.commit()
         logger.info(f"Logged weight {weight} for user {user_id} on {log_date}.")
 
@@ -147,6 +116,7 @@ class CalorieTrackerModel(db.Model):
             logger.error(f"Calorie log with ID {log_id} not found.")
             raise ValueError("Calorie log not found.")
         db.session.delete(log)
+        rollup_calories(log.user_id, [(log.date, log.calories)], removed=True)
         db.session.commit()
         logger.info(f"Deleted calorie log with ID {log_id}.")
 
@@ -154,19 +124,15 @@ class CalorieTrackerModel(db.Model):
         """
         Retrieves a summary of a user's calorie intake and weight logs.
 
+        The logs are aggregated per month in the database, so the summary grows with
+        the number of months logged rather than the number of entries.
+
         Args:
             username (str): Username of the user.
 
         Returns:
-            dict: A summary of the user's details, calorie logs, and weight logs.
+            dict: The user's details, all-time 'totals' and per-month 'monthly' stats.
         """
-        user = self.find_user(username)
-        summary = {
-            "username": user.username,
-            "calorie_goal": user.calorie_goal,
-            "starting_weight": user.starting_weight,
-            "calorie_logs": user.calorie_logs,
-            "weight_logs": user.weight_logs,
-        }
+        summary = get_user_summary(self.find_user(username))
         logger.info(f"Retrieved summary for {username}.")
         return summary
@@ -1,5 +1,13 @@
+import copy
 import logging
-from typing import Any, List
+import os
+import threading
+from collections import Counter
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import bson
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError, OperationFailure
 
 from meal_max.clients.mongo_client import sessions_collection
 from meal_max.utils.logger import configure_logger
@@ -9,16 +17,57 @@ logger = logging.getLogger(__name__)
 configure_logger(logger)
 
 
+# Deltas touching more combatants than this are written as a full list instead.
+SESSION_DELTA_MAX_ITEMS = int(os.environ.get('SESSION_DELTA_MAX_ITEMS', 64))
+# A session document is rewritten in full after this many delta writes in a row.
+SESSION_DELTA_MAX_WRITES = int(os.environ.get('SESSION_DELTA_MAX_WRITES', 32))
+
+
+class _Snapshot(NamedTuple):
+    """A session as this process last read it from MongoDB."""
+    combatants: List[Any]
+    # Replaced by every write, so a delta can require the document it was computed against.
+    version: Optional[bson.ObjectId]
+    # Delta writes since the document was last written in full.
+    delta_writes: int
+
+
+# The session of each logged-in user as loaded. A logout whose combatants still
+# match needs no write.
+_snapshots: Dict[int, _Snapshot] = {}
+_lock = threading.Lock()
+# The collection whose indexes have been ensured (swapped collections are re-checked).
+_indexed_collection = None
+# Logout write counters; see session_write_stats().
+_write_stats = Counter()
+
+
+def ensure_session_indexes() -> None:
+    """
+    Create the unique index on `user_id` that session lookups and upserts use.
+
+    Safe to call repeatedly; the session functions call it on first use. If existing
+    duplicate documents prevent a unique index, the error is logged and sessions
+    keep working without it.
+    """
+    global _indexed_collection
+    if _indexed_collection is sessions_collection:
+        return
+    try:
+        sessions_collection.create_index("user_id", unique=True)
+    except OperationFailure as e:
+        logger.error("Could not create the unique user_id index on sessions: %s", e)
+    _indexed_collection = sessions_collection
+
+
 def login_user(user_id: int, battle_model) -> None:
     """
     Load the user's combatants from MongoDB into the BattleModel's combatants list.
 
-    Checks if a session document exists for the given `user_id` in MongoDB.
-    If it exists, clears any current combatants in `battle_model` and loads
-    the stored combatants from MongoDB into `battle_model`.
-
-    If no session is found, it creates a new session document for the user
-    with an empty combatants list in MongoDB.
+    A single upsert on the indexed `user_id` finds the user's session document or,
+    if there is none, creates it with an empty combatants list, so login costs one
+    round trip. If a session existed, any current combatants in `battle_model` are
+    cleared and the stored ones are loaded.
 
     Args:
         user_id (int): The ID of the user whose session is to be loaded.
@@ -26,27 +75,55 @@ def login_user(user_id: int, battle_model) -> None:
                                     will be loaded.
     """
     logger.info("Attempting to log in user with ID %d.", user_id)
-    session = sessions_collection.find_one({"user_id": user_id})
+    ensure_session_indexes()
+    _load_combatants(user_id, upsert_session(user_id), battle_model)
 
-    if session:
-        logger.info("Session found for user ID %d. Loading combatants into BattleModel.", user_id)
-        battle_model.clear_combatants()
-        for combatant in session.get("combatants", []):
-            logger.debug("Preparing combatant: %s", combatant)
-            battle_model.prep_combatant(combatant)
-        logger.info("Combatants successfully loaded for user ID %d.", user_id)
-    else:
-        logger.info("No session found for user ID %d. Creating a new session with empty combatants list.", user_id)
-        sessions_collection.insert_one({"user_id": user_id, "combatants": []})
-        logger.info("New session created for user ID %d.", user_id)
 
-def logout_user(user_id: int, battle_model) -> None:
+def login_users(battle_models: Dict[int, Any]) -> None:
+    """
+    Log in many users at once: one `$in` query loads the existing sessions and one
+    bulk write creates the missing ones.
+
+    Args:
+        battle_models (Dict[int, BattleModel]): The BattleModel of each user ID to load.
+    """
+    ensure_session_indexes()
+    documents = _find_sessions(battle_models)
+    missing = [user_id for user_id in battle_models if user_id not in documents]
+    if missing:
+        sessions_collection.bulk_write([
+            UpdateOne({"user_id": user_id}, {"$setOnInsert": _new_session(user_id)}, upsert=True)
+            for user_id in missing
+        ], ordered=False)
+        logger.info("Created %d new sessions.", len(missing))
+    for user_id, battle_model in battle_models.items():
+        _load_combatants(user_id, documents.get(user_id), battle_model)
+
+
+def load_sessions(user_ids: Iterable[int]) -> Dict[int, List[Any]]:
+    """
+    Fetch the stored combatants of many users with a single `$in` query.
+
+    Args:
+        user_ids (Iterable[int]): IDs of the users.
+
+    Returns:
+        Dict[int, List]: Combatants by user ID. Users without a session are absent.
+    """
+    return {user_id: session.get("combatants", []) for user_id, session in _find_sessions(user_ids).items()}
+
+
+def logout_user(user_id: int, battle_model) -> int:
     """
     Store the current combatants from the BattleModel back into MongoDB.
 
-    Retrieves the current combatants from `battle_model` and attempts to store them in
-    the MongoDB session document associated with the given `user_id`. If no session
-    document exists for the user, raises a `ValueError`.
+    Only what changed since this process loaded the session is written: nothing if
+    the combatants are unchanged, otherwise the smallest of a `$pull`/`$push` of the
+    removed and appended combatants, a `$set` of the changed positions, or the
+    whole list (see _encode_update). A delta only applies to the document version
+    it was computed against; if another write got there first, the whole list is
+    written instead. If no session document exists for the user, raises a
+    `ValueError`.
 
     After saving the combatants to MongoDB, the combatants list in `battle_model` is
     cleared to ensure a fresh state for the next login.
@@ -56,6 +133,9 @@ def logout_user(user_id: int, battle_model) -> None:
         battle_model (BattleModel): An instance of `BattleModel` from which the user's
                                     current combatants are retrieved.
 
+    Returns:
+        int: BSON bytes of the update documents sent (0 if nothing changed).
+
     Raises:
         ValueError: If no session document is found for the user in MongoDB.
     """
@@ -63,16 +143,295 @@ def logout_user(user_id: int, battle_model) -> None:
     combatants_data = battle_model.get_combatants()
     logger.debug("Current combatants for user ID %d: %s", user_id, combatants_data)
 
-    result = sessions_collection.update_one(
-        {"user_id": user_id},
-        {"$set": {"combatants": combatants_data}},
-        upsert=False  # Prevents creating a new document if not found
-    )
+    operations = _versioned(user_id, _encode_update(user_id, combatants_data))
+    matched = _apply(operations)
+    if operations and matched < len(operations) and not _is_full(operations):
+        logger.warning("Session of user ID %d changed since it was loaded; writing it in full.", user_id)
+        _count('conflicts')
+        operations = _versioned(user_id, [full_update(combatants_data)])
+        matched = _apply(operations)
+    written = _record_write([update for _, update in operations], combatants_data)
 
-    if result.matched_count == 0:
-        logger.error("No session found for user ID %d. Logout failed.", user_id)
-        raise ValueError(f"User with ID {user_id} not found for logout.")
+    if operations:
+        if matched == 0:
+            logger.error("No session found for user ID %d. Logout failed.", user_id)
+            raise ValueError(f"User with ID {user_id} not found for logout.")
+        logger.info("Combatants successfully saved for user ID %d (%d bytes). Clearing BattleModel combatants.",
+                    user_id, written)
+    else:
+        logger.info("Combatants unchanged for user ID %d; nothing to save.", user_id)
 
-    logger.info("Combatants successfully saved for user ID %d. Clearing BattleModel combatants.", user_id)
+    _forget(user_id)
     battle_model.clear_combatants()
     logger.info("BattleModel combatants cleared for user ID %d.", user_id)
+    return written
+
+
+def logout_users(battle_models: Dict[int, Any]) -> int:
+    """
+    Log out many users at once, e.g. when their sessions expire.
+
+    Only the sessions whose combatants changed are written, delta-encoded as in
+    logout_user, in one bulk write. Sessions whose delta missed because they were
+    changed meanwhile, or which are missing from MongoDB, are then written in full
+    (recreated rather than reported) with a second bulk write.
+
+    Args:
+        battle_models (Dict[int, BattleModel]): The BattleModel of each user ID to save.
+
+    Returns:
+        int: The number of sessions written.
+    """
+    operations = []
+    deltas = {}
+    written = saved = 0
+    for user_id, battle_model in battle_models.items():
+        combatants_data = battle_model.get_combatants()
+        versioned = _versioned(user_id, _encode_update(user_id, combatants_data))
+        if not versioned:
+            continue
+        saved += 1
+        written += _record_write([update for _, update in versioned], combatants_data)
+        if _is_full(versioned):
+            operations.append(UpdateOne(*versioned[0], upsert=True))
+        else:
+            # Deltas assume the stored list matches the snapshot, so only full writes may upsert.
+            operations.extend(UpdateOne(*operation) for operation in versioned)
+            deltas[user_id] = (versioned[-1][1]["$set"]["session_version"], combatants_data)
+    if operations:
+        # Ordered, so a session's $pull lands before its $push.
+        result = sessions_collection.bulk_write(operations)
+        if deltas and result.matched_count + result.upserted_count < len(operations):
+            _rewrite_missed(deltas)
+    for user_id, battle_model in battle_models.items():
+        _forget(user_id)
+        battle_model.clear_combatants()
+    logger.info("Logged out %d users, saving %d changed sessions in %d bytes.", len(battle_models), saved, written)
+    return saved
+
+
+def upsert_session(user_id: int) -> Optional[dict]:
+    """
+    Fetch the user's session document in one round trip, creating an empty one if needed.
+
+    Args:
+        user_id (int): The ID of the user.
+
+    Returns:
+        Optional[dict]: The stored 'combatants', 'session_version' and 'delta_writes',
+                        or None if the session was just created.
+    """
+    ensure_session_indexes()
+    for attempt in range(2):
+        try:
+            return sessions_collection.find_one_and_update(
+                {"user_id": user_id},
+                {"$setOnInsert": _new_session(user_id)},
+                projection={"_id": 0, "combatants": 1, "session_version": 1, "delta_writes": 1},
+                upsert=True,
+                return_document=ReturnDocument.BEFORE
+            )
+        except DuplicateKeyError:
+            # A concurrent login created the document first; it matches on retry.
+            if attempt:
+                raise
+
+
+def full_update(combatants: List[Any]) -> dict:
+    """
+    Build the update document that stores `combatants` as the user's whole session.
+
+    Every writer of the combatants list must replace `session_version` like this,
+    so that deltas computed against an older version no longer apply.
+
+    Args:
+        combatants (List): The combatants to store.
+
+    Returns:
+        dict: The update document.
+    """
+    return {"$set": {"combatants": combatants, "session_version": bson.ObjectId(), "delta_writes": 0}}
+
+
+def _new_session(user_id: int) -> dict:
+    return {"user_id": user_id, "combatants": [], "session_version": bson.ObjectId(), "delta_writes": 0}
+
+
+def _find_sessions(user_ids: Iterable[int]) -> Dict[int, dict]:
+    """Fetch the session documents of many users with a single `$in` query."""
+    user_ids = list(user_ids)
+    if not user_ids:
+        return {}
+    ensure_session_indexes()
+    cursor = sessions_collection.find({"user_id": {"$in": user_ids}},
+                                      {"_id": 0, "user_id": 1, "combatants": 1, "session_version": 1,
+                                       "delta_writes": 1})
+    return {session["user_id"]: session for session in cursor}
+
+
+def _load_combatants(user_id: int, session: Optional[dict], battle_model) -> None:
+    """Load a stored session into `battle_model`; None means the session was just created."""
+    if session is None:
+        logger.info("No session found for user ID %d. Created a new session with empty combatants list.", user_id)
+        # Its version is unknown here, so the first logout writes it in full.
+        session = {}
+        combatants = []
+    else:
+        combatants = session.get("combatants", [])
+        logger.info("Session found for user ID %d. Loading combatants into BattleModel.", user_id)
+        battle_model.clear_combatants()
+        for combatant in combatants:
+            logger.debug("Preparing combatant: %s", combatant)
+            battle_model.prep_combatant(combatant)
+        logger.info("Combatants successfully loaded for user ID %d.", user_id)
+    with _lock:
+        _snapshots[user_id] = _Snapshot(copy.deepcopy(combatants), session.get("session_version"),
+                                        session.get("delta_writes", 0))
+
+
+def session_write_stats() -> dict:
+    """
+    Reports how logouts were written since the process started.
+
+    Returns:
+        dict: Counts of 'skipped' (unchanged), 'delta' and 'full' writes, the BSON
+              'bytes_written' and the 'full_bytes' that full writes would have cost,
+              and the 'conflicts' where a delta missed and was rewritten in full.
+    """
+    with _lock:
+        return {name: _write_stats[name] for name in
+                ('skipped', 'delta', 'full', 'bytes_written', 'full_bytes', 'conflicts')}
+
+
+def _encode_update(user_id: int, combatants: List[Any]) -> List[dict]:
+    """
+    Return the update documents that bring the stored session from the snapshot to
+    `combatants`: empty if nothing changed, otherwise the smallest encoding.
+
+    Candidates are a `$set` of the changed positions (same length only), and a
+    `$pull` of the removed combatants followed by a `$push` of the appended ones.
+    `$pull` removes every equal element, so that form only applies when the kept
+    combatants are exactly the old ones minus all copies of the removed ones, in
+    order. Without a versioned snapshot, after SESSION_DELTA_MAX_WRITES deltas in a
+    row, when a delta touches more than SESSION_DELTA_MAX_ITEMS combatants, or
+    when no delta is smaller, the whole list is written.
+    """
+    with _lock:
+        snapshot = _snapshots.get(user_id)
+    full = [full_update(combatants)]
+    if snapshot is None:
+        return full
+    old = snapshot.combatants
+    if old == combatants:
+        return []
+    if snapshot.version is None or snapshot.delta_writes >= SESSION_DELTA_MAX_WRITES:
+        return full
+
+    candidates = [full]
+    if len(old) == len(combatants):
+        changed = {f"combatants.{i}": new for i, (was, new) in enumerate(zip(old, combatants)) if was != new}
+        if len(changed) <= SESSION_DELTA_MAX_ITEMS:
+            candidates.append([{"$set": changed}])
+
+    new_keys = Counter(_item_key(item) for item in combatants)
+    old_keys = Counter(_item_key(item) for item in old)
+    removed = {key for key, count in old_keys.items() if count > new_keys[key]}
+    kept = [item for item in old if _item_key(item) not in removed]
+    added = combatants[len(kept):]
+    if combatants[:len(kept)] == kept and len(removed) + len(added) <= SESSION_DELTA_MAX_ITEMS:
+        delta = []
+        if removed:
+            removed_items = list({_item_key(item): item for item in old if _item_key(item) in removed}.values())
+            delta.append({"$pull": {"combatants": {"$in": removed_items}}})
+        if added:
+            delta.append({"$push": {"combatants": {"$each": added}}})
+        candidates.append(delta)
+
+    return min(candidates, key=_encoded_size)
+
+
+def _versioned(user_id: int, updates: List[dict]) -> List[Tuple[dict, dict]]:
+    """
+    Pair each update with its filter. A full write replaces whatever is stored; the
+    steps of a delta each require the version the previous step left, starting from
+    the snapshot's, and replace it with a new one. Versions are ObjectIds rather than
+    counters, so another writer can never leave the version a step expects.
+    """
+    if not updates:
+        return []
+    if "combatants" in updates[0].get("$set", {}):
+        return [({"user_id": user_id}, updates[0])]
+    with _lock:
+        version = _snapshots[user_id].version
+    operations = []
+    for step, update in enumerate(updates):
+        new_version = bson.ObjectId()
+        update = {**update, "$set": {**update.get("$set", {}), "session_version": new_version}}
+        if step == 0:
+            update["$inc"] = {"delta_writes": 1}
+        operations.append(({"user_id": user_id, "session_version": version}, update))
+        version = new_version
+    return operations
+
+
+def _is_full(operations: List[Tuple[dict, dict]]) -> bool:
+    return "session_version" not in operations[0][0]
+
+
+def _apply(operations: List[Tuple[dict, dict]]) -> int:
+    """Send one user's operations and return how many matched a document."""
+    if not operations:
+        return 0
+    if len(operations) == 1:
+        return sessions_collection.update_one(
+            *operations[0],
+            upsert=False  # Prevents creating a new document if not found
+        ).matched_count
+    # A $pull and a $push on the same array cannot share one update document.
+    return sessions_collection.bulk_write([UpdateOne(*operation) for operation in operations]).matched_count
+
+
+def _rewrite_missed(deltas: Dict[int, Tuple[int, List[Any]]]) -> None:
+    """Write in full the sessions whose delta did not leave the expected version behind."""
+    stored = {session["user_id"]: session.get("session_version") for session in
+              sessions_collection.find({"user_id": {"$in": list(deltas)}}, {"_id": 0, "user_id": 1, "session_version": 1})}
+    missed = [user_id for user_id, (version, _) in deltas.items() if stored.get(user_id) != version]
+    if not missed:
+        return
+    logger.warning("Sessions of %d users changed since they were loaded; writing them in full.", len(missed))
+    _count('conflicts', len(missed))
+    sessions_collection.bulk_write([
+        UpdateOne({"user_id": user_id}, full_update(deltas[user_id][1]), upsert=True) for user_id in missed
+    ])
+
+
+def _record_write(updates: List[dict], combatants: List[Any]) -> int:
+    """Count a logout's write in the stats and return its size in bytes."""
+    written = _encoded_size(updates)
+    with _lock:
+        if not updates:
+            _write_stats['skipped'] += 1
+            return 0
+        _write_stats['full' if "combatants" in updates[0]["$set"] else 'delta'] += 1
+        _write_stats['bytes_written'] += written
+        _write_stats['full_bytes'] += _encoded_size([full_update(combatants)])
+    return written
+
+
+def _count(name: str, amount: int = 1) -> None:
+    with _lock:
+        _write_stats[name] += amount
+
+
+def _encoded_size(updates: List[dict]) -> int:
+    return sum(len(bson.encode(update)) for update in updates)
+
+
+def _item_key(item: Any) -> bytes:
+    """A hashable stand-in for a combatant; equal combatants from the same source encode alike."""
+    return bson.encode({"v": item})
+
+
+def _forget(user_id: int) -> None:
+    with _lock:
+        _snapshots.pop(user_id, None)
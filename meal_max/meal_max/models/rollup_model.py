@@ -0,0 +1,205 @@
+import logging
+import os
+import sys
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func, select
+
+from meal_max.db import db, User, CalorieIntake, DailyRollup, WeeklyRollup, WeightLog, week_start
+from meal_max.utils.logger import configure_logger
+
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+
+ROLLUP_GRANULARITIES = ('day', 'week')
+ROLLUP_REBUILD_BATCH_USERS = int(os.environ.get('ROLLUP_REBUILD_BATCH_USERS', 500))
+
+_TABLES = {'day': (DailyRollup, 'day'), 'week': (WeeklyRollup, 'week_start')}
+
+
+def get_rollups(user_id: int, granularity: str = 'day',
+                date_from: Optional[date] = None, date_to: Optional[date] = None) -> List[dict]:
+    """
+    Reads a user's precomputed rollups, one row per period.
+
+    Args:
+        user_id (int): ID of the user.
+        granularity (str): One of ROLLUP_GRANULARITIES.
+        date_from (date, optional): Earliest period start to include.
+        date_to (date, optional): Latest period start to include.
+
+    Returns:
+        List[dict]: Periods oldest first, each with 'period' (YYYY-MM-DD),
+                    'total_calories', 'entry_count' and 'last_weight'.
+
+    Raises:
+        ValueError: If the granularity is not supported.
+    """
+    if granularity not in ROLLUP_GRANULARITIES:
+        raise ValueError(f"Granularity must be one of: {', '.join(ROLLUP_GRANULARITIES)}")
+
+    model, key = _TABLES[granularity]
+    period = getattr(model, key)
+    query = select(period, model.total_calories, model.entry_count, model.last_weight) \
+        .where(model.user_id == user_id)
+    if date_from:
+        query = query.where(period >= date_from)
+    if date_to:
+        query = query.where(period <= date_to)
+
+    return [
+        {'period': row[0].isoformat(), 'total_calories': row.total_calories,
+         'entry_count': row.entry_count, 'last_weight': row.last_weight}
+        for row in db.session.execute(query.order_by(period))
+    ]
+
+
+def rebuild_rollups(user_ids: Optional[Iterable[int]] = None,
+                    batch_size: int = ROLLUP_REBUILD_BATCH_USERS) -> int:
+    """
+    Recomputes rollups from the raw intake and weight tables.
+
+    Users are processed in batches: each batch's rollups are derived with two
+    grouped queries, its old rollup rows are deleted and the new ones are written
+    with executemany inserts, all in one transaction per batch.
+
+    Args:
+        user_ids (Iterable[int], optional): Users to rebuild. Defaults to every user.
+        batch_size (int): Number of users per batch.
+
+    Returns:
+        int: The number of rollup rows written.
+    """
+    written = 0
+    for batch in _user_batches(user_ids, batch_size):
+        expected = _compute_rollups(batch)
+        try:
+            for granularity, (model, key) in _TABLES.items():
+                model.query.filter(model.user_id.in_(batch)).delete(synchronize_session=False)
+                rows = [{'user_id': user_id, key: period, **values}
+                        for (user_id, period), values in expected[granularity].items()]
+                if rows:
+                    db.session.execute(model.__table__.insert(), rows)
+                written += len(rows)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        logger.info("Rebuilt rollups for %d users", len(batch))
+    return written
+
+
+def check_rollups(user_ids: Optional[Iterable[int]] = None,
+                  batch_size: int = ROLLUP_REBUILD_BATCH_USERS) -> List[dict]:
+    """
+    Compares stored rollups with rollups recomputed from the raw tables.
+
+    Args:
+        user_ids (Iterable[int], optional): Users to check. Defaults to every user.
+        batch_size (int): Number of users per batch.
+
+    Returns:
+        List[dict]: One entry per mismatching period with 'user_id', 'granularity',
+                    'period', 'expected' and 'actual' (either may be None if the
+                    row is missing on that side). Empty if everything matches.
+    """
+    mismatches = []
+    for batch in _user_batches(user_ids, batch_size):
+        expected = _compute_rollups(batch)
+        for granularity, (model, key) in _TABLES.items():
+            period = getattr(model, key)
+            columns = _value_columns(model, key)
+            actual = {
+                (row.user_id, row[1]): {column: getattr(row, column) for column in columns}
+                for row in db.session.execute(
+                    select(model.user_id, period, *(getattr(model, column) for column in columns))
+                    .where(model.user_id.in_(batch))
+                )
+            }
+            wanted = {row_key: {column: values[column] for column in columns}
+                      for row_key, values in expected[granularity].items()}
+            for user_id, row_period in sorted(wanted.keys() | actual.keys()):
+                if wanted.get((user_id, row_period)) != actual.get((user_id, row_period)):
+                    mismatches.append({
+                        'user_id': user_id,
+                        'granularity': granularity,
+                        'period': row_period.isoformat(),
+                        'expected': wanted.get((user_id, row_period)),
+                        'actual': actual.get((user_id, row_period)),
+                    })
+    if mismatches:
+        logger.warning("Found %d inconsistent rollup rows", len(mismatches))
+    return mismatches
+
+
+def _value_columns(model, key: str) -> List[str]:
+    """Every column of a rollup table besides its key, i.e. all that rebuild_rollups writes."""
+    return [column.name for column in model.__table__.columns if column.name not in ('user_id', key)]
+
+
+def _user_batches(user_ids: Optional[Iterable[int]], batch_size: int):
+    if user_ids is None:
+        user_ids = db.session.scalars(select(User.id).order_by(User.id)).all()
+    user_ids = list(user_ids)
+    for start in range(0, len(user_ids), batch_size):
+        yield user_ids[start:start + batch_size]
+
+
+def _compute_rollups(user_ids: List[int]) -> Dict[str, Dict[Tuple[int, date], dict]]:
+    """Derives daily and weekly rollup values for `user_ids` from the raw tables."""
+    days = {}
+    for row in db.session.execute(
+        select(CalorieIntake.user_id, CalorieIntake.date,
+               func.sum(CalorieIntake.calories), func.count())
+        .where(CalorieIntake.user_id.in_(user_ids))
+        .group_by(CalorieIntake.user_id, CalorieIntake.date)
+    ):
+        days[(row[0], row[1])] = {'total_calories': row[2], 'entry_count': row[3], 'last_weight': None}
+
+    ranked = (
+        select(WeightLog.user_id, WeightLog.date, WeightLog.weight,
+               func.row_number().over(partition_by=(WeightLog.user_id, WeightLog.date),
+                                      order_by=WeightLog.id.desc()).label('rank'))
+        .where(WeightLog.user_id.in_(user_ids))
+        .subquery()
+    )
+    for user_id, log_date, weight in db.session.execute(
+        select(ranked.c.user_id, ranked.c.date, ranked.c.weight).where(ranked.c.rank == 1)
+    ):
+        days.setdefault((user_id, log_date), {'total_calories': 0, 'entry_count': 0})['last_weight'] = weight
+
+    weeks = {}
+    for (user_id, day), values in sorted(days.items()):
+        week = weeks.setdefault((user_id, week_start(day)), {
+            'total_calories': 0, 'entry_count': 0, 'last_weight': None, 'last_weight_date': None
+        })
+        week['total_calories'] += values['total_calories']
+        week['entry_count'] += values['entry_count']
+        if values['last_weight'] is not None:
+            week['last_weight'] = values['last_weight']
+            week['last_weight_date'] = day
+
+    return {'day': days, 'week': weeks}
+
+
+if __name__ == '__main__':
+    # Rebuild or check rollups: python -m meal_max.models.rollup_model rebuild|check [user_id ...]
+    from app import create_app
+
+    command = sys.argv[1] if len(sys.argv) > 1 else 'check'
+    if command not in ('rebuild', 'check'):
+        sys.exit("Usage: python -m meal_max.models.rollup_model rebuild|check [user_id ...]")
+    selected = [int(user_id) for user_id in sys.argv[2:]] or None
+
+    with create_app().app_context():
+        if command == 'rebuild':
+            print(f"Wrote {rebuild_rollups(selected)} rollup rows")
+        else:
+            problems = check_rollups(selected)
+            for problem in problems:
+                print(problem)
+            print(f"{len(problems)} inconsistent rollup rows")
+            sys.exit(1 if problems else 0)
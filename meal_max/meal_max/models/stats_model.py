@@ -0,0 +1,202 @@
+import logging
+from datetime import date
+from typing import List, Optional
+
+from sqlalchemy import case, func, select
+
+from meal_max.db import db, CalorieIntake, WeightLog
+from meal_max.utils.logger import configure_logger
+
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+
+GRANULARITIES = ('day', 'week', 'month')
+
+
+def get_period_stats(user_id: int, calorie_goal: int, granularity: str = 'day',
+                     date_from: Optional[date] = None, date_to: Optional[date] = None) -> List[dict]:
+    """
+    Aggregates a user's calorie intake and weight logs per day, week or month.
+
+    All grouping happens in the database, so the work returned to Python (and the
+    size of the response built from it) grows with the number of periods rather
+    than the number of logged rows. Calories are first summed per day, so
+    `days_over_goal` counts days rather than entries. Weeks start on Monday and
+    each period is labelled with its first day.
+
+    Args:
+        user_id (int): ID of the user.
+        calorie_goal (int): The user's daily calorie goal.
+        granularity (str): One of GRANULARITIES.
+        date_from (date, optional): First date to include.
+        date_to (date, optional): Last date to include.
+
+    Returns:
+        List[dict]: One dict per period with data, oldest first, holding 'period'
+                    (YYYY-MM-DD), 'calories' and 'weight'. Either stats dict is None
+                    when the period has no logs of that kind.
+
+    Raises:
+        ValueError: If the granularity is not supported.
+    """
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"Granularity must be one of: {', '.join(GRANULARITIES)}")
+
+    periods = {}
+    for row in db.session.execute(_calorie_stats_query(user_id, calorie_goal, granularity, date_from, date_to)):
+        periods.setdefault(row.period, {'period': row.period, 'calories': None, 'weight': None})['calories'] = {
+            'total': row.total,
+            'mean': round(row.mean, 2),
+            'min': row.min,
+            'max': row.max,
+            'days_logged': row.days_logged,
+            'days_over_goal': row.days_over_goal,
+        }
+    for row in db.session.execute(_weight_stats_query(user_id, granularity, date_from, date_to)):
+        periods.setdefault(row.period, {'period': row.period, 'calories': None, 'weight': None})['weight'] = {
+            'start': row.start,
+            'end': row.end,
+            'delta': round(row.end - row.start, 2),
+            'mean': round(row.mean, 2),
+            'min': row.min,
+            'max': row.max,
+            'entries': row.entries,
+        }
+
+    logger.info("Aggregated %d %s periods for user %d", len(periods), granularity, user_id)
+    return [periods[period] for period in sorted(periods)]
+
+
+def summarize_periods(periods: List[dict]) -> dict:
+    """
+    Combines per-period stats from get_period_stats into all-time totals.
+
+    Args:
+        periods (List[dict]): Periods as returned by get_period_stats, oldest first.
+
+    Returns:
+        dict: 'calories' and 'weight' stats over the whole range, shaped like a
+              single period's (either is None if there are no logs of that kind).
+    """
+    calories = [period['calories'] for period in periods if period['calories']]
+    weights = [period['weight'] for period in periods if period['weight']]
+
+    calorie_totals = None
+    if calories:
+        total = sum(stats['total'] for stats in calories)
+        days = sum(stats['days_logged'] for stats in calories)
+        calorie_totals = {
+            'total': total,
+            'mean': round(total / days, 2),
+            'min': min(stats['min'] for stats in calories),
+            'max': max(stats['max'] for stats in calories),
+            'days_logged': days,
+            'days_over_goal': sum(stats['days_over_goal'] for stats in calories),
+        }
+
+    weight_totals = None
+    if weights:
+        entries = sum(stats['entries'] for stats in weights)
+        weight_totals = {
+            'start': weights[0]['start'],
+            'end': weights[-1]['end'],
+            'delta': round(weights[-1]['end'] - weights[0]['start'], 2),
+            'mean': round(sum(stats['mean'] * stats['entries'] for stats in weights) / entries, 2),
+            'min': min(stats['min'] for stats in weights),
+            'max': max(stats['max'] for stats in weights),
+            'entries': entries,
+        }
+
+    return {'calories': calorie_totals, 'weight': weight_totals}
+
+
+def get_user_summary(user) -> dict:
+    """
+    Builds a user's summary: profile fields, all-time totals and per-month stats.
+
+    Args:
+        user: A User row or cached profile with id, username, calorie_goal and starting_weight.
+
+    Returns:
+        dict: 'username', 'calorie_goal', 'starting_weight', 'totals' and 'monthly'.
+    """
+    monthly = get_period_stats(user.id, user.calorie_goal, 'month')
+    return {
+        "username": user.username,
+        "calorie_goal": user.calorie_goal,
+        "starting_weight": user.starting_weight,
+        "totals": summarize_periods(monthly),
+        "monthly": monthly,
+    }
+
+
+def _period_expression(column, granularity: str):
+    """Builds a SQL expression labelling `column` with the first day of its period, as YYYY-MM-DD."""
+    if db.session.get_bind().dialect.name == 'sqlite':
+        if granularity == 'day':
+            return func.date(column)
+        if granularity == 'week':
+            return func.date(column, 'weekday 0', '-6 days')
+        return func.strftime('%Y-%m-01', column)
+    return func.to_char(func.date_trunc(granularity, column), 'YYYY-MM-DD')
+
+
+def _date_filters(column, user_column, user_id, date_from, date_to):
+    filters = [user_column == user_id]
+    if date_from:
+        filters.append(column >= date_from)
+    if date_to:
+        filters.append(column <= date_to)
+    return filters
+
+
+def _calorie_stats_query(user_id, calorie_goal, granularity, date_from, date_to):
+    daily = (
+        select(CalorieIntake.date, func.sum(CalorieIntake.calories).label('calories'))
+        .where(*_date_filters(CalorieIntake.date, CalorieIntake.user_id, user_id, date_from, date_to))
+        .group_by(CalorieIntake.date)
+        .subquery()
+    )
+    period = _period_expression(daily.c.date, granularity)
+    return (
+        select(
+            period.label('period'),
+            func.sum(daily.c.calories).label('total'),
+            func.avg(daily.c.calories).label('mean'),
+            func.min(daily.c.calories).label('min'),
+            func.max(daily.c.calories).label('max'),
+            func.count().label('days_logged'),
+            func.sum(case((daily.c.calories > calorie_goal, 1), else_=0)).label('days_over_goal'),
+        )
+        .group_by(period)
+    )
+
+
+def _weight_stats_query(user_id, granularity, date_from, date_to):
+    period = _period_expression(WeightLog.date, granularity)
+    order = (WeightLog.date, WeightLog.id)
+    ranked = (
+        select(
+            period.label('period'),
+            WeightLog.weight,
+            func.first_value(WeightLog.weight).over(partition_by=period, order_by=order).label('first_weight'),
+            func.last_value(WeightLog.weight).over(partition_by=period, order_by=order,
+                                                   range_=(None, None)).label('last_weight'),
+        )
+        .where(*_date_filters(WeightLog.date, WeightLog.user_id, user_id, date_from, date_to))
+        .subquery()
+    )
+    return (
+        select(
+            ranked.c.period,
+            func.min(ranked.c.first_weight).label('start'),
+            func.min(ranked.c.last_weight).label('end'),
+            func.avg(ranked.c.weight).label('mean'),
+            func.min(ranked.c.weight).label('min'),
+            func.max(ranked.c.weight).label('max'),
+            func.count().label('entries'),
+        )
+        .group_by(ranked.c.period)
+    )
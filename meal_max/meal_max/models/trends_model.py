@@ -0,0 +1,218 @@
+import logging
+import math
+import os
+from datetime import date
+from typing import Dict, List, Optional
+
+import numpy as np
+from sqlalchemy import func, select
+
+from meal_max.db import db, CalorieIntake, WeightLog
+from meal_max.utils.logger import configure_logger
+
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+
+TRENDS_EWMA_SPAN = int(os.environ.get('TRENDS_EWMA_SPAN', 7))
+TRENDS_ROLLING_WINDOWS = (7, 30)
+TRENDS_REGRESSION_DAYS = int(os.environ.get('TRENDS_REGRESSION_DAYS', 90))
+TRENDS_MAX_PROJECTION_DAYS = int(os.environ.get('TRENDS_MAX_PROJECTION_DAYS', 3650))
+TRENDS_BATCH_USERS = int(os.environ.get('TRENDS_BATCH_USERS', 500))
+
+# Keeps users apart when (user, day) pairs are flattened into one sorted key.
+_USER_KEY_STRIDE = 10 ** 7
+
+
+def ewma(values: np.ndarray, span: int = TRENDS_EWMA_SPAN) -> np.ndarray:
+    """
+    Computes an exponentially weighted moving average without a per-element loop.
+
+    Uses alpha = 2 / (span + 1) and starts from the first value. The recurrence is
+    unrolled into a cumulative sum of rescaled values, evaluated in blocks short
+    enough that the rescaling factors stay within float64 range.
+
+    Args:
+        values (np.ndarray): The series, oldest first.
+        span (int): Smoothing span in samples.
+
+    Returns:
+        np.ndarray: The smoothed series, same length as `values`.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    out = np.empty_like(values)
+    if not len(values):
+        return out
+    alpha = 2.0 / (span + 1)
+    decay = 1.0 - alpha
+    if decay <= 0:
+        out[:] = values
+        return out
+
+    block = max(1, int(150 / -math.log10(decay)))
+    out[0] = previous = values[0]
+    for start in range(1, len(values), block):
+        chunk = values[start:start + block]
+        powers = decay ** np.arange(len(chunk) + 1)
+        # out[j] = decay^(j+1) * previous + alpha * sum_k decay^(j-k) * chunk[k]
+        scaled = np.cumsum(chunk / powers[:-1])
+        out[start:start + len(chunk)] = powers[1:] * previous + alpha * powers[:-1] * scaled
+        previous = out[start + len(chunk) - 1]
+    return out
+
+
+def compute_trends(calorie_goals: Dict[int, int], target_weights: Optional[Dict[int, float]] = None,
+                   include_series: bool = True) -> Dict[int, dict]:
+    """
+    Computes weight and calorie trends for many users in one pass.
+
+    Each batch of users costs two queries that are read straight into NumPy
+    column arrays. Regression sums, rolling means and adherence rates are then
+    computed for the whole batch at once with cumulative sums over the
+    (user, date)-sorted columns; only the EWMA recurrence runs per user.
+
+    Args:
+        calorie_goals (Dict[int, int]): Daily calorie goal per user ID.
+        target_weights (Dict[int, float], optional): Target weight per user ID, used
+            to project the date the weight trend reaches it.
+        include_series (bool): Whether to include the per-day series or only the summary.
+
+    Returns:
+        Dict[int, dict]: Per user ID, 'weight' and 'calories' trends. See the
+                         /trends/<username> route for the shape.
+    """
+    target_weights = target_weights or {}
+    user_ids = sorted(calorie_goals)
+    trends = {}
+    for start in range(0, len(user_ids), TRENDS_BATCH_USERS):
+        batch = np.array(user_ids[start:start + TRENDS_BATCH_USERS], dtype=np.int64)
+        goals = np.array([calorie_goals[user_id] for user_id in batch], dtype=np.float64)
+        targets = np.array([target_weights.get(user_id, np.nan) for user_id in batch], dtype=np.float64)
+        weight = _weight_trends(batch, targets, include_series)
+        calories = _calorie_trends(batch, goals, include_series)
+        for i, user_id in enumerate(batch.tolist()):
+            trends[user_id] = {'weight': weight[i], 'calories': calories[i]}
+    logger.info("Computed trends for %d users", len(user_ids))
+    return trends
+
+
+def _read_columns(query):
+    """Runs `query` for (user_id, date, value) rows and returns them as three arrays."""
+    rows = db.session.execute(query).all()
+    users = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+    days = np.fromiter((row[1].toordinal() for row in rows), dtype=np.int64, count=len(rows))
+    values = np.fromiter((row[2] for row in rows), dtype=np.float64, count=len(rows))
+    return users, days, values
+
+
+def _group_sums(values: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """Sums `values` over each [start, end) slice; empty slices sum to 0."""
+    totals = np.concatenate(([0.0], np.cumsum(values)))
+    return totals[ends] - totals[starts]
+
+
+def _weight_trends(user_ids: np.ndarray, targets: np.ndarray, include_series: bool) -> List[dict]:
+    users, days, weights = _read_columns(
+        select(WeightLog.user_id, WeightLog.date, WeightLog.weight)
+        .where(WeightLog.user_id.in_(user_ids.tolist()))
+        .order_by(WeightLog.user_id, WeightLog.date, WeightLog.id)
+    )
+    starts = np.searchsorted(users, user_ids, side='left')
+    ends = np.searchsorted(users, user_ids, side='right')
+    counts = ends - starts
+
+    # Least-squares slope over each user's last TRENDS_REGRESSION_DAYS, with x in
+    # days relative to their latest log so the sums stay small.
+    last_day = np.zeros(len(user_ids), dtype=np.int64)
+    last_day[counts > 0] = days[ends[counts > 0] - 1]
+    x = (days - np.repeat(last_day, counts)).astype(np.float64)
+    recent = (x > -TRENDS_REGRESSION_DAYS).astype(np.float64)
+    n = _group_sums(recent, starts, ends)
+    sx = _group_sums(recent * x, starts, ends)
+    sy = _group_sums(recent * weights, starts, ends)
+    sxx = _group_sums(recent * x * x, starts, ends)
+    sxy = _group_sums(recent * x * weights, starts, ends)
+    denominator = n * sxx - sx * sx
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slopes = np.where(denominator > 0, (n * sxy - sx * sy) / denominator, np.nan)
+
+    results = []
+    for i in range(len(user_ids)):
+        if not counts[i]:
+            results.append(None)
+            continue
+        user_days = days[starts[i]:ends[i]]
+        user_weights = weights[starts[i]:ends[i]]
+        smoothed = ewma(user_weights)
+        trend = {
+            'latest_trend': round(float(smoothed[-1]), 2),
+            'change': round(float(user_weights[-1] - user_weights[0]), 2),
+            'slope_per_week': None if np.isnan(slopes[i]) else round(float(slopes[i]) * 7, 3),
+            'projected_goal_date': _project(float(smoothed[-1]), slopes[i], targets[i], int(user_days[-1])),
+        }
+        if include_series:
+            trend['dates'] = [date.fromordinal(day).isoformat() for day in user_days.tolist()]
+            trend['values'] = user_weights.tolist()
+            trend['ewma'] = np.round(smoothed, 2).tolist()
+        results.append(trend)
+    return results
+
+
+def _calorie_trends(user_ids: np.ndarray, goals: np.ndarray, include_series: bool) -> List[dict]:
+    users, days, totals = _read_columns(
+        select(CalorieIntake.user_id, CalorieIntake.date, func.sum(CalorieIntake.calories))
+        .where(CalorieIntake.user_id.in_(user_ids.tolist()))
+        .group_by(CalorieIntake.user_id, CalorieIntake.date)
+        .order_by(CalorieIntake.user_id, CalorieIntake.date)
+    )
+    starts = np.searchsorted(users, user_ids, side='left')
+    ends = np.searchsorted(users, user_ids, side='right')
+    position = np.searchsorted(user_ids, users)
+
+    # Rolling means over calendar-day windows of logged days, for every user at once.
+    key = position * _USER_KEY_STRIDE + days
+    cumulative = np.concatenate(([0.0], np.cumsum(totals)))
+    index = np.arange(len(key))
+    rolling = {}
+    for window in TRENDS_ROLLING_WINDOWS:
+        left = np.searchsorted(key, key - (window - 1), side='left')
+        rolling[window] = (cumulative[index + 1] - cumulative[left]) / (index + 1 - left)
+
+    within_goal = _group_sums((totals <= goals[position]).astype(np.float64), starts, ends)
+
+    results = []
+    for i in range(len(user_ids)):
+        count = ends[i] - starts[i]
+        if not count:
+            results.append(None)
+            continue
+        user_slice = slice(starts[i], ends[i])
+        trend = {
+            'adherence': round(float(within_goal[i] / count), 3),
+            'days_logged': int(count),
+            'mean_daily': round(float(cumulative[ends[i]] - cumulative[starts[i]]) / count, 2),
+            **{f'latest_rolling_{window}': round(float(rolling[window][ends[i] - 1]), 2)
+               for window in TRENDS_ROLLING_WINDOWS},
+        }
+        if include_series:
+            trend['dates'] = [date.fromordinal(day).isoformat() for day in days[user_slice].tolist()]
+            trend['totals'] = totals[user_slice].astype(np.int64).tolist()
+            for window in TRENDS_ROLLING_WINDOWS:
+                trend[f'rolling_{window}'] = np.round(rolling[window][user_slice], 2).tolist()
+        results.append(trend)
+    return results
+
+
+def _project(current: float, slope: float, target: float, last_day: int) -> Optional[str]:
+    """Returns the date the trend reaches `target` at `slope` per day, or None if it never does."""
+    if np.isnan(target) or np.isnan(slope):
+        return None
+    if abs(target - current) < 0.05:
+        return date.fromordinal(last_day).isoformat()
+    if slope == 0:
+        return None
+    days_needed = (target - current) / slope
+    if days_needed < 0 or days_needed > TRENDS_MAX_PROJECTION_DAYS:
+        return None
+    return date.fromordinal(last_day + math.ceil(days_needed)).isoformat()
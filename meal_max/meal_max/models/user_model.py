@@ -1,10 +1,9 @@
-import hashlib
 import logging
-import os
+from typing import Optional
 
 from sqlalchemy.exc import IntegrityError
 
-from meal_max.db import db
+from meal_max.db import db, DEFAULT_CALORIE_GOAL, User, mark_user_changed
 from meal_max.utils.logger import configure_logger
 
 
@@ -12,43 +11,33 @@ logger = logging.getLogger(__name__)
 configure_logger(logger)
 
 
-class Users(db.Model):
-    __tablename__ = 'users'
+class Users:
+    """
+    Account operations by username, on the canonical User model in meal_max.db.
 
-    id = db.Column(db.Integer, primary_key=True)
-    username = db.Column(db.String(80), unique=True, nullable=False)
-    salt = db.Column(db.String(32), nullable=False)  # 16-byte salt in hex
-    password = db.Column(db.String(64), nullable=False)  # SHA-256 hash in hex
+    This used to be a separate model mapped to its own `users` table with unsalted
+    SHA-256 passwords. Accounts now live in one table and passwords are hashed with
+    User's hashing; rows migrated from the old table keep working until their
+    owner's next login re-hashes them.
+    """
 
     @classmethod
-    def _generate_hashed_password(cls, password: str) -> tuple[str, str]:
-        """
-        Generates a salted, hashed password.
-
-        Args:
-            password (str): The password to hash.
-
-        Returns:
-            tuple: A tuple containing the salt and hashed password.
-        """
-        salt = os.urandom(16).hex()
-        hashed_password = hashlib.sha256((password + salt).encode()).hexdigest()
-        return salt, hashed_password
-
-    @classmethod
-    def create_user(cls, username: str, password: str) -> None:
+    def create_user(cls, username: str, password: str, calorie_goal: int = DEFAULT_CALORIE_GOAL,
+                    starting_weight: Optional[float] = None) -> None:
         """
         Create a new user with a salted, hashed password.
 
         Args:
             username (str): The username of the user.
             password (str): The password to hash and store.
+            calorie_goal (int): Daily calorie goal of the user.
+            starting_weight (float, optional): Starting weight of the user.
 
         Raises:
             ValueError: If a user with the username already exists.
         """
-        salt, hashed_password = cls._generate_hashed_password(password)
-        new_user = cls(username=username, salt=salt, password=hashed_password)
+        new_user = User(username=username, password=password, calorie_goal=calorie_goal,
+                        starting_weight=starting_weight)
         try:
             db.session.add(new_user)
             db.session.commit()
@@ -77,17 +66,16 @@ class Users(db.Model):
         Raises:
             ValueError: If the user does not exist.
         """
-        user = cls.query.filter_by(username=username).first()
+        user = User.query.filter_by(username=username).first()
         if not user:
             logger.info("User %s not found", username)
             raise ValueError(f"User {username} not found")
-        hashed_password = hashlib.sha256((password + user.salt).encode()).hexdigest()
-        return hashed_password == user.password
+        return user.check_password(password)
 
     @classmethod
     def delete_user(cls, username: str) -> None:
         """
-        Delete a user from the database.
+        Delete a user from the database, along with their logs and rollups (by cascade).
 
         Args:
             username (str): The username of the user to delete.
@@ -95,10 +83,11 @@ class Users(db.Model):
         Raises:
             ValueError: If the user does not exist.
         """
-        user = cls.query.filter_by(username=username).first()
+        user = User.query.filter_by(username=username).first()
         if not user:
             logger.info("User %s not found", username)
             raise ValueError(f"User {username} not found")
+        mark_user_changed(user.id)
         db.session.delete(user)
         db.session.commit()
         logger.info("User %s deleted successfully", username)
@@ -117,7 +106,7 @@ class Users(db.Model):
         Raises:
             ValueError: If the user does not exist.
         """
-        user = cls.query.filter_by(username=username).first()
+        user = User.query.filter_by(username=username).first()
         if not user:
             logger.info("User %s not found", username)
             raise ValueError(f"User {username} not found")
@@ -135,13 +124,12 @@ class Users(db.Model):
         Raises:
             ValueError: If the user does not exist.
         """
-        user = cls.query.filter_by(username=username).first()
+        user = User.query.filter_by(username=username).first()
         if not user:
             logger.info("User %s not found", username)
             raise ValueError(f"User {username} not found")
 
-        salt, hashed_password = cls._generate_hashed_password(new_password)
-        user.salt = salt
-        user.password = hashed_password
+        user.salt = user.generate_salt()
+        user.password_hash = user.generate_password_hash(new_password)
         db.session.commit()
         logger.info("Password updated successfully for user: %s", username)
\ No newline at end of file
@@ -1,5 +1,6 @@
-from flask import Blueprint, app, jsonify
-from api_client import CalorieNinjasAPIClient
+from flask import Blueprint, Response, current_app, jsonify, request
+from api_client import CalorieNinjasAPIClient, normalize_query
+from meal_max.utils.nutrition_projection import ProjectionCache, parse_fields, project_items
 import os
 
 # Access the API key
@@ -8,14 +9,22 @@ api_client = CalorieNinjasAPIClient(api_key=API_KEY)
 
 nutrition_blueprint = Blueprint('nutrition', __name__)
 
-@app.route('/nutrition/<food>', methods=['GET'])
+MAX_BATCH_FOODS = int(os.getenv('MAX_BATCH_FOODS', 100))
+
+projection_cache = ProjectionCache()
+
+@nutrition_blueprint.route('/nutrition/<food>', methods=['GET'])
 def get_nutrition_route(food):
     """
-    Route to get full nutrition information for a food item.
+    Route to get nutrition information for a food item, optionally limited to some fields.
 
     Parameters:
         food (str): The name of the food item to get nutrition information for.
 
+    Query Parameters:
+        fields (str, optional): Comma-separated subset of calories, protein,
+                                carbohydrates and sugar. Defaults to all of them.
+
     Returns:
         JSON: A list of nutritional details for the specified food item, including:
               - name
@@ -25,25 +34,16 @@ def get_nutrition_route(food):
               - sugar
         HTTP Status Codes:
             - 200: Successful retrieval of nutrition data.
+            - 400: An unknown field was requested.
             - 404: No data found for the specified food item.
     """
-    data = api_client.get_nutrition(food)  # Use the api_client instance
-
-    if "items" not in data:
-        return jsonify({"error": "No data found"}), 404
-    
-    nutrition_data = [
-        {
-            "name": item["name"],
-            "calories": item["calories"],
-            "protein": item["protein_g"],
-            "carbohydrates": item["carbohydrates_total_g"],
-            "sugar": item["sugar_g"]
-        } for item in data["items"]
-    ]
-    return jsonify(nutrition_data)
-
-@app.route('/calories/<food>', methods=['GET'])
+    try:
+        fields = parse_fields(request.args.get('fields'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return _projection_response(food, fields)
+
+@nutrition_blueprint.route('/calories/<food>', methods=['GET'])
 def get_calories(food):
     """
     Route to get calorie information for a food item.
@@ -57,15 +57,10 @@ def get_calories(food):
             - 200: Successful retrieval of calorie data.
             - 404: No data found for the specified food item.
     """
-    data = api_client.get_nutrition(food)
-    if "items" not in data:
-        return jsonify({"error": "No data found"}), 404
-    
-    calories_data = [{"name": item["name"], "calories": item["calories"]} for item in data["items"]]
-    return jsonify(calories_data)
+    return _projection_response(food, ("calories",))
 
 
-@app.route('/protein/<food>', methods=['GET'])
+@nutrition_blueprint.route('/protein/<food>', methods=['GET'])
 def get_protein(food):
     """
     Route to get protein information for a food item.
@@ -79,14 +74,9 @@ def get_protein(food):
             - 200: Successful retrieval of protein data.
             - 404: No data found for the specified food item.
     """
-    data = api_client.get_nutrition(food)  # Use get_nutrition directly here
-    if "items" not in data:
-        return jsonify({"error": "No data found"}), 404
+    return _projection_response(food, ("protein",))
 
-    protein_data = [{"name": item["name"], "protein": item["protein_g"]} for item in data["items"]]
-    return jsonify(protein_data)
-
-@app.route('/carbohydrates/<food>', methods=['GET'])
+@nutrition_blueprint.route('/carbohydrates/<food>', methods=['GET'])
 def get_carbohydrates(food):
     """
     Route to get carbohydrate information for a food item.
@@ -100,14 +90,9 @@ def get_carbohydrates(food):
             - 200: Successful retrieval of carbohydrate data.
             - 404: No data found for the specified food item.
     """
-    data = api_client.get_nutrition(food)
-    if "items" not in data:
-        return jsonify({"error": "No data found"}), 404
-
-    carbs_data = [{"name": item["name"], "carbohydrates": item["carbohydrates_total_g"]} for item in data["items"]]
-    return jsonify(carbs_data)
+    return _projection_response(food, ("carbohydrates",))
 
-@app.route('/sugar/<food>', methods=['GET'])
+@nutrition_blueprint.route('/sugar/<food>', methods=['GET'])
 def get_sugar(food):
     """
     Route to get sugar information for a food item.
@@ -121,12 +106,75 @@ def get_sugar(food):
             - 200: Successful retrieval of sugar data.
             - 404: No data found for the specified food item.
     """
-    data = api_client.get_nutrition(food)
-    if "items" not in data:
-        return jsonify({"error": "No data found"}), 404
+    return _projection_response(food, ("sugar",))
+
+@nutrition_blueprint.route('/nutrition/batch', methods=['POST'])
+def get_nutrition_batch():
+    """
+    Route to get full nutrition information for many food items in one request.
 
-    sugar_data = [{"name": item["name"], "sugar": item["sugar_g"]} for item in data["items"]]
-    return jsonify(sugar_data)
+    Duplicate foods are collapsed, cached foods are served directly, and the rest are
+    packed into as few upstream calls as possible. Each food gets its own status so a
+    single unknown item does not fail the whole batch.
 
-if __name__ == '__main__':
-    app.run(debug=True)
+    Request:
+        - foods (list[str]): The food items to look up (at most MAX_BATCH_FOODS).
+
+    Returns:
+        JSON: {"results": [...]} with one entry per distinct food, each holding:
+              - food: the normalized food name
+              - status: 200, 400 or 404 (or the upstream error code)
+              - nutrition: the list of nutritional details (on success)
+              - error: the error message (on failure)
+        HTTP Status Codes:
+            - 200: The batch was processed (check per-item status).
+            - 400: The request body is not a non-empty list of foods.
+    """
+    data = request.get_json(silent=True) or {}
+    foods = data.get('foods')
+
+    if not isinstance(foods, list) or not foods:
+        return jsonify({"error": "A non-empty list of foods is required"}), 400
+    if len(foods) > MAX_BATCH_FOODS:
+        return jsonify({"error": f"At most {MAX_BATCH_FOODS} foods can be requested at once"}), 400
+
+    results = []
+    valid_foods = []
+    for food in foods:
+        if isinstance(food, str) and food.strip():
+            valid_foods.append(food)
+        else:
+            results.append({"food": food, "status": 400, "error": "Food must be a non-empty string"})
+
+    for food, data in api_client.get_nutrition_batch(valid_foods).items():
+        if data.get("items"):
+            results.append({
+                "food": food,
+                "status": 200,
+                "nutrition": project_items(data["items"])
+            })
+        elif "error" in data and data["error"] != 404:
+            results.append({"food": food, "status": data["error"], "error": "Nutrition lookup failed"})
+        else:
+            results.append({"food": food, "status": 404, "error": "No data found"})
+
+    return jsonify({"results": results})
+
+
+def _projection_response(food: str, fields: tuple) -> Response:
+    """
+    Serves one projection of a food's nutrition data.
+
+    Every nutrition route funnels through here, so a food costs one cached fetch no
+    matter how many fields are requested, and each (food, fields) body is encoded
+    once and then written straight from the projection cache.
+    """
+    key = (normalize_query(food), fields)
+    body = projection_cache.get(key)
+    if body is None:
+        data = api_client.get_nutrition(food)
+        if "items" not in data:
+            return jsonify({"error": "No data found"}), 404
+        body = current_app.json.response(project_items(data["items"], fields)).get_data()
+        projection_cache.set(key, body)
+    return Response(body, mimetype='application/json')
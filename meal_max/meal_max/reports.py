@@ -0,0 +1,147 @@
+"""
+Nightly cohort report across all users.
+
+    python -m meal_max.reports [--output PATH] [--workers N] [--chunk-size N] [--database-uri URI]
+
+Users are split into chunks that run on a process pool. Each worker opens its own
+database connection, reads its chunk's intake and weight columns in bulk and
+computes the metrics with trends_model, so chunks share nothing and wall-clock
+time scales with the number of cores until the database becomes the bottleneck.
+The results are written as one compressed NumPy archive (.npz) holding one array
+per metric column, in user ID order.
+"""
+import argparse
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from flask import Flask
+
+from meal_max.db import db, User
+from meal_max.models.trends_model import compute_trends
+from meal_max.utils.logger import configure_logger
+
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+
+REPORT_DATABASE_URI = os.environ.get('DATABASE_URL', 'sqlite:///calorie_tracker.db')
+REPORT_OUTPUT_PATH = os.environ.get('REPORT_OUTPUT_PATH', 'cohort_report.npz')
+REPORT_CHUNK_USERS = int(os.environ.get('REPORT_CHUNK_USERS', 2000))
+
+# Column name -> (dtype, section of the compute_trends result, key within it).
+# Missing values are NaN for floats and 0 for counts.
+REPORT_COLUMNS = {
+    'days_logged': (np.int32, 'calories', 'days_logged'),
+    'adherence': (np.float32, 'calories', 'adherence'),
+    'mean_daily_calories': (np.float32, 'calories', 'mean_daily'),
+    'rolling_7_calories': (np.float32, 'calories', 'latest_rolling_7'),
+    'rolling_30_calories': (np.float32, 'calories', 'latest_rolling_30'),
+    'weight_change': (np.float32, 'weight', 'change'),
+    'weight_slope_per_week': (np.float32, 'weight', 'slope_per_week'),
+    'weight_trend': (np.float32, 'weight', 'latest_trend'),
+}
+
+# Per-process app, created by the pool initializer.
+_worker_app = None
+
+
+def run_report(output_path: str = REPORT_OUTPUT_PATH, database_uri: str = REPORT_DATABASE_URI,
+               workers: Optional[int] = None, chunk_size: int = REPORT_CHUNK_USERS) -> int:
+    """
+    Computes the cohort report for every user and writes it to `output_path`.
+
+    Args:
+        output_path (str): Destination .npz file. Written atomically via a temporary file.
+        database_uri (str): SQLAlchemy URI of the database to report on.
+        workers (int, optional): Worker processes. Defaults to the number of CPUs.
+        chunk_size (int): Users per chunk.
+
+    Returns:
+        int: The number of users in the report.
+    """
+    started = time.monotonic()
+    app = _make_app(database_uri)
+    with app.app_context():
+        users = db.session.execute(
+            db.select(User.id, User.username, User.calorie_goal).order_by(User.id)
+        ).all()
+        # Workers must not inherit this process's pooled connections.
+        db.engine.dispose()
+
+    user_ids = np.array([user.id for user in users], dtype=np.int64)
+    chunks = [(user_ids[i:i + chunk_size].tolist(), [user.calorie_goal for user in users[i:i + chunk_size]])
+              for i in range(0, len(users), chunk_size)]
+
+    columns = {name: [] for name in REPORT_COLUMNS}
+    if chunks:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(database_uri,)) as executor:
+            for chunk_columns in executor.map(_report_chunk, chunks):
+                for name, values in chunk_columns.items():
+                    columns[name].append(values)
+
+    arrays = {name: np.concatenate(parts) if parts else np.array([], dtype=REPORT_COLUMNS[name][0])
+              for name, parts in columns.items()}
+    tmp_path = f"{output_path}.tmp.npz"
+    np.savez_compressed(
+        tmp_path,
+        user_id=user_ids,
+        username=np.array([user.username for user in users], dtype=str),
+        calorie_goal=np.array([user.calorie_goal for user in users], dtype=np.int32),
+        **arrays
+    )
+    os.replace(tmp_path, output_path)
+    logger.info("Wrote cohort report for %d users in %d chunks to %s in %.1f s",
+                len(users), len(chunks), output_path, time.monotonic() - started)
+    return len(users)
+
+
+def _make_app(database_uri: str) -> Flask:
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_uri
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    return app
+
+
+def _init_worker(database_uri: str) -> None:
+    global _worker_app
+    _worker_app = _make_app(database_uri)
+
+
+def _report_chunk(chunk: Tuple[List[int], List[int]]) -> Dict[str, np.ndarray]:
+    """Computes the report columns for one chunk of users, in the chunk's order."""
+    user_ids, goals = chunk
+    with _worker_app.app_context():
+        trends = compute_trends(dict(zip(user_ids, goals)), include_series=False)
+        db.session.remove()
+
+    columns = {}
+    for name, (dtype, section, key) in REPORT_COLUMNS.items():
+        missing = np.nan if np.issubdtype(dtype, np.floating) else 0
+        values = []
+        for user_id in user_ids:
+            metrics = trends[user_id][section]
+            values.append(missing if metrics is None or metrics[key] is None else metrics[key])
+        columns[name] = np.array(values, dtype=dtype)
+    return columns
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog='python -m meal_max.reports', description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--output', default=REPORT_OUTPUT_PATH, help='Destination .npz file')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    parser.add_argument('--chunk-size', type=int, default=REPORT_CHUNK_USERS, help='Users per chunk')
+    parser.add_argument('--database-uri', default=REPORT_DATABASE_URI, help='SQLAlchemy database URI')
+    args = parser.parse_args(argv)
+    count = run_report(args.output, args.database_uri, args.workers, args.chunk_size)
+    print(f"Wrote report for {count} users to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,14 +1,63 @@
-from flask import Blueprint, app, request, jsonify
-from .models import User, CalorieIntake
-from . import db
-from werkzeug.security import generate_password_hash, check_password_hash
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
+from meal_max.clients.redis_client import redis_client
+from meal_max.db import db, User, CalorieIntake, WeightLog, mark_user_changed, rollup_calories
+from meal_max.models.rollup_model import ROLLUP_GRANULARITIES, get_rollups
+from meal_max.models.stats_model import GRANULARITIES, get_period_stats, get_user_summary
+from meal_max.models.trends_model import compute_trends
+from meal_max.utils.password_hasher import HasherBusyError, HasherTimeoutError
+from meal_max.utils.response_cache import ResponseCache
+from meal_max.utils.session_tokens import SessionStore
+from meal_max.utils.user_cache import UserProfile, UserProfileCache
+from sqlalchemy import and_, event, or_, select
+from sqlalchemy.exc import IntegrityError
 from datetime import datetime
+import base64
+import binascii
+import csv
+import heapq
+import io
+import json
+import os
+from urllib.parse import urlencode
+
+import redis
 
 user_blueprint = Blueprint('user', __name__)
 
+HISTORY_DEFAULT_LIMIT = int(os.getenv('HISTORY_DEFAULT_LIMIT', 100))
+HISTORY_MAX_LIMIT = int(os.getenv('HISTORY_MAX_LIMIT', 500))
+BULK_INTAKE_MAX_ROWS = int(os.getenv('BULK_INTAKE_MAX_ROWS', 50000))
+TRENDS_MAX_BATCH_USERS = int(os.getenv('TRENDS_MAX_BATCH_USERS', 1000))
+EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', 1000))
+EXPORT_FORMATS = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+EXPORT_CSV_COLUMNS = ['type', 'date', 'calories', 'weight']
+# Entity tags from If-None-Match checked before the user is looked up; clients send one.
+ETAG_MAX_CANDIDATES = 4
+# When set, user routes reject requests without a session token instead of only
+# rejecting invalid ones.
+SESSION_AUTH_REQUIRED = os.getenv('SESSION_AUTH_REQUIRED', 'false').lower() == 'true'
+
+user_cache = UserProfileCache(redis_client=redis_client)
+response_cache = ResponseCache(redis_client=redis_client)
+session_store = SessionStore(redis_client=redis_client)
+
+# Password hashes run on a bounded pool (see utils/password_hasher). When it is
+# saturated the request is refused up front rather than tying up a worker.
+@user_blueprint.errorhandler(HasherBusyError)
+def hasher_busy(e):
+    response = jsonify({'error': 'Too many sign-ins in progress, retry shortly'})
+    response.headers['Retry-After'] = '1'
+    return response, 429
+
+@user_blueprint.errorhandler(HasherTimeoutError)
+def hasher_timeout(e):
+    response = jsonify({'error': 'Password check timed out, retry shortly'})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
 # Routes
 # 1. Register a user and set a calorie goal (Create Account)
-@app.route('/create-account', methods=['POST'])
+@user_blueprint.route('/create-account', methods=['POST'])
 def create_account():
     """
     Create a new user account.
@@ -22,6 +71,7 @@ def create_account():
     Response:
         - 201: Account created successfully.
         - 400: Missing fields or user already exists.
+        - 429/503: Password hashing is saturated; retry after the Retry-After delay.
     """
     data = request.get_json()
     username = data.get('username')
@@ -36,27 +86,34 @@ def create_account():
     if existing_user:
         return jsonify({'error': 'User already exists'}), 400
 
-    hashed_password = generate_password_hash(password)  # Hash the password
-    new_user = User(username=username, password=hashed_password, calorie_goal=calorie_goal, starting_weight=starting_weight)
+    # User salts and hashes the password itself
+    new_user = User(username=username, password=password, calorie_goal=calorie_goal, starting_weight=starting_weight)
     db.session.add(new_user)
     db.session.commit()
     return jsonify({'message': 'User created successfully'}), 201
 
 # 2. Login (Authenticate User)
-@app.route('/login', methods=['POST'])
+@user_blueprint.route('/login', methods=['POST'])
 def login():
     """
-    Authenticate a user with username and password.
+    Authenticate a user with username and password and start a session.
+
+    The password is hashed once here. Later requests send the returned token as
+    `Authorization: Bearer <token>` and are checked against the session store instead.
+    A stored hash made with an older hash method is replaced by one made with the
+    current method, so the cost can be tuned without invalidating passwords.
 
     Request:
         - username (str): Username for the account.
         - password (str): Password for the account.
 
     Response:
-        - 200: Login successful.
+        - 200: Login successful, with the session token and its lifetime in seconds.
         - 400: Missing fields.
         - 404: User not found.
         - 401: Invalid password.
+        - 429/503: Password hashing is saturated; retry after the Retry-After delay.
+        - 503: The session could not be stored.
     """
     data = request.get_json()
     username = data.get('username')
@@ -70,17 +127,34 @@ def login():
         return jsonify({'error': 'User not found'}), 404
 
     # Check if the password matches the hashed password
-    if not check_password_hash(user.password, password):
+    if not user.check_password(password):
         return jsonify({'error': 'Invalid password'}), 401
 
-    return jsonify({'message': 'Login successful'}), 200
+    if user.password_needs_rehash():
+        try:
+            user.password_hash = user.generate_password_hash(password)
+            db.session.commit()
+        except (HasherBusyError, HasherTimeoutError):
+            # The old hash still works; upgrade it on a later login.
+            pass
+
+    try:
+        token = session_store.issue(username)
+    except redis.RedisError:
+        return jsonify({'error': 'Session store unavailable'}), 503
+    return jsonify({'message': 'Login successful', 'token': token, 'expires_in': session_store.ttl}), 200
 
 # 3. Update password
-@app.route('/update-password', methods=['PUT'])
+@user_blueprint.route('/update-password', methods=['PUT'])
 def update_password():
     """
     Update a user's password.
 
+    The current password is always required, so a leaked session token cannot be
+    used to take over the account; a session token, if sent, must also be valid.
+    Every session of the user is revoked before the new password is saved, and
+    the password is left unchanged if that fails.
+
     Request:
         - username (str): Username for the account.
         - current_password (str): Current password of the user.
@@ -90,7 +164,9 @@ def update_password():
         - 200: Password updated successfully.
         - 400: Missing fields.
         - 404: User not found.
-        - 401: Incorrect current password.
+        - 401: Incorrect current password or invalid session token.
+        - 429/503: Password hashing is saturated; retry after the Retry-After delay.
+        - 503: The user's sessions could not be revoked.
     """
     data = request.get_json()
     username = data.get('username')
@@ -100,21 +176,30 @@ def update_password():
     if not username or not current_password or not new_password:
         return jsonify({'error': 'Username, current password, and new password are required'}), 400
 
+    denied = _check_session(username)
+    if denied:
+        return denied
+
     user = User.query.filter_by(username=username).first()
     if not user:
         return jsonify({'error': 'User not found'}), 404
 
     # Check if the current password matches
-    if not check_password_hash(user.password, current_password):
+    if not user.check_password(current_password):
         return jsonify({'error': 'Incorrect current password'}), 401
 
     # Hash the new password and update
-    user.password = generate_password_hash(new_password)
+    user.password_hash = user.generate_password_hash(new_password)
+    try:
+        session_store.revoke_all(username)
+    except redis.RedisError:
+        db.session.rollback()
+        return jsonify({'error': 'Session store unavailable'}), 503
     db.session.commit()
     return jsonify({'message': 'Password updated successfully'}), 200
 
 # 4. Add daily calorie intake
-@app.route('/intake', methods=['POST'])
+@user_blueprint.route('/intake', methods=['POST'])
 def add_calorie_intake():
     """
     Log daily calorie intake for a user.
@@ -126,7 +211,7 @@ def add_calorie_intake():
 
     Response:
         - 201: Calorie intake logged successfully.
-        - 400: Missing fields or invalid date format.
+        - 400: Missing fields, calories that are not a positive integer, or invalid date format.
         - 404: User not found.
     """
     data = request.get_json()
@@ -136,8 +221,16 @@ def add_calorie_intake():
 
     if not username or not date_str or not calories:
         return jsonify({'error': 'Username, date, and calories are required'}), 400
+    try:
+        calories = CalorieIntake.parse_calories(calories)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
 
-    user = User.query.filter_by(username=username).first()
+    denied = _check_session(username)
+    if denied:
+        return denied
+
+    user = _find_user(username)
     if not user:
         return jsonify({'error': 'User not found'}), 404
 
@@ -146,39 +239,235 @@ def add_calorie_intake():
     except ValueError:
         return jsonify({'error': 'Invalid date format. Use YYYY-MM-DD'}), 400
 
-    intake = CalorieIntake(user_id=user.id, date=date, calories=calories)
-    db.session.add(intake)
-    db.session.commit()
+    try:
+        intake = CalorieIntake(user_id=user.id, date=date, calories=calories)
+        db.session.add(intake)
+        rollup_calories(user.id, [(date, calories)])
+        db.session.commit()
+    except IntegrityError:
+        if _deleted_meanwhile(username):
+            return jsonify({'error': 'User not found'}), 404
+        raise
     return jsonify({'message': 'Calorie intake added successfully'}), 201
 
 # 5. Get calorie intake history
-@app.route('/history/<username>', methods=['GET'])
+@user_blueprint.route('/history/<username>', methods=['GET'])
 def get_history(username):
     """
-    Retrieve a user's calorie intake history.
+    Retrieve one page of a user's calorie intake history, oldest first.
+
+    Pages are keyset-paginated on (date, id), so each page costs an index range scan
+    of at most `limit` rows no matter how much history the user has. Pages are
+    served from the response cache until the user's data changes, and a request
+    whose If-None-Match still matches gets a 304 without touching the database.
 
     Request:
         - username (str): Username for the account.
+        - from (str, optional): Earliest date to include, in YYYY-MM-DD format.
+        - to (str, optional): Latest date to include, in YYYY-MM-DD format.
+        - limit (int, optional): Page size (default HISTORY_DEFAULT_LIMIT, at most HISTORY_MAX_LIMIT).
+        - cursor (str, optional): The next_cursor returned with the previous page.
 
     Response:
-        - 200: History retrieved successfully.
+        - 200: History page retrieved successfully; next_cursor is null on the last page.
+        - 304: The page has not changed since the ETag sent in If-None-Match.
+        - 400: Invalid date, limit or cursor.
         - 404: User not found.
     """
-    user = User.query.filter_by(username=username).first()
+    denied = _check_session(username)
+    if denied:
+        return denied
+
+    try:
+        limit = int(request.args.get('limit', HISTORY_DEFAULT_LIMIT))
+    except ValueError:
+        return jsonify({'error': 'Limit must be an integer'}), 400
+    if not 1 <= limit <= HISTORY_MAX_LIMIT:
+        return jsonify({'error': f'Limit must be between 1 and {HISTORY_MAX_LIMIT}'}), 400
+
+    try:
+        date_from = _parse_date_arg('from')
+        date_to = _parse_date_arg('to')
+    except ValueError:
+        return jsonify({'error': 'Invalid date format. Use YYYY-MM-DD'}), 400
+
+    after = None
+    cursor = request.args.get('cursor')
+    if cursor:
+        try:
+            after = _decode_cursor(cursor)
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor'}), 400
+
+    not_modified = _not_modified(username, 'history')
+    if not_modified:
+        return not_modified
+
+    user = _find_user(username)
     if not user:
         return jsonify({'error': 'User not found'}), 404
 
-    intakes = CalorieIntake.query.filter_by(user_id=user.id).order_by(CalorieIntake.date).all()
-    history = [{'date': intake.date.strftime('%Y-%m-%d'), 'calories': intake.calories} for intake in intakes]
-
-    return jsonify({
+    return _cached_response(user, 'history', lambda: _history_page(user, limit, date_from, date_to, after))
+
+def _history_page(user, limit, date_from, date_to, after):
+    """Build one history page after the (date, id) in `after`, or from the start if it is None."""
+    query = db.session.query(CalorieIntake.id, CalorieIntake.date, CalorieIntake.calories) \
+        .filter(CalorieIntake.user_id == user.id)
+    if date_from:
+        query = query.filter(CalorieIntake.date >= date_from)
+    if date_to:
+        query = query.filter(CalorieIntake.date <= date_to)
+    if after:
+        after_date, after_id = after
+        query = query.filter(or_(
+            CalorieIntake.date > after_date,
+            and_(CalorieIntake.date == after_date, CalorieIntake.id > after_id)
+        ))
+
+    rows = query.order_by(CalorieIntake.date, CalorieIntake.id).limit(limit + 1).all()
+    next_cursor = _encode_cursor(rows[limit - 1].date, rows[limit - 1].id) if len(rows) > limit else None
+    history = [{'date': row.date.strftime('%Y-%m-%d'), 'calories': row.calories} for row in rows[:limit]]
+
+    return {
         'username': user.username,
         'calorie_goal': user.calorie_goal,
-        'history': history
-    }), 200
+        'history': history,
+        'next_cursor': next_cursor
+    }
+
+def _parse_date_arg(name):
+    """Parse an optional YYYY-MM-DD query parameter, raising ValueError if malformed."""
+    value = request.args.get(name)
+    return datetime.strptime(value, '%Y-%m-%d').date() if value else None
+
+def _encode_cursor(date, row_id):
+    """Encode the (date, id) of the last row on a page as an opaque cursor token."""
+    payload = json.dumps([date.isoformat(), row_id], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip('=')
+
+def _decode_cursor(cursor):
+    """Decode a cursor token back into (date, id), raising ValueError if it is malformed."""
+    try:
+        payload = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        date_str, row_id = json.loads(payload)
+        return datetime.strptime(date_str, '%Y-%m-%d').date(), int(row_id)
+    except (binascii.Error, TypeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+def _bearer_token():
+    """Return the token from an `Authorization: Bearer <token>` header, or None."""
+    scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+    return (token.strip() or None) if scheme.lower() == 'bearer' else None
+
+def _check_session(username):
+    """
+    Return an error response unless the request may act for `username`.
+
+    A bearer token, when sent, must be a live session of that user. Requests without
+    one are let through unless SESSION_AUTH_REQUIRED is set.
+    """
+    token = _bearer_token()
+    if token is None:
+        if SESSION_AUTH_REQUIRED:
+            return jsonify({'error': 'A session token is required'}), 401
+        return None
+    if not session_store.verify(token, username):
+        return jsonify({'error': 'Invalid or expired session token'}), 401
+    return None
+
+def _find_user(username):
+    """Return the cached profile of a user (id, username, calorie_goal, starting_weight), or None."""
+    return user_cache.get(username, _load_profile)
+
+def _deleted_meanwhile(username):
+    """
+    Roll back a write that failed its integrity checks and report whether the user is gone.
+
+    Another worker's profile cache can serve a deleted user for up to
+    USER_CACHE_LOCAL_TTL seconds, so a write for that user gets past _find_user and
+    fails on the foreign key instead. The stale profile is dropped here.
+    """
+    db.session.rollback()
+    if _load_profile(username) is not None:
+        return False
+    user_cache.invalidate(username)
+    return True
+
+def _load_profile(username):
+    """Read a user's profile from the database, or None if there is no such user."""
+    row = db.session.execute(
+        select(User.id, User.username, User.calorie_goal, User.starting_weight).where(User.username == username)
+    ).first()
+    return UserProfile(*row) if row else None
+
+def _cached_response(user, name, build):
+    """
+    Serve the JSON payload from build() through the response cache, with ETag support.
+
+    The entity tag is derived from the user's data version and the query string, so
+    a matching If-None-Match is answered with a 304 before any body is looked up or
+    built. If the version cannot be read the cache is bypassed.
+    """
+    version = response_cache.version(user.id)
+    if version is None:
+        return jsonify(build()), 200
+
+    etag = _etag(user.id, user.username, version, name)
+    if request.if_none_match.contains(etag):
+        return _conditional(Response(status=304), etag)
+    body = response_cache.get(etag)
+    if body is None:
+        body = current_app.json.response(build()).get_data()
+        response_cache.set(etag, body)
+    return _conditional(Response(body, mimetype='application/json'), etag)
+
+def _not_modified(username, name):
+    """
+    Return a 304 if If-None-Match names the current version of the response, or None.
+
+    Entity tags start with the user ID and hash in the username, so the ID is taken
+    from the tag itself and a matching revalidation costs one version read and no
+    database or user cache lookup. Deleting a user bumps the version, so a tag
+    outlives neither the user nor a change to their data. Anything else (no header,
+    a stale or foreign tag) returns None and takes the normal path.
+    """
+    for tag in list(request.if_none_match.as_set())[:ETAG_MAX_CANDIDATES]:
+        user_id, _, _ = tag.partition('-')
+        if not user_id.isdigit():
+            continue
+        version = response_cache.version(int(user_id))
+        if version is None:
+            return None
+        etag = _etag(int(user_id), username, version, name)
+        if etag == tag:
+            return _conditional(Response(status=304), etag)
+    return None
+
+def _etag(user_id, username, version, name):
+    params = urlencode(sorted(request.args.items(multi=True)))
+    return response_cache.etag(user_id, version, f"{name}/{username}", params)
+
+def _conditional(response, etag):
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+@event.listens_for(db.session, 'after_commit')
+def _bump_changed_users(session):
+    """Invalidate the cached responses and profiles of every user the transaction changed."""
+    changed = session.info.pop('changed_user_ids', None)
+    if changed:
+        response_cache.bump(changed)
+    for username in session.info.pop('changed_usernames', ()):
+        user_cache.invalidate(username)
+
+@event.listens_for(db.session, 'after_rollback')
+def _forget_changed_users(session):
+    session.info.pop('changed_user_ids', None)
+    session.info.pop('changed_usernames', None)
 
 # 7. Update calorie goal
-@app.route('/goal', methods=['PUT'])
+@user_blueprint.route('/goal', methods=['PUT'])
 def update_goal():
     """
     Update a user's calorie goal.
@@ -199,19 +488,24 @@ def update_goal():
     if not username or not new_goal:
         return jsonify({'error': 'Username and new calorie goal are required'}), 400
 
+    denied = _check_session(username)
+    if denied:
+        return denied
+
     user = User.query.filter_by(username=username).first()
     if not user:
         return jsonify({'error': 'User not found'}), 404
 
     user.calorie_goal = new_goal
+    mark_user_changed(user.id)
     db.session.commit()
     return jsonify({'message': 'Calorie goal updated successfully'}), 200
 
 # 8. Delete user 
-@app.route('/delete/<username>', methods=['DELETE'])
+@user_blueprint.route('/delete/<username>', methods=['DELETE'])
 def delete_user(username):
     """
-    Delete a user and their calorie intake history.
+    Delete a user and all of their logs.
 
     Request:
         - username (str): Username for the account.
@@ -219,13 +513,379 @@ def delete_user(username):
     Response:
         - 200: User deleted successfully.
         - 404: User not found.
+        - 503: The user's sessions could not be revoked; nothing was deleted.
     """
+    denied = _check_session(username)
+    if denied:
+        return denied
+
     user = User.query.filter_by(username=username).first()
     if not user:
         return jsonify({'error': 'User not found'}), 404
 
-    CalorieIntake.query.filter_by(user_id=user.id).delete()
+    # Revoke first: a session left behind would be valid for a new account that
+    # reuses the username.
+    try:
+        session_store.revoke_all(username)
+    except redis.RedisError:
+        return jsonify({'error': 'Session store unavailable'}), 503
+
+    # The user's logs and rollups go with it through ON DELETE CASCADE.
+    mark_user_changed(user.id)
     db.session.delete(user)
     db.session.commit()
     return jsonify({'message': 'User deleted successfully'}), 200
 
+# 9. Export full intake and weight history
+@user_blueprint.route('/export/<username>', methods=['GET'])
+def export_history(username):
+    """
+    Stream a user's complete calorie intake and weight history.
+
+    Intake and weight rows are read through server-side cursors (yield_per) and
+    merged by date as they arrive, so memory stays constant however many rows the
+    user has and the first bytes are sent before the queries have finished.
+
+    Request:
+        - username (str): Username for the account.
+        - format (str, optional): 'ndjson' (default) or 'csv'.
+
+    Response:
+        - 200: Streamed export. NDJSON lines look like
+               {"type": "intake", "date": "YYYY-MM-DD", "calories": 1800} or
+               {"type": "weight", "date": "YYYY-MM-DD", "weight": 75.0};
+               CSV has the columns type,date,calories,weight.
+        - 400: Unsupported format.
+        - 404: User not found.
+    """
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': f"Format must be one of: {', '.join(EXPORT_FORMATS)}"}), 400
+
+    denied = _check_session(username)
+    if denied:
+        return denied
+
+    user = _find_user(username)
+    if not user:
+        return jsonify({'error': 'User not found'}), 404
+
+    encode = _encode_ndjson if export_format == 'ndjson' else _encode_csv
+    response = Response(stream_with_context(_stream_export(user.id, encode, export_format == 'csv')),
+                        mimetype=EXPORT_FORMATS[export_format])
+    response.headers['Content-Disposition'] = f'attachment; filename="{username}-history.{export_format}"'
+    return response
+
+def _stream_export(user_id, encode, with_header):
+    """Yield encoded export chunks of up to EXPORT_BATCH_SIZE rows, oldest first."""
+    if with_header:
+        yield encode(EXPORT_CSV_COLUMNS)
+
+    intakes = db.session.execute(
+        select(CalorieIntake.date, CalorieIntake.id, CalorieIntake.calories)
+        .where(CalorieIntake.user_id == user_id)
+        .order_by(CalorieIntake.date, CalorieIntake.id)
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+    weights = db.session.execute(
+        select(WeightLog.date, WeightLog.id, WeightLog.weight)
+        .where(WeightLog.user_id == user_id)
+        .order_by(WeightLog.date, WeightLog.id)
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+    rows = heapq.merge(
+        (('intake', date, row_id, calories, None) for date, row_id, calories in intakes),
+        (('weight', date, row_id, None, weight) for date, row_id, weight in weights),
+        key=lambda row: row[1]
+    )
+
+    chunk = []
+    for kind, date, _, calories, weight in rows:
+        chunk.append(encode([kind, date.isoformat(), calories, weight]))
+        if len(chunk) >= EXPORT_BATCH_SIZE:
+            yield ''.join(chunk)
+            chunk = []
+    if chunk:
+        yield ''.join(chunk)
+
+def _encode_ndjson(row):
+    """Encode one export row as an NDJSON line, omitting the field it does not have."""
+    kind, date, calories, weight = row
+    record = {'type': kind, 'date': date}
+    if kind == 'intake':
+        record['calories'] = calories
+    else:
+        record['weight'] = weight
+    return json.dumps(record) + '\n'
+
+def _encode_csv(row):
+    """Encode one export row (or the header) as a CSV line."""
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator='\n').writerow(['' if value is None else value for value in row])
+    return buffer.getvalue()
+
+# 10. Add many calorie intakes at once
+@user_blueprint.route('/intake/bulk', methods=['POST'])
+def add_calorie_intake_bulk():
+    """
+    Log many calorie intakes for a user in one request and one transaction.
+
+    Intended for backfills from importers and wearables: the user is looked up once,
+    duplicate dates are detected with one set-based query, and all new rows are
+    written with a single multi-row insert.
+
+    Request:
+        - username (str): Username for the account.
+        - entries (list): Up to BULK_INTAKE_MAX_ROWS objects with 'date' (YYYY-MM-DD) and 'calories' (int).
+
+    Response:
+        - 200: Entries processed; per-row status is 'created', 'duplicate' or 'invalid'.
+        - 400: Missing username or entries, or too many entries.
+        - 404: User not found.
+    """
+    data = request.get_json(silent=True) or {}
+    username = data.get('username')
+    entries = data.get('entries')
+
+    if not username or not isinstance(entries, list) or not entries:
+        return jsonify({'error': 'Username and a non-empty list of entries are required'}), 400
+    if len(entries) > BULK_INTAKE_MAX_ROWS:
+        return jsonify({'error': f'At most {BULK_INTAKE_MAX_ROWS} entries can be logged at once'}), 400
+
+    denied = _check_session(username)
+    if denied:
+        return denied
+
+    user = _find_user(username)
+    if not user:
+        return jsonify({'error': 'User not found'}), 404
+
+    try:
+        results = CalorieIntake.bulk_log(user.id, entries)
+    except IntegrityError:
+        if _deleted_meanwhile(username):
+            return jsonify({'error': 'User not found'}), 404
+        raise
+    summary = {status: sum(1 for result in results if result['status'] == status)
+               for status in ('created', 'duplicate', 'invalid')}
+    return jsonify({**summary, 'results': results}), 200
+
+# 11. Get calorie and weight stats per period
+@user_blueprint.route('/stats/<username>', methods=['GET'])
+def get_stats(username):
+    """
+    Retrieve aggregated calorie and weight stats for a user per day, week or month.
+
+    Sums, means, min/max, days over the calorie goal and weight deltas are computed
+    in the database with GROUP BY, so the response holds one entry per period
+    rather than one per logged row.
+
+    Request:
+        - username (str): Username for the account.
+        - granularity (str, optional): 'day' (default), 'week' or 'month'.
+        - from (str, optional): Earliest date to include, YYYY-MM-DD.
+        - to (str, optional): Latest date to include, YYYY-MM-DD.
+
+    Response:
+        - 200: Periods with data, oldest first, with the user's calorie goal.
+        - 400: Unsupported granularity or invalid date.
+        - 404: User not found.
+    """
+    granularity = request.args.get('granularity', 'day')
+    if granularity not in GRANULARITIES:
+        return jsonify({'error': f"Granularity must be one of: {', '.join(GRANULARITIES)}"}), 400
+    try:
+        date_from = _parse_date_arg('from')
+        date_to = _parse_date_arg('to')
+    except ValueError:
+        return jsonify({'error': 'Invalid date format. Use YYYY-MM-DD'}), 400
+
+    denied = _check_session(username)
+    if denied:
+        return denied
+
+    user = _find_user(username)
+    if not user:
+        return jsonify({'error': 'User not found'}), 404
+
+    periods = get_period_stats(user.id, user.calorie_goal, granularity, date_from, date_to)
+    return jsonify({
+        'granularity': granularity,
+        'calorie_goal': user.calorie_goal,
+        'periods': periods
+    }), 200
+
+# 12. Get dashboard rollups
+@user_blueprint.route('/dashboard/<username>', methods=['GET'])
+def get_dashboard(username):
+    """
+    Retrieve a user's precomputed daily or weekly rollups.
+
+    Rollups are maintained in the same transaction as every intake and weight
+    write, so this reads one row per period and never touches the raw logs.
+
+    Request:
+        - username (str): Username for the account.
+        - granularity (str, optional): 'day' (default) or 'week'.
+        - from (str, optional): Earliest period to include, YYYY-MM-DD.
+        - to (str, optional): Latest period to include, YYYY-MM-DD.
+
+    Response:
+        - 200: Rollups, oldest first, with the user's calorie goal.
+        - 400: Unsupported granularity or invalid date.
+        - 404: User not found.
+    """
+    granularity = request.args.get('granularity', 'day')
+    if granularity not in ROLLUP_GRANULARITIES:
+        return jsonify({'error': f"Granularity must be one of: {', '.join(ROLLUP_GRANULARITIES)}"}), 400
+    try:
+        date_from = _parse_date_arg('from')
+        date_to = _parse_date_arg('to')
+    except ValueError:
+        return jsonify({'error': 'Invalid date format. Use YYYY-MM-DD'}), 400
+
+    denied = _check_session(username)
+    if denied:
+        return denied
+
+    user = _find_user(username)
+    if not user:
+        return jsonify({'error': 'User not found'}), 404
+
+    return jsonify({
+        'granularity': granularity,
+        'calorie_goal': user.calorie_goal,
+        'periods': get_rollups(user.id, granularity, date_from, date_to)
+    }), 200
+
+# 13. Get weight and calorie trends
+@user_blueprint.route('/trends/<username>', methods=['GET'])
+def get_trends(username):
+    """
+    Retrieve a user's weight trend line and rolling calorie means.
+
+    Request:
+        - username (str): Username for the account.
+        - target_weight (float, optional): Weight to project a goal date for.
+
+    Response:
+        - 200: 'weight' (EWMA series, weekly slope, projected goal date) and 'calories'
+               (daily totals, 7- and 30-day rolling means, goal adherence); either is
+               null if the user has no logs of that kind.
+        - 400: Invalid target weight.
+        - 404: User not found.
+    """
+    target_weight = request.args.get('target_weight')
+    try:
+        target_weight = float(target_weight) if target_weight is not None else None
+    except ValueError:
+        return jsonify({'error': 'Target weight must be a number'}), 400
+
+    denied = _check_session(username)
+    if denied:
+        return denied
+
+    user = _find_user(username)
+    if not user:
+        return jsonify({'error': 'User not found'}), 404
+
+    targets = {user.id: target_weight} if target_weight is not None else None
+    trends = compute_trends({user.id: user.calorie_goal}, targets)[user.id]
+    return jsonify({'username': username, 'calorie_goal': user.calorie_goal, **trends}), 200
+
+# 14. Get trend summaries for many users
+@user_blueprint.route('/trends-batch', methods=['POST'])
+def get_trends_batch():
+    """
+    Retrieve trend summaries (without the per-day series) for many users in one pass.
+
+    Every requested username is authorized as on the single-user routes, so a
+    session token only covers its own user.
+
+    Request:
+        - usernames (list): Up to TRENDS_MAX_BATCH_USERS usernames.
+        - target_weights (dict, optional): Target weight per username.
+
+    Response:
+        - 200: {'trends': {username: {...}}}; unknown usernames are listed under 'not_found'.
+        - 400: Missing or too many usernames, or non-numeric target weights.
+        - 401: The request may not act for one of the usernames.
+    """
+    data = request.get_json(silent=True) or {}
+    usernames = data.get('usernames')
+    target_weights = data.get('target_weights') or {}
+
+    if not isinstance(usernames, list) or not usernames or not all(isinstance(name, str) for name in usernames):
+        return jsonify({'error': 'A non-empty list of usernames is required'}), 400
+    if len(usernames) > TRENDS_MAX_BATCH_USERS:
+        return jsonify({'error': f'At most {TRENDS_MAX_BATCH_USERS} users can be requested at once'}), 400
+    if not isinstance(target_weights, dict) or not all(
+            isinstance(weight, (int, float)) and not isinstance(weight, bool) for weight in target_weights.values()):
+        return jsonify({'error': 'Target weights must be numbers keyed by username'}), 400
+
+    for username in usernames:
+        denied = _check_session(username)
+        if denied:
+            return denied
+
+    users = User.query.filter(User.username.in_(usernames)).all()
+    trends = compute_trends(
+        {user.id: user.calorie_goal for user in users},
+        {user.id: target_weights[user.username] for user in users if user.username in target_weights},
+        include_series=False
+    )
+    found = {user.username for user in users}
+    return jsonify({
+        'trends': {user.username: trends[user.id] for user in users},
+        'not_found': [username for username in usernames if username not in found]
+    }), 200
+
+# 15. Get user summary
+@user_blueprint.route('/summary/<username>', methods=['GET'])
+def get_summary(username):
+    """
+    Retrieve a user's profile with all-time totals and per-month stats.
+
+    The serialized summary is cached until the user's data changes and supports
+    conditional requests, so polling clients usually get a 304.
+
+    Request:
+        - username (str): Username for the account.
+
+    Response:
+        - 200: The summary.
+        - 304: The summary has not changed since the ETag sent in If-None-Match.
+        - 404: User not found.
+    """
+    denied = _check_session(username)
+    if denied:
+        return denied
+
+    not_modified = _not_modified(username, 'summary')
+    if not_modified:
+        return not_modified
+
+    user = _find_user(username)
+    if not user:
+        return jsonify({'error': 'User not found'}), 404
+
+    return _cached_response(user, 'summary', lambda: get_user_summary(user))
+
+# 16. Logout
+@user_blueprint.route('/logout', methods=['POST'])
+def logout():
+    """
+    End the session identified by the request's bearer token.
+
+    Request:
+        - Authorization header: Bearer <token> from /login.
+
+    Response:
+        - 200: Logged out (also when the session had already expired).
+        - 401: No session token sent.
+    """
+    token = _bearer_token()
+    if token is None:
+        return jsonify({'error': 'A session token is required'}), 401
+    session_store.revoke(token)
+    return jsonify({'message': 'Logged out successfully'}), 200
@@ -0,0 +1,181 @@
+import array
+import bisect
+import heapq
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from typing import List, Optional
+
+from meal_max.utils.food_table import FoodTable, normalize_food_name
+from meal_max.utils.logger import configure_logger
+
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+
+SUGGEST_REFRESH_INTERVAL = float(os.environ.get('SUGGEST_REFRESH_INTERVAL', 300))
+SUGGEST_MAX_ENTRIES = int(os.environ.get('SUGGEST_MAX_ENTRIES', 50000))
+SUGGEST_MAX_NAME_LENGTH = 64
+# Prefixes up to this length get their ranked completions precomputed.
+SUGGEST_PRECOMPUTED_PREFIX = 2
+SUGGEST_MAX_LIMIT = 25
+
+
+class _Snapshot:
+    """Immutable index state, swapped in whole so readers never need a lock."""
+
+    def __init__(self, names: List[str], scores: array.array, top: dict):
+        self.names = names
+        self.scores = scores
+        self.top = top
+
+
+class FoodSuggestIndex:
+    """
+    Ranked food-name autocomplete over the local food table and cached upstream items.
+
+    Names are held in one sorted list with a parallel uint32 popularity array, where a
+    name scores one point for being in the local table and one per cached upstream
+    entry that mentions it. Completions rank by score, then by length, then
+    alphabetically. Ranked completions for every prefix of up to
+    SUGGEST_PRECOMPUTED_PREFIX characters are precomputed, so the broad one- and
+    two-letter queries cost a dict lookup. Longer prefixes do a binary search and rank
+    only the matching slice.
+
+    Memory is bounded. Names are capped at SUGGEST_MAX_NAME_LENGTH characters and the
+    index keeps at most SUGGEST_MAX_ENTRIES names, dropping the lowest-scored ones.
+    Each entry costs roughly 60 bytes plus its name length: a str header, an 8-byte
+    list slot and a 4-byte score. The precomputed table adds at most
+    SUGGEST_MAX_LIMIT list slots per distinct short prefix. At the default cap the
+    whole index stays under about 5 MB.
+
+    The index is built in a background thread, first by start() when the app starts
+    and then again once it is older than `refresh_interval`; the old snapshot keeps
+    serving until the new one is ready. Until the first build finishes, suggest()
+    returns nothing rather than making a request wait for it.
+
+    A forked child (e.g. a gunicorn worker under --preload) can inherit the refresh
+    lock held by a build thread that does not exist in the child, which would block
+    every later refresh; call after_fork() in the child. food_routes registers it
+    for its `suggest_index` via os.register_at_fork.
+    """
+
+    def __init__(self, local_foods: Optional[FoodTable] = None, cache=None,
+                 refresh_interval: float = SUGGEST_REFRESH_INTERVAL,
+                 max_entries: int = SUGGEST_MAX_ENTRIES):
+        """
+        Initializes an empty index over the given sources. Nothing is read until
+        start() or build() is called.
+
+        Args:
+            local_foods (FoodTable, optional): Offline food table to index.
+            cache (NutritionCache, optional): Response cache whose items are indexed.
+            refresh_interval (float): Seconds before the index is rebuilt.
+            max_entries (int): Maximum number of names kept in the index.
+        """
+        self.local_foods = local_foods
+        self.cache = cache
+        self.refresh_interval = refresh_interval
+        self.max_entries = max_entries
+        self._snapshot = None
+        self._built_at = 0.0
+        self._refresh_lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._snapshot.names) if self._snapshot else 0
+
+    def start(self) -> None:
+        """Starts building the index in a background thread, unless a build is already running."""
+        self._start_refresh()
+
+    def after_fork(self) -> None:
+        """Releases a refresh inherited from the parent and marks the snapshot due for a rebuild."""
+        self._refresh_lock = threading.Lock()
+        self._built_at = 0.0
+
+    def build(self) -> None:
+        """Rebuilds the index synchronously from its sources."""
+        started = time.monotonic()
+        scores = Counter()
+        if self.local_foods is not None:
+            for i in range(len(self.local_foods)):
+                scores[self.local_foods.name(i)] += 1
+        if self.cache is not None:
+            for item in self.cache.iter_items():
+                name = normalize_food_name(str(item.get("name", "")))
+                if name:
+                    scores[name] += 1
+
+        entries = [(name, score) for name, score in scores.items() if len(name) <= SUGGEST_MAX_NAME_LENGTH]
+        if len(entries) > self.max_entries:
+            entries = heapq.nlargest(self.max_entries, entries, key=lambda entry: entry[1])
+        entries.sort()
+
+        names = [name for name, _ in entries]
+        score_array = array.array('I', (score for _, score in entries))
+
+        top = {}
+        for i in sorted(range(len(names)), key=lambda i: self._rank(names[i], score_array[i])):
+            name = names[i]
+            for length in range(1, min(SUGGEST_PRECOMPUTED_PREFIX, len(name)) + 1):
+                completions = top.setdefault(name[:length], [])
+                if len(completions) < SUGGEST_MAX_LIMIT:
+                    completions.append(name)
+
+        self._snapshot = _Snapshot(names, score_array, {prefix: tuple(completions) for prefix, completions in top.items()})
+        self._built_at = time.monotonic()
+        logger.info("Built food suggest index with %d names in %.1f ms",
+                    len(names), (self._built_at - started) * 1000)
+
+    def suggest(self, prefix: str, limit: int = 10) -> List[str]:
+        """
+        Returns ranked completions for `prefix`.
+
+        Args:
+            prefix (str): What the user has typed so far.
+            limit (int): Maximum number of completions (capped at SUGGEST_MAX_LIMIT).
+
+        Returns:
+            List[str]: Completions, best first; empty until the first build is done.
+        """
+        self._maybe_refresh()
+        snapshot = self._snapshot
+        prefix = normalize_food_name(prefix)
+        limit = max(0, min(limit, SUGGEST_MAX_LIMIT))
+        if snapshot is None or not prefix or not limit:
+            return []
+
+        if len(prefix) <= SUGGEST_PRECOMPUTED_PREFIX:
+            return list(snapshot.top.get(prefix, ())[:limit])
+
+        start = bisect.bisect_left(snapshot.names, prefix)
+        end = bisect.bisect_left(snapshot.names, prefix + '\uffff', start)
+        best = heapq.nsmallest(limit, range(start, end),
+                               key=lambda i: self._rank(snapshot.names[i], snapshot.scores[i]))
+        return [snapshot.names[i] for i in best]
+
+    def _maybe_refresh(self) -> None:
+        if self._snapshot is not None and time.monotonic() - self._built_at < self.refresh_interval:
+            return
+        self._start_refresh()
+
+    def _start_refresh(self) -> None:
+        if self._refresh_lock.acquire(blocking=False):
+            threading.Thread(target=self._refresh_in_background, daemon=True,
+                             name='food-suggest-refresh').start()
+
+    def _refresh_in_background(self) -> None:
+        try:
+            self.build()
+        except Exception as e:
+            logger.error("Failed to rebuild food suggest index: %s", e)
+            self._built_at = time.monotonic()
+        finally:
+            self._refresh_lock.release()
+
+    @staticmethod
+    def _rank(name: str, score: int) -> tuple:
+        return (-score, len(name), name)
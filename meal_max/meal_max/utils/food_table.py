@@ -0,0 +1,336 @@
+import array
+import csv
+import logging
+import mmap
+import os
+import struct
+import sys
+from collections import defaultdict
+from typing import Iterable, List, Optional, Tuple
+
+from meal_max.utils.logger import configure_logger
+
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+FOOD_TABLE_PATH = os.environ.get('FOOD_TABLE_PATH', os.path.join(DATA_DIR, 'foods.csv'))
+FOOD_INDEX_PATH = os.environ.get('FOOD_INDEX_PATH', os.path.join(DATA_DIR, 'foods.idx'))
+
+# Nutrient columns, in storage order, named as in CalorieNinjas items.
+FIELDS = ('calories', 'protein_g', 'carbohydrates_total_g', 'sugar_g')
+# Values in the bundled table are per 100 g, matching CalorieNinjas' default serving.
+SERVING_SIZE_G = 100.0
+
+# Binary index layout (native little-endian):
+#   header   magic(4s) version(I) count(I)
+#   offsets  (count + 1) x uint32 into the name blob
+#   values   count x len(FIELDS) x float32, row-major
+#   blob     sorted UTF-8 names, concatenated
+INDEX_MAGIC = b'MMFT'
+INDEX_VERSION = 1
+_HEADER = struct.Struct('<4sII')
+
+
+def normalize_food_name(name: str) -> str:
+    """
+    Normalizes a food name for lookup (lowercase, single spaces).
+
+    Args:
+        name (str): The raw food name.
+
+    Returns:
+        str: The normalized name.
+    """
+    return ' '.join(name.lower().split())
+
+
+class FoodTable:
+    """
+    Compact, read-only table of foods sorted by normalized name.
+
+    Names are kept as one UTF-8 blob plus a uint32 offsets array, and the nutrient
+    columns as a flat float32 array, so a table costs about 20 bytes plus the name
+    length per food and can be served straight out of a memory-mapped index file.
+    Exact and prefix lookups are binary searches over the sorted names; fuzzy
+    lookups use a trigram index that is built on first use.
+    """
+
+    def __init__(self, blob, offsets, values, mapping: Optional[mmap.mmap] = None):
+        """
+        Wraps pre-built columns. Use from_rows, from_csv or load_index instead.
+
+        Args:
+            blob: Concatenated UTF-8 names (bytes or memoryview).
+            offsets: count + 1 uint32 offsets into `blob`.
+            values: count * len(FIELDS) float32 nutrient values.
+            mapping (mmap.mmap, optional): The mapping backing the columns, if any.
+        """
+        self._blob = blob
+        self._offsets = offsets
+        self._values = values
+        self._mmap = mapping
+        self._trigrams = None
+        self._trigram_counts = None
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Tuple]) -> 'FoodTable':
+        """
+        Builds a table from (name, calories, protein_g, carbohydrates_total_g, sugar_g) rows.
+
+        Names are normalized; when a name repeats, the last row wins.
+
+        Args:
+            rows (Iterable[Tuple]): The food rows.
+
+        Returns:
+            FoodTable: An in-memory table.
+        """
+        foods = {}
+        for name, *nutrients in rows:
+            foods[normalize_food_name(name).encode()] = [float(value) for value in nutrients]
+
+        blob = bytearray()
+        offsets = array.array('I', [0])
+        values = array.array('f')
+        for name in sorted(foods):
+            blob += name
+            offsets.append(len(blob))
+            values.extend(foods[name])
+        return cls(bytes(blob), offsets, values)
+
+    @classmethod
+    def from_csv(cls, path: str) -> 'FoodTable':
+        """
+        Builds a table from a CSV file with a header row naming `name` and FIELDS.
+
+        Args:
+            path (str): Path to the CSV file.
+
+        Returns:
+            FoodTable: An in-memory table.
+        """
+        with open(path, newline='') as f:
+            rows = [(row['name'], *(row[field] for field in FIELDS)) for row in csv.DictReader(f)]
+        logger.info("Loaded %d foods from %s", len(rows), path)
+        return cls.from_rows(rows)
+
+    @classmethod
+    def load_index(cls, path: str) -> 'FoodTable':
+        """
+        Memory-maps a binary index written by save_index without copying it.
+
+        Args:
+            path (str): Path to the index file.
+
+        Returns:
+            FoodTable: A table backed by the mapping.
+
+        Raises:
+            ValueError: If the file is not a food index of a supported version.
+        """
+        with open(path, 'rb') as f:
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, count = _HEADER.unpack_from(mapping, 0)
+        if magic != INDEX_MAGIC or version != INDEX_VERSION or sys.byteorder != 'little':
+            mapping.close()
+            raise ValueError(f"Unsupported food index file: {path}")
+
+        view = memoryview(mapping)
+        start = _HEADER.size
+        offsets_end = start + (count + 1) * 4
+        values_end = offsets_end + count * len(FIELDS) * 4
+        offsets = view[start:offsets_end].cast('I')
+        values = view[offsets_end:values_end].cast('f')
+        blob = view[values_end:]
+        logger.info("Memory-mapped %d foods from %s", count, path)
+        return cls(blob, offsets, values, mapping)
+
+    def save_index(self, path: str) -> None:
+        """
+        Writes the table as a binary index that load_index can memory-map.
+
+        Args:
+            path (str): Destination path. Written atomically via a temporary file.
+        """
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, len(self)))
+            f.write(array.array('I', self._offsets).tobytes())
+            f.write(array.array('f', self._values).tobytes())
+            f.write(bytes(self._blob))
+        os.replace(tmp_path, path)
+        logger.info("Wrote food index with %d foods to %s", len(self), path)
+
+    def close(self) -> None:
+        """Releases the memory mapping, if any. The table must not be used afterwards."""
+        if self._mmap is not None:
+            for column in (self._offsets, self._values, self._blob):
+                column.release()
+            self._mmap.close()
+            self._mmap = None
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __contains__(self, name: str) -> bool:
+        return self.find(name) is not None
+
+    def name(self, index: int) -> str:
+        """Returns the normalized name stored at `index`."""
+        return self._name_bytes(index).decode()
+
+    def nutrients(self, index: int) -> dict:
+        """Returns the nutrient values stored at `index`, keyed by FIELDS."""
+        base = index * len(FIELDS)
+        return {field: round(self._values[base + i], 2) for i, field in enumerate(FIELDS)}
+
+    def find(self, name: str) -> Optional[int]:
+        """
+        Finds the row of an exact (normalized) name.
+
+        Args:
+            name (str): The food name.
+
+        Returns:
+            int: The row index, or None if the food is not in the table.
+        """
+        key = normalize_food_name(name).encode()
+        index = self._lower_bound(key)
+        if index < len(self) and self._name_bytes(index) == key:
+            return index
+        return None
+
+    def lookup(self, query: str) -> Optional[dict]:
+        """
+        Looks up a food and returns it shaped like a CalorieNinjas item.
+
+        A trailing plural "s" or "es" is dropped if the plural itself is not listed.
+
+        Args:
+            query (str): The food name.
+
+        Returns:
+            dict: The item (name, FIELDS and serving_size_g), or None if unknown.
+        """
+        name = normalize_food_name(query)
+        index = self.find(name)
+        for suffix in ('s', 'es'):
+            if index is None and name.endswith(suffix):
+                index = self.find(name[:-len(suffix)])
+        if index is None:
+            return None
+        return {"name": self.name(index), "serving_size_g": SERVING_SIZE_G, **self.nutrients(index)}
+
+    def prefix_search(self, prefix: str, limit: int = 10) -> List[str]:
+        """
+        Lists names starting with `prefix`, in alphabetical order.
+
+        Args:
+            prefix (str): The prefix to complete.
+            limit (int): Maximum number of names to return.
+
+        Returns:
+            List[str]: Matching names.
+        """
+        key = normalize_food_name(prefix).encode()
+        names = []
+        index = self._lower_bound(key)
+        while index < len(self) and len(names) < limit:
+            name = self._name_bytes(index)
+            if not name.startswith(key):
+                break
+            names.append(name.decode())
+            index += 1
+        return names
+
+    def fuzzy_search(self, query: str, limit: int = 10, min_score: float = 0.3) -> List[str]:
+        """
+        Lists names similar to `query` by trigram overlap, best match first.
+
+        Args:
+            query (str): The (possibly misspelled) food name.
+            limit (int): Maximum number of names to return.
+            min_score (float): Minimum Jaccard similarity of trigram sets.
+
+        Returns:
+            List[str]: Matching names.
+        """
+        if self._trigrams is None:
+            self._build_trigrams()
+
+        query_grams = _trigrams(normalize_food_name(query))
+        shared = defaultdict(int)
+        for gram in query_grams:
+            for index in self._trigrams.get(gram, ()):
+                shared[index] += 1
+
+        scored = []
+        for index, common in shared.items():
+            score = common / (len(query_grams) + self._trigram_counts[index] - common)
+            if score >= min_score:
+                scored.append((-score, self.name(index)))
+        return [name for _, name in sorted(scored)[:limit]]
+
+    def _name_bytes(self, index: int) -> bytes:
+        return bytes(self._blob[self._offsets[index]:self._offsets[index + 1]])
+
+    def _lower_bound(self, key: bytes) -> int:
+        lo, hi = 0, len(self)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._name_bytes(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _build_trigrams(self) -> None:
+        index = defaultdict(lambda: array.array('I'))
+        counts = array.array('H')
+        for i in range(len(self)):
+            grams = _trigrams(self.name(i))
+            counts.append(len(grams))
+            for gram in grams:
+                index[gram].append(i)
+        self._trigram_counts = counts
+        self._trigrams = dict(index)
+
+
+def _trigrams(name: str) -> set:
+    padded = f"  {name} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def load_food_table(csv_path: str = FOOD_TABLE_PATH, index_path: str = FOOD_INDEX_PATH) -> Optional[FoodTable]:
+    """
+    Loads the bundled food table, preferring a prebuilt index that is up to date.
+
+    Args:
+        csv_path (str): Path to the source CSV.
+        index_path (str): Path to the binary index built from it.
+
+    Returns:
+        FoodTable: The loaded table, or None if neither file is available.
+    """
+    csv_exists = bool(csv_path) and os.path.exists(csv_path)
+    if index_path and os.path.exists(index_path):
+        if not csv_exists or os.path.getmtime(index_path) >= os.path.getmtime(csv_path):
+            try:
+                return FoodTable.load_index(index_path)
+            except (OSError, ValueError, struct.error) as e:
+                logger.warning("Ignoring unreadable food index %s: %s", index_path, e)
+    if csv_exists:
+        return FoodTable.from_csv(csv_path)
+    logger.warning("No local food table found; all nutrition lookups will go upstream")
+    return None
+
+
+if __name__ == '__main__':
+    # Build the binary index: python -m meal_max.utils.food_table [csv_path] [index_path]
+    source = sys.argv[1] if len(sys.argv) > 1 else FOOD_TABLE_PATH
+    target = sys.argv[2] if len(sys.argv) > 2 else FOOD_INDEX_PATH
+    FoodTable.from_csv(source).save_index(target)
@@ -0,0 +1,94 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable, List, Optional, Tuple
+
+
+PROJECTION_CACHE_SIZE = int(os.environ.get('PROJECTION_CACHE_SIZE', 2048))
+PROJECTION_CACHE_TTL = int(os.environ.get('PROJECTION_CACHE_TTL', 5 * 60))
+
+# Public field name -> CalorieNinjas item key, in response order.
+NUTRITION_FIELDS = {
+    "calories": "calories",
+    "protein": "protein_g",
+    "carbohydrates": "carbohydrates_total_g",
+    "sugar": "sugar_g",
+}
+ALL_FIELDS = tuple(NUTRITION_FIELDS)
+
+
+def parse_fields(fields: Optional[str]) -> Tuple[str, ...]:
+    """
+    Parses a comma-separated `fields` query parameter.
+
+    Args:
+        fields (str, optional): e.g. "calories,protein". Empty or None means all fields.
+
+    Returns:
+        Tuple[str, ...]: The requested fields in canonical order, without duplicates.
+
+    Raises:
+        ValueError: If an unknown field is requested.
+    """
+    if not fields:
+        return ALL_FIELDS
+    requested = {field.strip().lower() for field in fields.split(',') if field.strip()}
+    unknown = requested - set(NUTRITION_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    return tuple(field for field in ALL_FIELDS if field in requested) or ALL_FIELDS
+
+
+def project_items(items: Iterable[dict], fields: Tuple[str, ...] = ALL_FIELDS) -> List[dict]:
+    """
+    Projects CalorieNinjas items onto the name plus the requested public fields.
+
+    Args:
+        items (Iterable[dict]): Upstream items.
+        fields (Tuple[str, ...]): Public field names from NUTRITION_FIELDS.
+
+    Returns:
+        List[dict]: One dict per item with "name" and each requested field.
+    """
+    keys = [(field, NUTRITION_FIELDS[field]) for field in fields]
+    return [{"name": item["name"], **{field: item[key] for field, key in keys}} for item in items]
+
+
+class ProjectionCache:
+    """
+    Small LRU of encoded projection bodies keyed by (normalized food, fields).
+
+    Repeat requests for the same projection skip both the lookup and the JSON
+    encode and are written straight from the cached bytes. Entries live for at
+    most `ttl` seconds, which should not exceed the nutrition cache's local TTL.
+    """
+
+    def __init__(self, max_entries: int = PROJECTION_CACHE_SIZE, ttl: int = PROJECTION_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, body = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return body
+
+    def set(self, key: tuple, body: bytes) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
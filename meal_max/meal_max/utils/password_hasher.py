@@ -0,0 +1,229 @@
+import hashlib
+import hmac
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Callable
+
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+from meal_max.utils.logger import configure_logger
+
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+
+# Any werkzeug method string, e.g. 'scrypt', 'scrypt:65536:8:1' or 'pbkdf2:sha256:1000000'.
+PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt')
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', min(4, os.cpu_count() or 1)))
+PASSWORD_HASH_MAX_PENDING = int(os.environ.get('PASSWORD_HASH_MAX_PENDING', 32))
+PASSWORD_HASH_TIMEOUT = float(os.environ.get('PASSWORD_HASH_TIMEOUT', 5))
+PASSWORD_HASH_LATENCY_SAMPLES = 1024
+# Prefix of hashes migrated from the old Users table: an unsalted SHA-256 hex digest
+# of the password with the user's salt appended. They verify until the next login
+# re-hashes them with the current method.
+LEGACY_SHA256_PREFIX = 'sha256$$'
+
+
+class HasherBusyError(Exception):
+    """Raised when the hashing queue is full and the request should be retried later."""
+
+
+class HasherTimeoutError(Exception):
+    """Raised when a queued hash did not finish within the timeout."""
+
+
+class PasswordHasher:
+    """
+    Runs password hashes on a small dedicated thread pool with a bounded queue.
+
+    Hashing is deliberately slow, so running it on request threads lets a burst of
+    signups or logins occupy every worker and stall cheap routes. Here at most
+    `workers` hashes run at once and at most `max_pending` may be queued or running;
+    beyond that a hash is refused immediately with HasherBusyError instead of piling
+    up, and a queued hash that takes longer than `timeout` raises
+    HasherTimeoutError. The scrypt and PBKDF2 implementations in hashlib release
+    the GIL, so threads are enough to keep hashing off the request path.
+
+    Hashes record their parameters (werkzeug's `method$salt$hash` format), so the
+    method can be changed at any time: existing hashes still verify, and
+    needs_rehash() tells the caller to re-hash on the next successful login.
+
+    Attributes:
+        completed (int): Hashes finished.
+        rejected (int): Hashes refused because the queue was full.
+        timed_out (int): Hashes the caller stopped waiting for.
+    """
+
+    def __init__(self, method: str = PASSWORD_HASH_METHOD, workers: int = PASSWORD_HASH_WORKERS,
+                 max_pending: int = PASSWORD_HASH_MAX_PENDING, timeout: float = PASSWORD_HASH_TIMEOUT):
+        """
+        Initializes the hasher. Worker threads are started on first use.
+
+        Args:
+            method (str): werkzeug hash method for new hashes.
+            workers (int): Hashes run concurrently.
+            max_pending (int): Hashes queued or running before new ones are refused.
+            timeout (float): Seconds a caller waits for its hash, including queueing.
+        """
+        self.method = method
+        self.workers = workers
+        self.max_pending = max(max_pending, workers)
+        self.timeout = timeout
+        self._executor = None
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=PASSWORD_HASH_LATENCY_SAMPLES)
+        self._method_prefix = _canonical_method(method)
+        self.completed = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    def hash(self, password: str) -> str:
+        """
+        Hashes a password with the current method.
+
+        Args:
+            password (str): The password (with any application salt already appended).
+
+        Returns:
+            str: The hash, in werkzeug's `method$salt$hash` format.
+
+        Raises:
+            HasherBusyError: If the queue is full.
+            HasherTimeoutError: If the hash did not finish in time.
+        """
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, pwhash: str, password: str) -> bool:
+        """
+        Checks a password against a stored hash, whatever method produced it.
+
+        Legacy SHA-256 hashes are cheap to check and are verified inline.
+
+        Args:
+            pwhash (str): The stored hash.
+            password (str): The password (with any application salt already appended).
+
+        Returns:
+            bool: True if the password matches.
+
+        Raises:
+            HasherBusyError: If the queue is full.
+            HasherTimeoutError: If the check did not finish in time.
+        """
+        if pwhash.startswith(LEGACY_SHA256_PREFIX):
+            digest = hashlib.sha256(password.encode()).hexdigest()
+            return hmac.compare_digest(digest, pwhash[len(LEGACY_SHA256_PREFIX):])
+        return self._run(check_password_hash, pwhash, password)
+
+    def needs_rehash(self, pwhash: str) -> bool:
+        """
+        Tells whether a stored hash was made with other parameters than the current method.
+
+        Args:
+            pwhash (str): The stored hash.
+
+        Returns:
+            bool: True if the hash should be replaced after the next successful login.
+        """
+        return pwhash.split('$', 1)[0] != self._method_prefix
+
+    def stats(self) -> dict:
+        """
+        Reports the hashing counters and latencies.
+
+        Latencies are measured from submission to completion, so they include time
+        spent queued, over the most recent PASSWORD_HASH_LATENCY_SAMPLES hashes.
+
+        Returns:
+            dict: Counters, the number of hashes queued or running, and latency
+                  percentiles in milliseconds (None before the first hash).
+        """
+        with self._lock:
+            samples = sorted(self._latencies)
+            stats = {
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "timed_out": self.timed_out,
+                "pending": self._pending,
+                "max_pending": self.max_pending,
+                "workers": self.workers,
+            }
+        for name, quantile in (('p50_ms', 0.5), ('p95_ms', 0.95), ('max_ms', 1.0)):
+            stats[name] = round(samples[min(int(quantile * len(samples)), len(samples) - 1)] * 1000, 2) if samples else None
+        return stats
+
+    def shutdown(self) -> None:
+        """Stops the worker threads after the queued hashes finish."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def _run(self, func: Callable, *args):
+        with self._lock:
+            admitted = self._pending < self.max_pending
+            if admitted:
+                self._pending += 1
+            else:
+                self.rejected += 1
+        if not admitted:
+            logger.warning("Password hashing queue is full (%d pending); refusing request", self.max_pending)
+            raise HasherBusyError("Too many password hashes in progress")
+
+        started = time.monotonic()
+        try:
+            future = self._get_executor().submit(func, *args)
+        except BaseException:
+            with self._lock:
+                self._pending -= 1
+            raise
+        future.add_done_callback(lambda _: self._finished(started))
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            # The hash keeps its slot until it actually finishes, so abandoned work
+            # still counts against the queue limit.
+            with self._lock:
+                self.timed_out += 1
+            logger.error("Password hash did not finish within %.1f s", self.timeout)
+            raise HasherTimeoutError("Password hashing timed out")
+
+    def _finished(self, started: float) -> None:
+        with self._lock:
+            self._pending -= 1
+            self.completed += 1
+            self._latencies.append(time.monotonic() - started)
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='password-hash')
+            return self._executor
+
+
+def _canonical_method(method: str) -> str:
+    """
+    Spells out a werkzeug method string with the defaults werkzeug fills in, as it
+    appears at the start of the hashes it makes (e.g. 'scrypt' -> 'scrypt:32768:8:1').
+
+    Raises:
+        ValueError: If the method is not one werkzeug supports.
+    """
+    name, *args = method.split(':')
+    if name == 'scrypt' and len(args) in (0, 3):
+        n, r, p = map(int, args) if args else (2 ** 15, 8, 1)
+        return f"scrypt:{n}:{r}:{p}"
+    if name == 'pbkdf2' and len(args) <= 2:
+        hash_name = args[0] if args else 'sha256'
+        iterations = int(args[1]) if len(args) == 2 else DEFAULT_PBKDF2_ITERATIONS
+        return f"pbkdf2:{hash_name}:{iterations}"
+    raise ValueError(f"Invalid hash method '{method}'.")
+
+
+password_hasher = PasswordHasher()
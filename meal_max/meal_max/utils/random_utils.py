@@ -1,4 +1,11 @@
 import logging
+import os
+import secrets
+import threading
+import time
+from collections import deque
+from typing import Callable, List
+
 import requests
 
 from meal_max.utils.logger import configure_logger
@@ -7,10 +14,25 @@ logger = logging.getLogger(__name__)
 configure_logger(logger)
 
 
+RANDOM_ORG_URL = "https://www.random.org/decimal-fractions/?num={num}&dec={dec}&col=1&format=plain&rnd=new"
+RANDOM_ORG_TIMEOUT = 5
+# random.org serves at most 10,000 fractions per request.
+RANDOM_ORG_MAX_NUM = 10000
+RANDOM_DECIMALS = 2
+RANDOM_BATCH_SIZE = min(int(os.environ.get('RANDOM_BATCH_SIZE', 1000)), RANDOM_ORG_MAX_NUM)
+# A refill starts in the background once fewer numbers than this are buffered.
+RANDOM_LOW_WATER = int(os.environ.get('RANDOM_LOW_WATER', 200))
+# Seconds to wait after a failed refill before asking random.org again.
+RANDOM_RETRY_INTERVAL = float(os.environ.get('RANDOM_RETRY_INTERVAL', 60))
+
+
 def get_random() -> float:
     """
     Fetches a random float between 0 and 1 from random.org.
 
+    This makes a request per call; use `random_pool.random()` where a buffered
+    number will do.
+
     Returns:
         float: The random number fetched from random.org.
 
@@ -18,27 +40,37 @@ def get_random() -> float:
         RuntimeError: If the request to random.org fails or returns an invalid response.
         ValueError: If the response from random.org is not a valid float.
     """
-    url = "https://www.random.org/decimal-fractions/?num=1&dec=2&col=1&format=plain&rnd=new"
+    random_number = fetch_random_batch(1)[0]
+    logger.info("Received random number: %.3f", random_number)
+    return random_number
+
+
+def fetch_random_batch(num: int, dec: int = RANDOM_DECIMALS) -> List[float]:
+    """
+    Fetches `num` random floats between 0 and 1 from random.org in one request.
+
+    Args:
+        num (int): How many numbers to fetch (at most RANDOM_ORG_MAX_NUM).
+        dec (int): Decimal places of each number.
+
+    Returns:
+        List[float]: The random numbers.
+
+    Raises:
+        RuntimeError: If the request to random.org fails.
+        ValueError: If the response from random.org is not a list of valid floats.
+    """
+    url = RANDOM_ORG_URL.format(num=num, dec=dec)
 
     try:
         # Log the request to random.org
         logger.info("Fetching random number from %s", url)
 
-        response = requests.get(url, timeout=5)
+        response = requests.get(url, timeout=RANDOM_ORG_TIMEOUT)
 
         # Check if the request was successful
         response.raise_for_status()
 
-        random_number_str = response.text.strip()
-
-        try:
-            random_number = float(random_number_str)
-        except ValueError:
-            raise ValueError("Invalid response from random.org: %s" % random_number_str)
-
-        logger.info("Received random number: %.3f", random_number)
-        return random_number
-
     except requests.exceptions.Timeout:
         logger.error("Request to random.org timed out.")
         raise RuntimeError("Request to random.org timed out.")
@@ -46,3 +78,141 @@ def get_random() -> float:
     except requests.exceptions.RequestException as e:
         logger.error("Request to random.org failed: %s", e)
         raise RuntimeError("Request to random.org failed: %s" % e)
+
+    lines = response.text.split()
+    try:
+        random_numbers = [float(line) for line in lines]
+    except ValueError:
+        raise ValueError("Invalid response from random.org: %s" % response.text.strip())
+    if len(random_numbers) != num:
+        raise ValueError("Invalid response from random.org: expected %d numbers, got %d" % (num, len(random_numbers)))
+    return random_numbers
+
+
+class RandomPool:
+    """
+    Serves random floats from a buffer that random.org refills in large batches.
+
+    One request fetches `batch_size` numbers, and a background thread fetches the
+    next batch once fewer than `low_water` remain, so callers take numbers from
+    memory and do not wait on the network. If the buffer runs dry because
+    random.org is slow or unavailable, numbers come from the operating system's
+    CSPRNG (`secrets`) with the same precision instead, and random.org is not
+    asked again for `retry_interval` seconds after a failure.
+
+    A forked child (e.g. a gunicorn worker under --preload) must not serve the
+    numbers its parent buffered, nor inherit a lock held by the parent's refill
+    thread, which does not exist in the child; call reset() in the child. The
+    module's `random_pool` does so via os.register_at_fork.
+    """
+
+    def __init__(self, batch_size: int = RANDOM_BATCH_SIZE, low_water: int = RANDOM_LOW_WATER,
+                 dec: int = RANDOM_DECIMALS, retry_interval: float = RANDOM_RETRY_INTERVAL,
+                 fetch: Callable[[int, int], List[float]] = None):
+        """
+        Initializes an empty pool. The first call to random() starts the first refill.
+
+        Args:
+            batch_size (int): Numbers fetched per request.
+            low_water (int): Buffered numbers below which a refill starts.
+            dec (int): Decimal places of each number.
+            retry_interval (float): Seconds between refill attempts after a failure.
+            fetch (Callable, optional): Fetches `(num, dec)` numbers. Defaults to
+                                        fetch_random_batch.
+        """
+        self.batch_size = batch_size
+        self.low_water = low_water
+        self.dec = dec
+        self.retry_interval = retry_interval
+        self.fetch = fetch or fetch_random_batch
+        self.reset()
+
+    def reset(self) -> None:
+        """Empties the buffer, starts over with fresh locks and zeroes the counters."""
+        self._buffer = deque()
+        self._refill_lock = threading.Lock()
+        self._retry_at = 0.0
+        self._lock = threading.Lock()
+        self.served = 0
+        self.fallbacks = 0
+        self.refills = 0
+        self.refill_failures = 0
+
+    def random(self) -> float:
+        """
+        Returns a random float between 0 and 1 without waiting on random.org.
+
+        Returns:
+            float: A buffered random.org number, or a local one if the buffer is empty.
+        """
+        if len(self._buffer) < self.low_water:
+            self._start_refill()
+        try:
+            number = self._buffer.popleft()
+        except IndexError:
+            self._count('fallbacks')
+            scale = 10 ** self.dec
+            return secrets.randbelow(scale) / scale
+        self._count('served')
+        return number
+
+    def refill(self) -> bool:
+        """
+        Fetches one batch into the buffer, waiting for it.
+
+        Returns:
+            bool: True if the batch was added.
+        """
+        try:
+            numbers = self.fetch(self.batch_size, self.dec)
+        except (RuntimeError, ValueError) as e:
+            self._count('refill_failures')
+            self._retry_at = time.monotonic() + self.retry_interval
+            logger.warning("Could not refill random numbers, using local randomness meanwhile: %s", e)
+            return False
+        self._buffer.extend(numbers)
+        self._count('refills')
+        logger.info("Buffered %d random numbers from random.org (%d available)", len(numbers), len(self._buffer))
+        return True
+
+    def stats(self) -> dict:
+        """
+        Reports the buffer depth and counters.
+
+        Returns:
+            dict: Buffered numbers ('depth'), 'low_water', numbers 'served' from the
+                  buffer, local 'fallbacks', and 'refills' and 'refill_failures'.
+        """
+        with self._lock:
+            return {
+                "depth": len(self._buffer),
+                "low_water": self.low_water,
+                "served": self.served,
+                "fallbacks": self.fallbacks,
+                "refills": self.refills,
+                "refill_failures": self.refill_failures,
+            }
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def _start_refill(self) -> None:
+        if time.monotonic() < self._retry_at:
+            return
+        if self._refill_lock.acquire(blocking=False):
+            threading.Thread(target=self._refill_in_background, daemon=True, name='random-refill').start()
+
+    def _refill_in_background(self) -> None:
+        try:
+            self.refill()
+        except Exception as e:
+            logger.error("Failed to refill random numbers: %s", e)
+            self._retry_at = time.monotonic() + self.retry_interval
+        finally:
+            self._refill_lock.release()
+
+
+random_pool = RandomPool()
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=random_pool.reset)
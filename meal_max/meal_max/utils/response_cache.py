@@ -0,0 +1,217 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable, Optional
+
+import redis
+
+from meal_max.utils.logger import configure_logger
+
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+
+RESPONSE_CACHE_TTL = int(os.environ.get('RESPONSE_CACHE_TTL', 10 * 60))
+RESPONSE_CACHE_LOCAL_SIZE = int(os.environ.get('RESPONSE_CACHE_LOCAL_SIZE', 1024))
+
+
+class ResponseCache:
+    """
+    Cache of serialized per-user responses, invalidated by bumping a per-user version.
+
+    Every cached body is stored under a key that embeds the user's current data
+    version, and every write to a user's data increments that version. Entries for
+    older versions are never read again and simply expire, so invalidation is one
+    INCR and a cached body never needs to be checked for staleness. Because a
+    versioned key's body can never change, bodies are also kept in a small
+    per-process LRU with no TTL of its own.
+
+    A missing version is seeded with the current time in microseconds rather than 0,
+    and bumps seed it the same way before incrementing. If the version key is evicted
+    or Redis restarts, the user's versions therefore start above every version used
+    before, and neither the LRU nor an old ETag can match a reused one.
+
+    The version doubles as the ETag, so a conditional request can be answered with
+    a 304 after a single Redis GET.
+
+    Attributes:
+        local_hits (int): Bodies served from the in-process LRU.
+        redis_hits (int): Bodies served from Redis.
+        misses (int): Bodies that had to be rebuilt.
+    """
+
+    def __init__(self, redis_client=None, ttl: int = RESPONSE_CACHE_TTL,
+                 max_entries: int = RESPONSE_CACHE_LOCAL_SIZE,
+                 key_prefix: str = 'resp:'):
+        """
+        Initializes the cache.
+
+        Args:
+            redis_client (redis.Redis, optional): Shared Redis tier holding versions and
+                                                  bodies. When omitted, versions and
+                                                  bodies are kept in process only.
+            ttl (int): Seconds a body lives in Redis.
+            max_entries (int): Maximum number of bodies held by the in-process LRU.
+            key_prefix (str): Prefix for Redis keys.
+        """
+        self.redis_client = redis_client
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.key_prefix = key_prefix
+        self._local = OrderedDict()
+        self._versions = {}
+        self._lock = threading.Lock()
+        self.local_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+
+    def version(self, user_id: int) -> Optional[int]:
+        """
+        Returns the user's current data version.
+
+        Args:
+            user_id (int): ID of the user.
+
+        Returns:
+            int: The version, or None if it cannot be read (the caller should then
+                 bypass the cache rather than risk serving stale data).
+        """
+        if self.redis_client is None:
+            with self._lock:
+                return self._versions.get(user_id, 0)
+        key = f"{self.key_prefix}version:{user_id}"
+        try:
+            raw = self.redis_client.get(key)
+            if raw is None:
+                self.redis_client.set(key, _version_seed(), nx=True)
+                raw = self.redis_client.get(key)
+        except redis.RedisError as e:
+            logger.warning("Failed to read response cache version for user %s: %s", user_id, e)
+            return None
+        return int(raw) if raw is not None else None
+
+    def bump(self, user_ids: Iterable[int]) -> None:
+        """
+        Marks the users' cached responses as stale. Call after committing a change.
+
+        Args:
+            user_ids (Iterable[int]): IDs of the users whose data changed.
+        """
+        for user_id in user_ids:
+            if self.redis_client is None:
+                with self._lock:
+                    self._versions[user_id] = self._versions.get(user_id, 0) + 1
+                continue
+            key = f"{self.key_prefix}version:{user_id}"
+            try:
+                pipe = self.redis_client.pipeline()
+                pipe.set(key, _version_seed(), nx=True)
+                pipe.incr(key)
+                pipe.execute()
+            except redis.RedisError as e:
+                logger.error("Failed to bump response cache version for user %s; cached responses "
+                             "may be stale for up to %d s: %s", user_id, self.ttl, e)
+
+    def etag(self, user_id: int, version: int, name: str, params: str = '') -> str:
+        """
+        Builds the entity tag of a response.
+
+        Args:
+            user_id (int): ID of the user.
+            version (int): The user's data version the response reflects.
+            name (str): Which response (e.g. the route name).
+            params (str): The canonical query parameters.
+
+        Returns:
+            str: The unquoted entity tag.
+        """
+        digest = hashlib.sha1(f"{name}?{params}".encode()).hexdigest()[:16]
+        return f"{user_id}-{version}-{digest}"
+
+    def get(self, etag: str) -> Optional[bytes]:
+        """
+        Looks up a serialized body by its entity tag, locally and then in Redis.
+
+        Args:
+            etag (str): Entity tag from etag().
+
+        Returns:
+            bytes: The body, or None on a miss.
+        """
+        with self._lock:
+            body = self._local.get(etag)
+            if body is not None:
+                self._local.move_to_end(etag)
+                self.local_hits += 1
+                return body
+
+        if self.redis_client is not None:
+            try:
+                body = self.redis_client.get(self.key_prefix + etag)
+            except redis.RedisError as e:
+                logger.warning("Failed to read cached response %s from Redis: %s", etag, e)
+            if body is not None:
+                self._store_local(etag, body)
+                with self._lock:
+                    self.redis_hits += 1
+                return body
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, etag: str, body: bytes) -> None:
+        """
+        Stores a serialized body in both tiers.
+
+        Args:
+            etag (str): Entity tag from etag().
+            body (bytes): The serialized response.
+        """
+        self._store_local(etag, body)
+        if self.redis_client is None:
+            return
+        try:
+            self.redis_client.setex(self.key_prefix + etag, self.ttl, body)
+        except redis.RedisError as e:
+            logger.warning("Failed to write cached response %s to Redis: %s", etag, e)
+
+    def clear(self) -> None:
+        """Drops every body from the in-process tier and resets the counters."""
+        with self._lock:
+            self._local.clear()
+            self.local_hits = 0
+            self.redis_hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        """
+        Reports the cache counters.
+
+        Returns:
+            dict: Hit/miss counts and the current size of the in-process tier.
+        """
+        with self._lock:
+            return {
+                "hits": self.local_hits + self.redis_hits,
+                "local_hits": self.local_hits,
+                "redis_hits": self.redis_hits,
+                "misses": self.misses,
+                "local_size": len(self._local),
+            }
+
+    def _store_local(self, etag: str, body: bytes) -> None:
+        with self._lock:
+            self._local[etag] = body
+            self._local.move_to_end(etag)
+            while len(self._local) > self.max_entries:
+                self._local.popitem(last=False)
+
+
+def _version_seed() -> int:
+    """The first version of a user without one: the current time in microseconds."""
+    return time.time_ns() // 1000
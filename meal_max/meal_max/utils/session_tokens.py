@@ -0,0 +1,162 @@
+import hashlib
+import hmac
+import logging
+import os
+import secrets
+import threading
+import time
+from typing import Optional
+
+import redis
+
+from meal_max.utils.logger import configure_logger
+
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+
+SESSION_TOKEN_TTL = int(os.environ.get('SESSION_TOKEN_TTL', 24 * 60 * 60))
+SESSION_TOKEN_BYTES = 32
+
+
+class SessionStore:
+    """
+    Opaque bearer tokens for users who have already proven their password.
+
+    A token is 32 random bytes, so it carries no data and cannot be forged. Only the
+    SHA-256 of each token is stored, under a key with the session TTL, so a dump of
+    the store does not leak usable tokens. Checking a token is one hash and one
+    lookup, which keeps the slow password hash out of every request after login.
+    Each user also has a set of their token hashes so all their sessions can be
+    revoked at once when the password changes or the account is deleted.
+    """
+
+    def __init__(self, redis_client=None, ttl: int = SESSION_TOKEN_TTL, key_prefix: str = 'session:'):
+        """
+        Initializes the store.
+
+        Args:
+            redis_client (redis.Redis, optional): Shared Redis holding the sessions. When
+                                                  omitted, sessions live in this process only.
+            ttl (int): Seconds a session stays valid after it is issued.
+            key_prefix (str): Prefix for Redis keys.
+        """
+        self.redis_client = redis_client
+        self.ttl = ttl
+        self.key_prefix = key_prefix
+        self._local = {}
+        self._lock = threading.Lock()
+
+    def issue(self, username: str) -> str:
+        """
+        Creates a session for a user whose password has just been verified.
+
+        Args:
+            username (str): The authenticated user.
+
+        Returns:
+            str: The bearer token.
+
+        Raises:
+            redis.RedisError: If the session could not be stored.
+        """
+        token = secrets.token_urlsafe(SESSION_TOKEN_BYTES)
+        digest = _digest(token)
+        if self.redis_client is None:
+            with self._lock:
+                self._local[digest] = (time.monotonic() + self.ttl, username)
+            return token
+
+        user_key = f"{self.key_prefix}user:{username}"
+        with self.redis_client.pipeline() as pipe:
+            pipe.setex(self.key_prefix + digest, self.ttl, username)
+            pipe.sadd(user_key, digest)
+            pipe.expire(user_key, self.ttl)
+            pipe.execute()
+        return token
+
+    def verify(self, token: str, username: str) -> bool:
+        """
+        Checks that a token is a live session of `username`.
+
+        Args:
+            token (str): The bearer token.
+            username (str): The user the request acts for.
+
+        Returns:
+            bool: True if the session is valid for that user. Unknown, expired and
+                  other users' tokens, as well as a store outage, yield False.
+        """
+        owner = self._owner(_digest(token))
+        return owner is not None and hmac.compare_digest(owner.encode(), username.encode())
+
+    def revoke(self, token: str) -> None:
+        """
+        Ends one session.
+
+        Args:
+            token (str): The bearer token.
+        """
+        digest = _digest(token)
+        if self.redis_client is None:
+            with self._lock:
+                self._local.pop(digest, None)
+            return
+        try:
+            owner = self.redis_client.get(self.key_prefix + digest)
+            self.redis_client.delete(self.key_prefix + digest)
+            if owner is not None:
+                self.redis_client.srem(f"{self.key_prefix}user:{owner.decode()}", digest)
+        except redis.RedisError as e:
+            logger.error("Failed to revoke session: %s", e)
+
+    def revoke_all(self, username: str) -> None:
+        """
+        Ends every session of a user.
+
+        Unlike revoke(), a failure is raised: callers revoke all sessions to lock
+        out old tokens (after a password change or account deletion) and must not
+        report success if that did not happen.
+
+        Args:
+            username (str): The user whose sessions are revoked.
+
+        Raises:
+            redis.RedisError: If the sessions could not be revoked.
+        """
+        if self.redis_client is None:
+            with self._lock:
+                for digest in [digest for digest, (_, owner) in self._local.items() if owner == username]:
+                    del self._local[digest]
+            return
+        user_key = f"{self.key_prefix}user:{username}"
+        try:
+            digests = self.redis_client.smembers(user_key)
+            keys = [self.key_prefix + digest.decode() for digest in digests]
+            self.redis_client.delete(user_key, *keys)
+        except redis.RedisError as e:
+            logger.error("Failed to revoke sessions of user %s: %s", username, e)
+            raise
+
+    def _owner(self, digest: str) -> Optional[str]:
+        if self.redis_client is None:
+            with self._lock:
+                entry = self._local.get(digest)
+                if entry is None:
+                    return None
+                expires_at, owner = entry
+                if expires_at <= time.monotonic():
+                    del self._local[digest]
+                    return None
+                return owner
+        try:
+            owner = self.redis_client.get(self.key_prefix + digest)
+        except redis.RedisError as e:
+            logger.error("Failed to read session: %s", e)
+            return None
+        return owner.decode() if owner is not None else None
+
+
+def _digest(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
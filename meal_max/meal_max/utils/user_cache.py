@@ -0,0 +1,201 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, NamedTuple, Optional
+
+import redis
+
+from meal_max.utils.logger import configure_logger
+
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+
+USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL', 60 * 60))
+USER_CACHE_LOCAL_TTL = int(os.environ.get('USER_CACHE_LOCAL_TTL', 5))
+USER_CACHE_LOCAL_SIZE = int(os.environ.get('USER_CACHE_LOCAL_SIZE', 10000))
+
+
+class UserProfile(NamedTuple):
+    """The non-secret user fields that routes need on nearly every request."""
+    id: int
+    username: str
+    calorie_goal: int
+    starting_weight: float
+
+
+class UserProfileCache:
+    """
+    Two-tier cache of user profiles keyed by username.
+
+    A small per-process LRU answers repeat lookups without leaving the worker and a
+    shared Redis tier answers them without touching the database. Writes that change
+    a profile invalidate it rather than overwrite it, and bump a per-user generation
+    in Redis. A miss reads the generation before loading the row and fills Redis
+    only if the generation is unchanged and no other reader filled it first (SET NX
+    under WATCH), so a reader that loaded the row before a write cannot put the old
+    profile back after the writer dropped it. LRUs may still serve an old value for
+    at most `local_ttl` seconds, which is why that TTL is kept short. Password
+    hashes and salts are never cached.
+
+    Attributes:
+        local_hits (int): Lookups answered by the in-process LRU.
+        redis_hits (int): Lookups answered by Redis.
+        misses (int): Lookups that went to the database.
+    """
+
+    def __init__(self, redis_client=None, ttl: int = USER_CACHE_TTL,
+                 local_ttl: int = USER_CACHE_LOCAL_TTL,
+                 max_entries: int = USER_CACHE_LOCAL_SIZE,
+                 key_prefix: str = 'user:', generation_prefix: str = 'user-gen:'):
+        """
+        Initializes the cache.
+
+        Args:
+            redis_client (redis.Redis, optional): Shared Redis tier. When omitted only
+                                                  the in-process LRU is used.
+            ttl (int): Seconds a profile lives in Redis.
+            local_ttl (int): Seconds a profile lives in the in-process LRU.
+            max_entries (int): Maximum number of profiles held by the in-process LRU.
+            key_prefix (str): Prefix for Redis profile keys.
+            generation_prefix (str): Prefix for Redis generation keys.
+        """
+        self.redis_client = redis_client
+        self.ttl = ttl
+        self.local_ttl = local_ttl
+        self.max_entries = max_entries
+        self.key_prefix = key_prefix
+        self.generation_prefix = generation_prefix
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+        self.local_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+
+    def get(self, username: str, loader: Callable[[str], Optional[UserProfile]]) -> Optional[UserProfile]:
+        """
+        Looks up a profile in the local tier, then in Redis, then through `loader`.
+
+        Profiles returned by the loader are written to both tiers unless the user
+        was invalidated while the loader ran. Unknown users are not cached, so a
+        freshly created account is visible immediately.
+
+        Args:
+            username (str): The username.
+            loader (Callable): Reads the profile from the database, returning None if
+                               there is no such user.
+
+        Returns:
+            UserProfile: The profile, or None if the user does not exist.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._local.get(username)
+            if entry is not None:
+                expires_at, profile = entry
+                if expires_at > now:
+                    self._local.move_to_end(username)
+                    self.local_hits += 1
+                    return profile
+                del self._local[username]
+
+        raw = self._redis_call('get', self.key_prefix + username)
+        if raw is not None:
+            profile = UserProfile(**json.loads(raw))
+            self._store_local(username, profile)
+            with self._lock:
+                self.redis_hits += 1
+            return profile
+
+        with self._lock:
+            self.misses += 1
+        generation = self._redis_call('get', self.generation_prefix + username)
+        profile = loader(username)
+        if profile is not None and self._fill(profile, generation):
+            self._store_local(username, profile)
+        return profile
+
+    def invalidate(self, username: str) -> None:
+        """
+        Drops a profile from both tiers and bumps its generation, so loads already
+        in flight do not cache the old row. Call after committing any change to the
+        user, including deletes.
+
+        Args:
+            username (str): The username.
+        """
+        if self.redis_client is not None:
+            generation_key = self.generation_prefix + username
+            try:
+                pipe = self.redis_client.pipeline()
+                pipe.incr(generation_key)
+                pipe.expire(generation_key, self.ttl)
+                pipe.delete(self.key_prefix + username)
+                pipe.execute()
+            except redis.RedisError as e:
+                logger.warning("User cache invalidate for '%s' failed in Redis: %s", username, e)
+        with self._lock:
+            self._local.pop(username, None)
+
+    def clear(self) -> None:
+        """Drops every entry from the in-process tier and resets the counters."""
+        with self._lock:
+            self._local.clear()
+            self.local_hits = 0
+            self.redis_hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        """
+        Reports the cache counters.
+
+        Returns:
+            dict: Hit/miss counts and the current size of the in-process tier.
+        """
+        with self._lock:
+            return {
+                "hits": self.local_hits + self.redis_hits,
+                "local_hits": self.local_hits,
+                "redis_hits": self.redis_hits,
+                "misses": self.misses,
+                "local_size": len(self._local),
+            }
+
+    def _store_local(self, username: str, profile: UserProfile) -> None:
+        with self._lock:
+            self._local[username] = (time.monotonic() + self.local_ttl, profile)
+            self._local.move_to_end(username)
+            while len(self._local) > self.max_entries:
+                self._local.popitem(last=False)
+
+    def _fill(self, profile: UserProfile, generation) -> bool:
+        """Add a loaded profile to Redis if its generation is still `generation`; False if it changed."""
+        if self.redis_client is None:
+            return True
+        generation_key = self.generation_prefix + profile.username
+        try:
+            with self.redis_client.pipeline() as pipe:
+                pipe.watch(generation_key)
+                if pipe.get(generation_key) != generation:
+                    return False
+                pipe.multi()
+                pipe.set(self.key_prefix + profile.username, json.dumps(profile._asdict()), ex=self.ttl, nx=True)
+                pipe.execute()
+        except redis.WatchError:
+            return False
+        except redis.RedisError as e:
+            logger.warning("User cache fill for '%s' failed in Redis: %s", profile.username, e)
+        return True
+
+    def _redis_call(self, method: str, key: str, *args):
+        if self.redis_client is None:
+            return None
+        try:
+            return getattr(self.redis_client, method)(key, *args)
+        except redis.RedisError as e:
+            logger.warning("User cache %s of '%s' failed in Redis: %s", method, key, e)
+            return None
@@ -1,8 +1,14 @@
+import fakeredis
 import pytest
 
 from app import create_app
 from config import TestConfig
+from meal_max import user_routes
 from meal_max.db import db
+from meal_max.utils.password_hasher import PasswordHasher
+from meal_max.utils.response_cache import ResponseCache
+from meal_max.utils.session_tokens import SessionStore
+from meal_max.utils.user_cache import UserProfileCache
 
 @pytest.fixture
 def app():
@@ -20,4 +26,33 @@ def client(app):
 @pytest.fixture
 def session(app):
     with app.app_context():
-        yield db.session
\ No newline at end of file
+        yield db.session
+
+@pytest.fixture(autouse=True)
+def user_cache(monkeypatch):
+    """Give every test an empty user profile cache backed by an in-memory Redis."""
+    cache = UserProfileCache(redis_client=fakeredis.FakeRedis())
+    monkeypatch.setattr(user_routes, 'user_cache', cache)
+    return cache
+
+@pytest.fixture(autouse=True)
+def response_cache(monkeypatch):
+    """Give every test an empty response cache backed by an in-memory Redis."""
+    cache = ResponseCache(redis_client=fakeredis.FakeRedis())
+    monkeypatch.setattr(user_routes, 'response_cache', cache)
+    return cache
+
+@pytest.fixture(autouse=True)
+def session_store(monkeypatch):
+    """Give every test an empty session store backed by an in-memory Redis."""
+    store = SessionStore(redis_client=fakeredis.FakeRedis())
+    monkeypatch.setattr(user_routes, 'session_store', store)
+    return store
+
+@pytest.fixture(autouse=True)
+def password_hasher(monkeypatch):
+    """Give every test its own hashing pool, with a cheap hash method to keep tests fast."""
+    hasher = PasswordHasher(method='pbkdf2:sha256:1000', workers=2, max_pending=4)
+    monkeypatch.setattr('meal_max.db.password_hasher', hasher)
+    yield hasher
+    hasher.shutdown()
@@ -0,0 +1,513 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import fakeredis
+import pytest
+import redis
+import requests
+
+from api_client import CalorieNinjasAPIClient, CircuitBreaker, NutritionCache, normalize_query
+from meal_max.utils.food_table import FoodTable
+
+
+APPLE_RESPONSE = {
+    "items": [
+        {
+            "name": "apple",
+            "calories": 95,
+            "protein_g": 0.5,
+            "carbohydrates_total_g": 25,
+            "sugar_g": 19
+        }
+    ]
+}
+
+
+@pytest.fixture(autouse=True)
+def no_local_foods(mocker):
+    """Keep the bundled food table out of the way so lookups reach the (mocked) upstream."""
+    mocker.patch("api_client.load_food_table", return_value=None)
+
+
+@pytest.fixture
+def fake_redis():
+    return fakeredis.FakeStrictRedis()
+
+
+@pytest.fixture
+def cache(fake_redis):
+    return NutritionCache(redis_client=fake_redis)
+
+
+@pytest.fixture
+def api_client(cache):
+    return CalorieNinjasAPIClient(api_key="test-key", cache=cache, backoff=0)
+
+
+@pytest.fixture
+def mock_upstream(mocker):
+    """Patch the pooled session to return a successful CalorieNinjas response."""
+    mock_response = mocker.Mock(status_code=200, text="")
+    mock_response.json.return_value = APPLE_RESPONSE
+    return mocker.patch("requests.Session.get", return_value=mock_response)
+
+
+##########################################################
+# Query Normalization
+##########################################################
+
+def test_normalize_query():
+    """Test that case and whitespace differences collapse to one key."""
+    assert normalize_query("  Green   Apple ") == "green apple"
+    assert normalize_query("green apple") == normalize_query("GREEN\tAPPLE")
+
+
+##########################################################
+# Response Cache
+##########################################################
+
+def test_get_nutrition_caches_response(api_client, cache, mock_upstream):
+    """Test that a repeat lookup is served from the local tier."""
+    assert api_client.get_nutrition("Apple") == APPLE_RESPONSE
+    assert api_client.get_nutrition(" apple ") == APPLE_RESPONSE
+
+    mock_upstream.assert_called_once()
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["local_hits"] == 1
+
+
+def test_get_nutrition_shares_redis_tier(fake_redis, mock_upstream):
+    """Test that a second process-local cache reuses the Redis entry."""
+    CalorieNinjasAPIClient("test-key", cache=NutritionCache(redis_client=fake_redis)).get_nutrition("apple")
+    other_cache = NutritionCache(redis_client=fake_redis)
+    other_client = CalorieNinjasAPIClient("test-key", cache=other_cache)
+
+    assert other_client.get_nutrition("apple") == APPLE_RESPONSE
+    mock_upstream.assert_called_once()
+    assert other_cache.stats()["redis_hits"] == 1
+    assert fake_redis.ttl("nutrition:apple") <= other_cache.ttl
+
+
+def test_get_nutrition_negative_caching(api_client, cache, fake_redis, mocker):
+    """Test that empty results are cached under the negative TTL."""
+    mock_response = mocker.Mock(status_code=200, text="")
+    mock_response.json.return_value = {"items": []}
+    mock_get = mocker.patch("requests.Session.get", return_value=mock_response)
+
+    api_client.get_nutrition("unobtainium")
+    api_client.get_nutrition("unobtainium")
+
+    mock_get.assert_called_once()
+    assert 0 < fake_redis.ttl("nutrition:unobtainium") <= cache.negative_ttl
+
+
+def test_get_nutrition_server_error_not_cached(api_client, mocker):
+    """Test that upstream 5xx responses are never cached."""
+    mock_get = mocker.patch("requests.Session.get", return_value=mocker.Mock(status_code=503, text="unavailable"))
+
+    assert api_client.get_nutrition("apple") == {"error": 503, "message": "unavailable"}
+    api_client.get_nutrition("apple")
+
+    assert mock_get.call_count == 2 * (api_client.max_retries + 1)
+
+
+def test_local_tier_evicts_least_recently_used():
+    """Test that the local tier stays within max_entries."""
+    cache = NutritionCache(max_entries=2)
+    cache.set("a", APPLE_RESPONSE)
+    cache.set("b", APPLE_RESPONSE)
+    cache.get("a")
+    cache.set("c", APPLE_RESPONSE)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == APPLE_RESPONSE
+    assert cache.stats()["local_size"] == 2
+
+
+def test_cache_survives_redis_outage(mocker, mock_upstream):
+    """Test that Redis errors degrade to an upstream call instead of failing."""
+    broken_redis = mocker.Mock()
+    broken_redis.get.side_effect = redis.ConnectionError("down")
+    broken_redis.setex.side_effect = redis.ConnectionError("down")
+    broken_redis.set.side_effect = redis.ConnectionError("down")
+    client = CalorieNinjasAPIClient("test-key", cache=NutritionCache(redis_client=broken_redis))
+
+    assert client.get_nutrition("apple") == APPLE_RESPONSE
+
+
+##########################################################
+# Pooled Session, Retries and Circuit Breaker
+##########################################################
+
+def test_get_nutrition_uses_timeouts(api_client, mock_upstream):
+    """Test that every upstream call is bounded by the connect/read timeouts."""
+    api_client.get_nutrition("apple")
+
+    _, kwargs = mock_upstream.call_args
+    assert kwargs["timeout"] == api_client.timeout
+    assert kwargs["params"] == {"query": "apple"}
+
+
+def test_get_nutrition_retries_transient_failures(api_client, mocker):
+    """Test that a timeout followed by a success is retried transparently."""
+    ok_response = mocker.Mock(status_code=200, text="")
+    ok_response.json.return_value = APPLE_RESPONSE
+    mock_get = mocker.patch("requests.Session.get", side_effect=[requests.exceptions.Timeout, ok_response])
+
+    assert api_client.get_nutrition("apple") == APPLE_RESPONSE
+    assert mock_get.call_count == 2
+    assert api_client.circuit_breaker.failures == 0
+
+
+def test_get_nutrition_gives_up_after_retry_budget(api_client, mocker):
+    """Test that persistent connection errors surface as an error dict."""
+    mock_get = mocker.patch("requests.Session.get", side_effect=requests.exceptions.ConnectionError("refused"))
+
+    assert api_client.get_nutrition("apple")["error"] == 502
+    assert mock_get.call_count == api_client.max_retries + 1
+
+
+def test_circuit_breaker_fails_fast_when_open(cache, mocker):
+    """Test that an open breaker stops calling the upstream."""
+    client = CalorieNinjasAPIClient("test-key", cache=cache, max_retries=0,
+                                    circuit_breaker=CircuitBreaker(failure_threshold=2, reset_timeout=60))
+    mock_get = mocker.patch("requests.Session.get", side_effect=requests.exceptions.Timeout)
+
+    client.get_nutrition("apple")
+    client.get_nutrition("pear")
+    assert client.circuit_breaker.state == CircuitBreaker.OPEN
+
+    assert client.get_nutrition("plum")["error"] == 503
+    assert mock_get.call_count == 2
+
+
+def test_circuit_breaker_half_open_trial():
+    """Test that a successful trial call closes the breaker again."""
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow_request() is True
+    assert breaker.allow_request() is False, "Only one trial call should be let through."
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+@pytest.mark.parametrize("error", [ValueError("Expecting value"), KeyError("items")])
+def test_circuit_breaker_trial_that_raises_is_a_failure(cache, mocker, error):
+    """Test that a trial call failing in the response handling gives the trial slot back."""
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    client = CalorieNinjasAPIClient(api_key="test-key", cache=cache, backoff=0, max_retries=0,
+                                    circuit_breaker=breaker)
+    bad_response = mocker.Mock(status_code=200, text="<html>")
+    bad_response.json.side_effect = error
+    mocker.patch("requests.Session.get", return_value=bad_response)
+
+    if isinstance(error, ValueError):
+        assert client._request_nutrition("apple")["error"] == 502
+    else:
+        with pytest.raises(KeyError):
+            client._request_nutrition("apple")
+
+    assert breaker.failures == 2
+    assert breaker.allow_request() is True, "The next trial should be let through."
+
+
+##########################################################
+# Batch Lookups
+##########################################################
+
+def item(name, calories=100):
+    return {"name": name, "calories": calories, "protein_g": 1.0,
+            "carbohydrates_total_g": 10.0, "sugar_g": 5.0}
+
+
+def test_get_nutrition_batch_packs_misses(api_client, cache, mocker):
+    """Test that misses share one upstream call and are split back per food."""
+    cache.set("apple", {"items": [item("apple", 95)]})
+    packed_response = mocker.Mock(status_code=200, text="")
+    packed_response.json.return_value = {"items": [item("banana", 89), item("rice", 130)]}
+    mock_get = mocker.patch("requests.Session.get", return_value=packed_response)
+
+    results = api_client.get_nutrition_batch(["Apple", "bananas", "rice", "apple "])
+
+    assert list(results) == ["apple", "bananas", "rice"]
+    assert results["apple"]["items"][0]["calories"] == 95
+    assert results["bananas"]["items"][0]["calories"] == 89
+    assert results["rice"]["items"][0]["calories"] == 130
+    mock_get.assert_called_once()
+    assert mock_get.call_args.kwargs["params"] == {"query": "bananas, rice"}
+    assert cache.get("rice") == {"items": [item("rice", 130)]}
+
+
+def packed_upstream(mocker, responses):
+    """Patch the session to answer each query string with its entry in `responses`."""
+    def get(url, params, timeout):
+        return mocker.Mock(status_code=200, text="", json=mocker.Mock(return_value=responses[params["query"]]))
+
+    return mocker.patch("requests.Session.get", side_effect=get)
+
+
+def test_get_nutrition_batch_falls_back_for_unmatched(api_client, cache, mocker):
+    """Test that a food missing from the packed response sends the whole pack to single lookups."""
+    mock_get = packed_upstream(mocker, {
+        "rice, unobtainium": {"items": [item("rice")]},
+        "rice": {"items": [item("rice")]},
+        "unobtainium": {"items": []},
+    })
+
+    results = api_client.get_nutrition_batch(["rice", "unobtainium"])
+
+    assert results["rice"]["items"] == [item("rice")]
+    assert results["unobtainium"] == {"items": []}
+    assert mock_get.call_count == 3
+
+
+def test_get_nutrition_batch_looks_up_ambiguous_items_alone(api_client, cache, mocker):
+    """Test that an item fitting several packed queries is neither guessed nor cached."""
+    mock_get = packed_upstream(mocker, {
+        "brown rice, fried rice, salmon": {"items": [item("rice", 130), item("salmon", 208)]},
+        "brown rice": {"items": [item("brown rice", 111)]},
+        "fried rice": {"items": [item("rice", 150)]},
+        "salmon": {"items": [item("salmon", 210)]},
+    })
+
+    results = api_client.get_nutrition_batch(["brown rice", "fried rice", "salmon"])
+
+    assert results["salmon"]["items"] == [item("salmon", 210)]
+    assert results["brown rice"]["items"] == [item("brown rice", 111)]
+    assert results["fried rice"]["items"] == [item("rice", 150)]
+    assert mock_get.call_count == 4
+    assert cache.get("brown rice") == {"items": [item("brown rice", 111)]}
+
+
+def test_get_nutrition_batch_does_not_cache_overlapping_names(api_client, cache, mocker):
+    """Test that an exact name also fitting a longer query does not split the pack."""
+    mock_get = packed_upstream(mocker, {
+        "chicken and rice, rice": {"items": [item("chicken", 239), item("rice", 130)]},
+        "chicken and rice": {"items": [item("chicken", 239), item("rice", 130)]},
+        "rice": {"items": [item("rice", 130)]},
+    })
+
+    results = api_client.get_nutrition_batch(["chicken and rice", "rice"])
+
+    assert results["chicken and rice"]["items"] == [item("chicken", 239), item("rice", 130)]
+    assert results["rice"]["items"] == [item("rice", 130)]
+    assert mock_get.call_count == 3
+    assert cache.get("chicken and rice") == {"items": [item("chicken", 239), item("rice", 130)]}
+
+
+def test_split_items_rejects_ambiguous_packs():
+    """Test that a pack is only split when every item fits exactly one query and every query gets one."""
+    split = CalorieNinjasAPIClient._split_items
+
+    assert split(["bananas", "green apples"], [item("banana"), item("apple")]) == {
+        "bananas": [item("banana")], "green apples": [item("apple")]
+    }
+    assert split(["brown rice", "fried rice", "green apples"], [item("rice"), item("apple")]) is None
+    assert split(["chicken and rice", "rice"], [item("chicken"), item("rice")]) is None
+    assert split(["rice", "unobtainium"], [item("rice")]) is None
+
+
+def test_pack_queries_respects_length_budget(mocker):
+    """Test that packed queries are split once they exceed the character budget."""
+    mocker.patch("api_client.NUTRITION_BATCH_QUERY_CHARS", 12)
+
+    assert CalorieNinjasAPIClient._pack_queries(["apple", "pear", "banana", "kiwi"]) == [
+        ["apple", "pear"], ["banana", "kiwi"]
+    ]
+
+
+##########################################################
+# Concurrent Fan-out
+##########################################################
+
+STUB_DELAY = 0.3
+
+
+@pytest.fixture
+def stub_upstream():
+    """Serve CalorieNinjas-shaped responses locally, each taking STUB_DELAY seconds."""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            query = parse_qs(urlparse(self.path).query)["query"][0]
+            time.sleep(self.server.delay)
+            body = json.dumps({"items": [item(name) for name in query.split(", ")]}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.delay = STUB_DELAY
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def stub_client(stub_upstream):
+    host, port = stub_upstream.server_address
+    return CalorieNinjasAPIClient("test-key", cache=NutritionCache(), max_workers=8,
+                                  api_url=f"http://{host}:{port}")
+
+
+def test_get_nutrition_many_runs_concurrently(stub_client):
+    """Test that N lookups take about one upstream round trip, not N."""
+    foods = ["apple", "pear", "plum", "kiwi", "fig"]
+
+    start = time.monotonic()
+    results = stub_client.get_nutrition_many(foods)
+    elapsed = time.monotonic() - start
+
+    assert list(results) == foods
+    assert all(results[food]["items"][0]["name"] == food for food in foods)
+    assert elapsed < STUB_DELAY * len(foods) / 2, f"Fan-out took {elapsed:.2f}s"
+
+
+def test_get_nutrition_many_deadline(stub_upstream, stub_client):
+    """Test that lookups exceeding the deadline are reported as 504s."""
+    stub_upstream.delay = 1.0
+
+    start = time.monotonic()
+    results = stub_client.get_nutrition_many(["apple", "pear"], deadline=0.1)
+
+    assert time.monotonic() - start < 0.5
+    assert results["apple"]["error"] == 504
+    assert results["pear"]["error"] == 504
+
+
+def test_deadline_cuts_in_flight_request_short(stub_upstream, stub_client):
+    """Test that a deadline shortens the upstream call itself and does not trip the breaker."""
+    stub_upstream.delay = 1.0
+
+    start = time.monotonic()
+    result = stub_client._call_with_deadline(time.monotonic() + 0.1, stub_client._request_nutrition, "apple")
+
+    assert time.monotonic() - start < 0.5
+    assert result["error"] == 504
+    assert stub_client.circuit_breaker.failures == 0
+    assert stub_client.circuit_breaker.state == CircuitBreaker.CLOSED
+
+
+def test_get_nutrition_batch_shares_one_deadline(cache, mocker):
+    """Test that the packed round and the single-lookup round fit in one deadline together."""
+    mocker.patch("api_client.NUTRITION_BATCH_QUERY_CHARS", 5)
+    client = CalorieNinjasAPIClient(api_key="test-key", cache=cache, deadline=0.3)
+
+    def slow(value):
+        def call(arg):
+            time.sleep(0.25)
+            return value(arg)
+        return call
+
+    mocker.patch.object(client, "_resolve_chunk", side_effect=slow(lambda chunk: {key: None for key in chunk}))
+    mocker.patch.object(client, "_fetch_coalesced", side_effect=slow(lambda key: {"items": [item(key)]}))
+
+    start = time.monotonic()
+    results = client.get_nutrition_batch(["apple", "pear", "plum", "kiwi"])
+
+    assert time.monotonic() - start < 0.45
+    assert all(result["error"] == 504 for result in results.values())
+
+
+def test_get_nutrition_batch_fans_out_chunks(stub_client, mocker):
+    """Test that packed chunks are resolved concurrently."""
+    mocker.patch("api_client.NUTRITION_BATCH_QUERY_CHARS", 5)
+    foods = ["apple", "pear", "plum", "kiwi"]
+
+    start = time.monotonic()
+    results = stub_client.get_nutrition_batch(foods)
+    elapsed = time.monotonic() - start
+
+    assert all(results[food]["items"][0]["name"] == food for food in foods)
+    assert elapsed < STUB_DELAY * len(foods) / 2, f"Batch took {elapsed:.2f}s"
+
+
+##########################################################
+# Single-flight Coalescing
+##########################################################
+
+def test_get_nutrition_coalesces_concurrent_misses(api_client, mocker):
+    """Test that concurrent misses for one food share a single upstream call."""
+    def slow_get(*args, **kwargs):
+        time.sleep(0.2)
+        response = mocker.Mock(status_code=200, text="")
+        response.json.return_value = APPLE_RESPONSE
+        return response
+    mock_get = mocker.patch("requests.Session.get", side_effect=slow_get)
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(api_client.get_nutrition("Apple")))
+               for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == [APPLE_RESPONSE] * 10
+    assert mock_get.call_count == 1
+    assert api_client.single_flight.calls == 1
+    assert api_client.single_flight.shared == 9
+
+
+def test_get_nutrition_waits_for_other_process(fake_redis, mock_upstream):
+    """Test that a worker waits for the Redis lock holder instead of calling upstream."""
+    fake_redis.set("nutrition:lock:apple", "other-worker", px=5000)
+    publisher = NutritionCache(redis_client=fake_redis)
+    threading.Timer(0.1, publisher.set, args=("apple", APPLE_RESPONSE)).start()
+    client = CalorieNinjasAPIClient("test-key", cache=NutritionCache(redis_client=fake_redis))
+
+    assert client.get_nutrition("apple") == APPLE_RESPONSE
+    mock_upstream.assert_not_called()
+    assert client.lock_waits == 1
+
+
+def test_get_nutrition_releases_lock(api_client, fake_redis, mock_upstream):
+    """Test that the fetch lock is released after the leader publishes."""
+    api_client.get_nutrition("apple")
+
+    assert not fake_redis.exists("nutrition:lock:apple")
+
+
+##########################################################
+# Local Food Table
+##########################################################
+
+def test_get_nutrition_prefers_local_food_table(cache, mock_upstream):
+    """Test that foods in the local table never reach the cache or upstream."""
+    local_foods = FoodTable.from_rows([("Apple", 52, 0.3, 13.8, 10.4)])
+    client = CalorieNinjasAPIClient("test-key", cache=cache, local_foods=local_foods)
+
+    result = client.get_nutrition("apples")
+
+    assert result["items"][0]["name"] == "apple"
+    assert result["items"][0]["calories"] == 52
+    mock_upstream.assert_not_called()
+    assert cache.stats()["misses"] == 0
+    assert client.local_food_hits == 1
+
+
+def test_get_nutrition_batch_only_fetches_unknown_foods(cache, mocker):
+    """Test that a batch only sends foods missing from the local table upstream."""
+    local_foods = FoodTable.from_rows([("apple", 52, 0.3, 13.8, 10.4)])
+    client = CalorieNinjasAPIClient("test-key", cache=cache, local_foods=local_foods)
+    response = mocker.Mock(status_code=200, text="")
+    response.json.return_value = {"items": [item("rice")]}
+    mock_get = mocker.patch("requests.Session.get", return_value=response)
+
+    results = client.get_nutrition_batch(["apple", "rice"])
+
+    assert results["apple"]["items"][0]["calories"] == 52
+    assert mock_get.call_args.kwargs["params"] == {"query": "rice"}
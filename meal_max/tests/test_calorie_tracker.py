@@ -183,7 +183,7 @@ def test_get_user_summary(sample_user):
     """
     Test retrieving a user's summary.
 
-    Verifies the summary includes correct user details and logs.
+    Verifies the summary includes correct user details and aggregated logs.
     """
     log_date = date.today()
     sample_user.log_calories(user_id=sample_user.id, 
@@ -199,22 +199,22 @@ def test_get_user_summary(sample_user):
     assert summary["username"] == "test_user"
     assert summary["calorie_goal"] == 2000
     assert summary["starting_weight"] == 75.0
-    assert len(summary["calorie_logs"]) == 1
-    assert len(summary["weight_logs"]) == 1
-    assert summary["calorie_logs"][0]["calories"] == 1800
-    assert summary["weight_logs"][0]["weight"] == 74.5
+    assert len(summary["monthly"]) == 1
+    assert summary["totals"]["calories"]["total"] == 1800
+    assert summary["totals"]["calories"]["days_logged"] == 1
+    assert summary["totals"]["weight"]["end"] == 74.5
 
 
 def test_get_user_summary_no_logs(sample_user):
     """
     Test retrieving a user's summary when no logs exist.
 
-    Verifies the summary reflects an empty log list.
+    Verifies the summary reflects no aggregated logs.
     """
     summary = sample_user.get_user_summary(username="test_user")
 
     assert summary["username"] == "test_user"
     assert summary["calorie_goal"] == 2000
     assert summary["starting_weight"] == 75.0
-    assert len(summary["calorie_logs"]) == 0
-    assert len(summary["weight_logs"]) == 0
+    assert summary["monthly"] == []
+    assert summary["totals"] == {"calories": None, "weight": None}
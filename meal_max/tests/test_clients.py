@@ -0,0 +1,175 @@
+from unittest.mock import Mock
+
+import fakeredis
+import mongomock
+import pytest
+import redis
+
+from meal_max import health_routes
+from meal_max.clients import factory
+from meal_max.clients.factory import LazyClient
+from meal_max.clients.mongo_client import PoolGauge, create_mongo_client
+from meal_max.clients.redis_client import create_redis_client
+
+
+@pytest.fixture
+def fake_redis_client():
+    """A pooled client built by the factory, talking to an in-memory Redis."""
+    return create_redis_client(connection_class=fakeredis.FakeConnection, server=fakeredis.FakeServer(),
+                               max_connections=2, timeout=0.05)
+
+
+##########################################################
+# Lazy clients
+##########################################################
+
+def test_lazy_client_creates_on_first_use():
+    """Test that the client is created by the first call, once."""
+    create = Mock(return_value=Mock(ping=Mock(return_value=True)))
+    client = LazyClient('test', create)
+
+    create.assert_not_called()
+    assert not client.created
+    assert client.ping()
+    assert client.ping()
+    create.assert_called_once()
+    assert client.created
+
+
+def test_lazy_client_recreates_after_fork(monkeypatch):
+    """Test that a forked process gets its own client and leaves the parent's open."""
+    parent, child = Mock(), Mock()
+    close = Mock()
+    client = LazyClient('test', Mock(side_effect=[parent, child]), close)
+    assert client.get() is parent
+
+    monkeypatch.setattr(factory.os, 'getpid', lambda: -1)
+    assert not client.created
+    assert client.get() is child
+    close.assert_not_called()
+
+
+def test_reset_closes_the_client():
+    """Test that reset closes the client and the next use creates a new one."""
+    first, second = Mock(), Mock()
+    close = Mock()
+    client = LazyClient('test', Mock(side_effect=[first, second]), close)
+    client.get()
+
+    client.reset()
+    close.assert_called_once_with(first)
+    assert client.get() is second
+
+
+##########################################################
+# Pools
+##########################################################
+
+def test_redis_pool_gauges(fake_redis_client):
+    """Test that the Redis pool counts connections in use and opened."""
+    pool = fake_redis_client.connection_pool
+    assert pool.stats()["open"] == 0
+
+    fake_redis_client.set("key", "value")
+    connection = pool.get_connection("GET")
+    stats = pool.stats()
+    assert stats["open"] == 1
+    assert stats["in_use"] == 1
+    assert stats["utilization"] == 0.5
+
+    pool.release(connection)
+    assert pool.stats()["in_use"] == 0
+
+
+def test_redis_pool_waits_instead_of_opening_more(fake_redis_client):
+    """Test that a full Redis pool fails checkouts after its timeout rather than growing."""
+    pool = fake_redis_client.connection_pool
+    held = [pool.get_connection("GET") for _ in range(2)]
+
+    with pytest.raises(redis.ConnectionError):
+        fake_redis_client.get("key")
+    assert pool.stats()["open"] == 2
+    assert pool.stats()["checkout_failures"] == 1
+
+    for connection in held:
+        pool.release(connection)
+    assert fake_redis_client.get("key") is None
+
+
+def test_mongo_client_does_not_connect_on_creation():
+    """Test that the MongoDB client applies the pool settings and opens nothing up front."""
+    client = create_mongo_client(host='mongo.invalid', maxPoolSize=7)
+    try:
+        assert client.options.pool_options.max_pool_size == 7
+        assert client.options.pool_options.wait_queue_timeout is not None
+        assert client.pool_gauge.stats()["open"] == 0
+    finally:
+        client.close()
+
+
+def test_mongo_pool_gauge():
+    """Test that the MongoDB pool gauge follows pymongo's pool events."""
+    gauge = PoolGauge(max_pool_size=4)
+    gauge.connection_created(None)
+    gauge.connection_created(None)
+    gauge.connection_checked_out(None)
+    gauge.connection_check_out_failed(None)
+
+    assert gauge.stats() == {"max_pool_size": 4, "open": 2, "in_use": 1, "utilization": 0.25,
+                             "checkout_failures": 1}
+
+    gauge.connection_checked_in(None)
+    gauge.connection_closed(None)
+    assert gauge.stats()["in_use"] == 0
+    assert gauge.stats()["open"] == 1
+
+
+##########################################################
+# Health check
+##########################################################
+
+@pytest.fixture
+def dependencies(monkeypatch, fake_redis_client):
+    monkeypatch.setattr(health_routes, 'redis_client', fake_redis_client)
+    monkeypatch.setattr(health_routes, 'mongo_client', mongomock.MongoClient())
+
+
+def test_healthcheck(client, mocker):
+    """Test that the plain health check touches no dependency."""
+    redis_client = mocker.patch.object(health_routes, 'redis_client')
+
+    response = client.get('/api/health')
+
+    assert response.status_code == 200
+    assert response.get_json() == {"status": "healthy"}
+    redis_client.ping.assert_not_called()
+
+
+def test_healthcheck_dependencies(client, dependencies):
+    """Test that the dependency mode reports each dependency's latency, the pool gauges and the random pool."""
+    response = client.get('/api/health?dependencies=true')
+
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data["status"] == "healthy"
+    for name in ("database", "redis", "mongo"):
+        assert data["dependencies"][name]["status"] == "up"
+        assert data["dependencies"][name]["latency_ms"] >= 0
+    assert set(data["pools"]) == {"redis", "mongo"}
+    assert set(data["random_pool"]) == {"depth", "low_water", "served", "fallbacks", "refills", "refill_failures"}
+
+
+def test_healthcheck_dependency_down(client, dependencies, monkeypatch):
+    """Test that a failing dependency is reported with a 503."""
+    broken_redis = Mock()
+    broken_redis.ping.side_effect = redis.ConnectionError("Timeout connecting to server")
+    monkeypatch.setattr(health_routes, 'redis_client', broken_redis)
+
+    response = client.get('/api/health?dependencies=true')
+
+    assert response.status_code == 503
+    data = response.get_json()
+    assert data["status"] == "degraded"
+    assert data["dependencies"]["redis"]["status"] == "down"
+    assert data["dependencies"]["redis"]["error"] == "Timeout connecting to server"
+    assert data["dependencies"]["mongo"]["status"] == "up"
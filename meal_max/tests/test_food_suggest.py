@@ -0,0 +1,156 @@
+import os
+import time
+
+import fakeredis
+import pytest
+
+from api_client import NutritionCache
+from meal_max import food_routes
+from meal_max.utils.food_suggest import FoodSuggestIndex
+from meal_max.utils.food_table import FoodTable
+
+
+@pytest.fixture
+def local_foods():
+    return FoodTable.from_rows([
+        ("apple", 52, 0.3, 13.8, 10.4),
+        ("apple juice", 46, 0.1, 11.3, 9.6),
+        ("apricot", 48, 1.4, 11.1, 9.2),
+        ("banana", 89, 1.1, 22.8, 12.2),
+    ])
+
+
+@pytest.fixture
+def cache():
+    cache = NutritionCache(redis_client=fakeredis.FakeStrictRedis())
+    cache.set("apple pie", {"items": [{"name": "apple pie", "calories": 237}]})
+    cache.set("2 apple pies", {"items": [{"name": "Apple Pie", "calories": 474}]})
+    cache.set("unobtainium", {"items": []})
+    return cache
+
+
+@pytest.fixture
+def suggest_index(local_foods, cache):
+    index = FoodSuggestIndex(local_foods=local_foods, cache=cache)
+    index.build()
+    return index
+
+
+##########################################################
+# Suggest Index
+##########################################################
+
+def test_suggest_ranks_by_popularity(suggest_index):
+    """Test that names cached more often rank first, then shorter names."""
+    assert suggest_index.suggest("app") == ["apple pie", "apple", "apple juice"]
+    assert suggest_index.suggest("ap", limit=2) == ["apple pie", "apple"]
+
+
+def test_suggest_reads_shared_cache_tier(local_foods, cache):
+    """Test that items only present in Redis are indexed."""
+    cache.clear()
+    index = FoodSuggestIndex(local_foods=local_foods, cache=cache)
+    index.build()
+
+    assert "apple pie" in index.suggest("apple p")
+
+
+def test_suggest_builds_in_background(local_foods, cache, mocker):
+    """Test that a request never waits for the first build, and that it reads Redis in batches."""
+    index = FoodSuggestIndex(local_foods=local_foods, cache=cache)
+    mget = mocker.spy(cache.redis_client, "mget")
+    get = mocker.spy(cache.redis_client, "get")
+
+    index.start()
+    deadline = time.monotonic() + 2
+    while not len(index) and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert index.suggest("apple p") == ["apple pie"]
+    assert mget.call_count >= 1
+    get.assert_not_called()
+
+
+def test_suggest_before_first_build(local_foods, mocker):
+    """Test that suggest answers at once while the first build runs elsewhere."""
+    index = FoodSuggestIndex(local_foods=local_foods)
+    start_refresh = mocker.patch.object(index, "_start_refresh")
+
+    assert index.suggest("app") == []
+    start_refresh.assert_called_once()
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason="needs os.fork")
+def test_suggest_index_recovers_in_forked_child():
+    """Test that a worker forked during a build does not inherit the held refresh lock."""
+    index = food_routes.suggest_index
+    assert index._refresh_lock.acquire(blocking=False)
+    try:
+        pid = os.fork()
+        if pid == 0:
+            os._exit(0 if index._refresh_lock.acquire(blocking=False) else 1)
+        _, status = os.waitpid(pid, 0)
+    finally:
+        index._refresh_lock.release()
+
+    assert os.WIFEXITED(status) and os.WEXITSTATUS(status) == 0
+
+
+def test_suggest_no_match(suggest_index):
+    """Test that unknown prefixes and blank queries return nothing."""
+    assert suggest_index.suggest("zz") == []
+    assert suggest_index.suggest("   ") == []
+
+
+def test_suggest_respects_max_entries(local_foods, cache):
+    """Test that the index keeps only the most popular names when capped."""
+    index = FoodSuggestIndex(local_foods=local_foods, cache=cache, max_entries=1)
+
+    index.build()
+    assert len(index) == 1
+    assert index.suggest("a") == ["apple pie"]
+
+
+def test_suggest_latency(local_foods):
+    """Test that lookups stay far below the 5 ms budget on a large index."""
+    rows = [(f"food {i:05d}", 1, 1, 1, 1) for i in range(20000)]
+    index = FoodSuggestIndex(local_foods=FoodTable.from_rows(rows))
+    index.build()
+
+    timings = []
+    for i in range(1000):
+        start = time.perf_counter()
+        index.suggest(f"food {i % 100:02d}")
+        timings.append(time.perf_counter() - start)
+
+    assert sorted(timings)[int(len(timings) * 0.99)] < 0.005
+
+
+##########################################################
+# Suggest Route
+##########################################################
+
+def test_suggest_route(client, mocker, suggest_index):
+    """Test that the route returns ranked completions."""
+    mocker.patch("meal_max.food_routes.suggest_index", suggest_index)
+
+    response = client.get('/foods/suggest?q=App&limit=2')
+
+    assert response.status_code == 200
+    assert response.get_json() == {"query": "App", "suggestions": ["apple pie", "apple"]}
+
+
+def test_suggest_route_fuzzy_fallback(client, mocker, suggest_index):
+    """Test that misspellings fall back to fuzzy matches from the local table."""
+    mocker.patch("meal_max.food_routes.suggest_index", suggest_index)
+
+    response = client.get('/foods/suggest?q=bananna')
+
+    assert response.get_json()["suggestions"][0] == "banana"
+
+
+def test_suggest_route_validation(client):
+    """Test that a missing query or bad limit is rejected."""
+    assert client.get('/foods/suggest').status_code == 400
+    assert client.get('/foods/suggest?q=ap&limit=abc').status_code == 400
+    assert client.get('/foods/suggest?q=ap&limit=1000').status_code == 400
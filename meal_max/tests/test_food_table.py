@@ -0,0 +1,97 @@
+import os
+
+import pytest
+
+from meal_max.utils.food_table import FoodTable, load_food_table
+
+
+@pytest.fixture
+def food_table():
+    return FoodTable.from_rows([
+        ("Banana", 89, 1.1, 22.8, 12.2),
+        ("apple", 52, 0.3, 13.8, 10.4),
+        ("apple juice", 46, 0.1, 11.3, 9.6),
+        ("Peas", 81, 5.4, 14.5, 5.7),
+    ])
+
+
+@pytest.fixture
+def index_path(tmp_path, food_table):
+    path = str(tmp_path / "foods.idx")
+    food_table.save_index(path)
+    return path
+
+
+##########################################################
+# Lookups
+##########################################################
+
+def test_lookup(food_table):
+    """Test that lookups are normalized and shaped like CalorieNinjas items."""
+    assert food_table.lookup("  BANANA ") == {
+        "name": "banana",
+        "serving_size_g": 100.0,
+        "calories": 89,
+        "protein_g": 1.1,
+        "carbohydrates_total_g": 22.8,
+        "sugar_g": 12.2,
+    }
+    assert food_table.lookup("unobtainium") is None
+
+
+def test_lookup_plural(food_table):
+    """Test that plurals fall back to the singular, but listed plurals win."""
+    assert food_table.lookup("apples")["name"] == "apple"
+    assert food_table.lookup("peas")["name"] == "peas"
+
+
+def test_prefix_search(food_table):
+    """Test that prefix completions come back in alphabetical order."""
+    assert food_table.prefix_search("app") == ["apple", "apple juice"]
+    assert food_table.prefix_search("app", limit=1) == ["apple"]
+    assert food_table.prefix_search("zz") == []
+
+
+def test_fuzzy_search(food_table):
+    """Test that misspellings still find the closest food."""
+    assert food_table.fuzzy_search("bananna")[0] == "banana"
+
+
+##########################################################
+# Binary Index
+##########################################################
+
+def test_load_index_round_trip(food_table, index_path):
+    """Test that a memory-mapped index answers the same lookups as the source table."""
+    mapped = FoodTable.load_index(index_path)
+
+    assert len(mapped) == len(food_table)
+    assert mapped.lookup("apple juice") == food_table.lookup("apple juice")
+    assert mapped.prefix_search("a") == food_table.prefix_search("a")
+    mapped.close()
+
+
+def test_load_index_rejects_other_files(tmp_path):
+    """Test that a file that is not a food index is rejected."""
+    path = tmp_path / "foods.idx"
+    path.write_bytes(b"not an index at all")
+
+    with pytest.raises(ValueError, match="Unsupported food index file"):
+        FoodTable.load_index(str(path))
+
+
+def test_load_food_table_prefers_fresh_index(tmp_path, index_path):
+    """Test that an index newer than its CSV is memory-mapped instead of re-parsed."""
+    csv_path = tmp_path / "foods.csv"
+    csv_path.write_text("name,calories,protein_g,carbohydrates_total_g,sugar_g\nkiwi,61,1.1,14.7,9.0\n")
+    os.utime(index_path, (os.path.getmtime(csv_path) + 10,) * 2)
+
+    table = load_food_table(str(csv_path), index_path)
+
+    assert "apple" in table and "kiwi" not in table
+
+
+def test_bundled_food_table_loads():
+    """Test that the bundled CSV parses."""
+    table = load_food_table(index_path="")
+    assert table.lookup("banana")["calories"] == 89
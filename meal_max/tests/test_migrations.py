@@ -0,0 +1,117 @@
+import hashlib
+import sqlite3
+
+import pytest
+from sqlalchemy import create_engine, inspect
+
+from app import create_app
+from config import TestConfig
+from meal_max.db import db, User
+from meal_max.migrations import main, migrate
+
+
+LEGACY_SCHEMA = """
+CREATE TABLE user (id INTEGER PRIMARY KEY, username VARCHAR(50) UNIQUE NOT NULL, calorie_goal INTEGER NOT NULL,
+                   starting_weight INTEGER NOT NULL, salt VARCHAR(128) NOT NULL, password_hash VARCHAR(128) NOT NULL);
+CREATE TABLE users (id INTEGER PRIMARY KEY, username VARCHAR(80) UNIQUE NOT NULL, salt VARCHAR(32) NOT NULL,
+                    password VARCHAR(64) NOT NULL);
+CREATE TABLE calorie_intake (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL REFERENCES user (id),
+                             date DATE NOT NULL, calories INTEGER NOT NULL);
+CREATE INDEX ix_calorie_intake_user_id_date ON calorie_intake (user_id, date);
+CREATE TABLE weight_log (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL REFERENCES user (id),
+                         date DATE NOT NULL, weight FLOAT NOT NULL);
+"""
+
+
+@pytest.fixture
+def legacy_database(tmp_path):
+    """A database with the old `user` and `users` tables and non-cascading foreign keys."""
+    path = tmp_path / "legacy.db"
+    conn = sqlite3.connect(path)
+    conn.executescript(LEGACY_SCHEMA)
+    conn.execute("INSERT INTO user VALUES (7, 'alice', 1800, 70, 'salt1', 'unused')")
+    conn.execute("INSERT INTO users VALUES (1, 'bob', 'salt2', ?)",
+                 (hashlib.sha256(b'bobpassword' + b'salt2').hexdigest(),))
+    conn.execute("INSERT INTO users VALUES (2, 'alice', 'salt3', 'duplicate')")
+    conn.executemany("INSERT INTO calorie_intake (user_id, date, calories) VALUES (?, ?, ?)",
+                     [(7, '2024-01-01', 1900), (7, '2024-01-02', 2100), (99, '2024-01-01', 500)])
+    conn.execute("INSERT INTO weight_log (user_id, date, weight) VALUES (7, '2024-01-01', 70.5)")
+    conn.commit()
+    conn.close()
+    return f"sqlite:///{path}"
+
+
+@pytest.fixture
+def migrated_app(legacy_database):
+    assert migrate(legacy_database) == ['0001_unify_users']
+
+    class MigratedConfig(TestConfig):
+        SQLALCHEMY_DATABASE_URI = legacy_database
+
+    app = create_app(MigratedConfig)
+    with app.app_context():
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+
+def test_migration_unifies_users(migrated_app):
+    """Test that profiles keep their IDs and logs, and old-only accounts are merged."""
+    users = {user.username: user for user in User.query.all()}
+
+    assert set(users) == {'alice', 'bob'}
+    assert users['alice'].id == 7
+    assert [log.calories for log in users['alice'].calorie_logs] == [1900, 2100]
+    assert [log.weight for log in users['alice'].weight_logs] == [70.5]
+    assert users['bob'].calorie_goal == 2000
+    assert users['bob'].starting_weight is None
+    assert db.session.execute(db.text("SELECT COUNT(*) FROM calorie_intake")).scalar() == 2
+
+
+def test_migration_adds_cascades_and_indexes(migrated_app):
+    """Test that rebuilt tables have the canonical foreign keys and indexes."""
+    inspector = inspect(db.engine)
+
+    assert not {'user', '_legacy_user'} & set(inspector.get_table_names())
+    for name in ('calorie_intake', 'weight_log'):
+        foreign_key, = inspector.get_foreign_keys(name)
+        assert foreign_key['referred_table'] == 'users'
+        assert foreign_key['options']['ondelete'] == 'CASCADE'
+        assert [index['name'] for index in inspector.get_indexes(name)] == [f'ix_{name}_user_id_date']
+
+
+def test_legacy_password_is_rehashed_on_login(migrated_app):
+    """Test that a migrated SHA-256 password still logs in and is upgraded by doing so."""
+    client = migrated_app.test_client()
+    login = {'username': 'bob', 'password': 'bobpassword'}
+
+    assert client.post('/login', json={'username': 'bob', 'password': 'wrong'}).status_code == 401
+    assert client.post('/login', json=login).status_code == 200
+    db.session.expire_all()
+    assert User.query.filter_by(username='bob').one().password_hash.startswith('pbkdf2:sha256:1000$')
+    assert client.post('/login', json=login).status_code == 200
+
+
+def test_migration_is_recorded(legacy_database, capsys):
+    """Test that applied migrations are not run again."""
+    migrate(legacy_database)
+
+    main(['--database-uri', legacy_database])
+
+    assert capsys.readouterr().out.strip() == "Applied 0 migration(s)"
+
+
+def test_fresh_database_needs_no_changes(app, tmp_path):
+    """Test that a database created from the models is already up to date."""
+    uri = f"sqlite:///{tmp_path / 'fresh.db'}"
+    engine = create_engine(uri)
+    db.metadata.create_all(engine)
+    schema = "SELECT name, sql FROM sqlite_master WHERE tbl_name != 'schema_migrations' ORDER BY name"
+    with engine.connect() as conn:
+        before = conn.exec_driver_sql(schema).all()
+
+    assert migrate(uri) == ['0001_unify_users']
+
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql(schema).all() == before
+    engine.dispose()
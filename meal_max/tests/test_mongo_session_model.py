@@ -1,6 +1,39 @@
+import random
+from collections import Counter
+
+import mongomock
 import pytest
+from bson import ObjectId
+
+from meal_max.models import mongo_session_model
+from meal_max.models.mongo_session_model import load_sessions, login_user, login_users, logout_user, logout_users
+
+
+class FakeBattleModel:
+    """Holds combatants the way BattleModel does."""
+
+    def __init__(self, combatants=None):
+        self.combatants = list(combatants or [])
+
+    def clear_combatants(self):
+        self.combatants = []
+
+    def prep_combatant(self, combatant):
+        self.combatants.append(combatant)
+
+    def get_combatants(self):
+        return list(self.combatants)
+
+
+@pytest.fixture(autouse=True)
+def sessions_collection(monkeypatch):
+    """Give every test an empty sessions collection in an in-memory MongoDB."""
+    collection = mongomock.MongoClient()['meal_max']['sessions']
+    monkeypatch.setattr(mongo_session_model, 'sessions_collection', collection)
+    monkeypatch.setattr(mongo_session_model, '_snapshots', {})
+    monkeypatch.setattr(mongo_session_model, '_write_stats', Counter())
+    return collection
 
-from meal_max.models.mongo_session_model import login_user, logout_user
 
 @pytest.fixture
 def sample_user_id():
@@ -12,59 +45,283 @@ def sample_combatants():
     return [{"meal_id": 1}, {"meal_id": 2}]  # Sample combatant data
 
 
-def test_login_user_creates_session_if_not_exists(mocker, sample_user_id):
-    """Test login_user creates a session with no combatants if it does not exist."""
-    mock_find = mocker.patch("meal_max.clients.mongo_client.sessions_collection.find_one", return_value=None)
-    mock_insert = mocker.patch("meal_max.clients.mongo_client.sessions_collection.insert_one")
-    mock_battle_model = mocker.Mock()
+##########################################################
+# Login
+##########################################################
+
+def test_login_user_creates_session_if_not_exists(mocker, sessions_collection, sample_user_id):
+    """Test login_user creates a session with no combatants in a single upsert."""
+    find_one_and_update = mocker.spy(sessions_collection, 'find_one_and_update')
+    insert_one = mocker.spy(sessions_collection, 'insert_one')
+    battle_model = mocker.Mock()
 
-    login_user(sample_user_id, mock_battle_model)
+    login_user(sample_user_id, battle_model)
 
-    mock_find.assert_called_once_with({"user_id": sample_user_id})
-    mock_insert.assert_called_once_with({"user_id": sample_user_id, "combatants": []})
-    mock_battle_model.clear_combatants.assert_not_called()
-    mock_battle_model.prep_combatant.assert_not_called()
+    find_one_and_update.assert_called_once()
+    insert_one.assert_not_called()
+    assert load_sessions([sample_user_id]) == {sample_user_id: []}
+    battle_model.clear_combatants.assert_not_called()
+    battle_model.prep_combatant.assert_not_called()
 
-def test_login_user_loads_combatants_if_session_exists(mocker, sample_user_id, sample_combatants):
+
+def test_login_user_loads_combatants_if_session_exists(mocker, sessions_collection, sample_user_id, sample_combatants):
     """Test login_user loads combatants if session exists."""
-    mock_find = mocker.patch(
-        "meal_max.clients.mongo_client.sessions_collection.find_one",
-        return_value={"user_id": sample_user_id, "combatants": sample_combatants}
-    )
-    mock_battle_model = mocker.Mock()
-
-    login_user(sample_user_id, mock_battle_model)
-
-    mock_find.assert_called_once_with({"user_id": sample_user_id})
-    mock_battle_model.clear_combatants.assert_called_once()
-    mock_battle_model.prep_combatant.assert_has_calls([mocker.call(combatant) for combatant in sample_combatants])
-
-def test_logout_user_updates_combatants(mocker, sample_user_id, sample_combatants):
-    """Test logout_user updates the combatants list in the session."""
-    mock_update = mocker.patch("meal_max.clients.mongo_client.sessions_collection.update_one", return_value=mocker.Mock(matched_count=1))
-    mock_battle_model = mocker.Mock()
-    mock_battle_model.get_combatants.return_value = sample_combatants
-
-    logout_user(sample_user_id, mock_battle_model)
-
-    mock_update.assert_called_once_with(
-        {"user_id": sample_user_id},
-        {"$set": {"combatants": sample_combatants}},
-        upsert=False
-    )
-    mock_battle_model.clear_combatants.assert_called_once()
-
-def test_logout_user_raises_value_error_if_no_user(mocker, sample_user_id, sample_combatants):
+    sessions_collection.insert_one({"user_id": sample_user_id, "combatants": sample_combatants})
+    battle_model = mocker.Mock()
+
+    login_user(sample_user_id, battle_model)
+
+    battle_model.clear_combatants.assert_called_once()
+    battle_model.prep_combatant.assert_has_calls([mocker.call(combatant) for combatant in sample_combatants])
+    assert sessions_collection.count_documents({}) == 1
+
+
+def test_user_id_index_is_unique(sessions_collection, sample_user_id):
+    """Test that sessions are looked up through a unique user_id index."""
+    login_user(sample_user_id, FakeBattleModel())
+
+    assert sessions_collection.index_information()['user_id_1']['unique'] is True
+
+
+def test_login_users_uses_one_query(mocker, sessions_collection, sample_combatants):
+    """Test that many sessions load with one $in query and missing ones are created in bulk."""
+    sessions_collection.insert_one({"user_id": 1, "combatants": sample_combatants})
+    find = mocker.spy(sessions_collection, 'find')
+    bulk_write = mocker.spy(sessions_collection, 'bulk_write')
+    models = {1: FakeBattleModel(), 2: FakeBattleModel([{"meal_id": 9}])}
+
+    login_users(models)
+
+    find.assert_called_once()
+    assert find.call_args.args[0] == {"user_id": {"$in": [1, 2]}}
+    bulk_write.assert_called_once()
+    assert models[1].combatants == sample_combatants
+    assert models[2].combatants == [{"meal_id": 9}]
+    assert load_sessions([1, 2, 3]) == {1: sample_combatants, 2: []}
+
+
+##########################################################
+# Logout
+##########################################################
+
+def test_logout_user_updates_combatants(sessions_collection, sample_user_id, sample_combatants):
+    """Test logout_user saves changed combatants and clears the model."""
+    battle_model = FakeBattleModel()
+    login_user(sample_user_id, battle_model)
+    for combatant in sample_combatants:
+        battle_model.prep_combatant(combatant)
+
+    logout_user(sample_user_id, battle_model)
+
+    assert load_sessions([sample_user_id]) == {sample_user_id: sample_combatants}
+    assert battle_model.combatants == []
+
+
+def test_logout_user_without_changes_writes_nothing(mocker, sessions_collection, sample_user_id, sample_combatants):
+    """Test that logging out with the combatants that were loaded skips the write."""
+    sessions_collection.insert_one({"user_id": sample_user_id, "combatants": sample_combatants})
+    battle_model = FakeBattleModel()
+    login_user(sample_user_id, battle_model)
+    update_one = mocker.spy(sessions_collection, 'update_one')
+
+    logout_user(sample_user_id, battle_model)
+
+    update_one.assert_not_called()
+    assert battle_model.combatants == []
+
+
+def test_logout_user_raises_value_error_if_no_user(mocker, sessions_collection, sample_user_id, sample_combatants):
     """Test logout_user raises ValueError if no session document exists."""
-    mock_update = mocker.patch("meal_max.clients.mongo_client.sessions_collection.update_one", return_value=mocker.Mock(matched_count=0))
-    mock_battle_model = mocker.Mock()
-    mock_battle_model.get_combatants.return_value = sample_combatants
+    update_one = mocker.spy(sessions_collection, 'update_one')
 
     with pytest.raises(ValueError, match=f"User with ID {sample_user_id} not found for logout."):
-        logout_user(sample_user_id, mock_battle_model)
+        logout_user(sample_user_id, FakeBattleModel(sample_combatants))
+
+    update_one.assert_called_once()
+    assert update_one.call_args.args[0] == {"user_id": sample_user_id}
+    assert _without_bookkeeping(update_one.call_args.args[1]) == {"$set": {"combatants": sample_combatants}}
+    assert update_one.call_args.kwargs == {"upsert": False}
+
+
+def test_logout_users_writes_changed_sessions_in_bulk(mocker, sessions_collection, sample_combatants):
+    """Test that bulk logout sends only the changed sessions, in one bulk write."""
+    models = {1: FakeBattleModel(), 2: FakeBattleModel(), 3: FakeBattleModel()}
+    login_users(models)
+    models[2].prep_combatant(sample_combatants[0])
+    bulk_write = mocker.spy(sessions_collection, 'bulk_write')
+
+    assert logout_users(models) == 1
+
+    bulk_write.assert_called_once()
+    assert len(bulk_write.call_args.args[0]) == 1
+    assert load_sessions(models) == {1: [], 2: [sample_combatants[0]], 3: []}
+    assert all(model.combatants == [] for model in models.values())
+    assert logout_users({1: FakeBattleModel()}) == 1  # no longer logged in, so it cannot be skipped
+
+
+##########################################################
+# Delta-encoded writes
+##########################################################
+
+@pytest.fixture
+def large_session(sessions_collection):
+    """A logged-in user whose stored session holds 200 combatants."""
+    combatants = [{"meal_id": i, "name": f"meal {i}"} for i in range(200)]
+    sessions_collection.insert_one({"user_id": 1, "combatants": combatants, "session_version": ObjectId(),
+                                    "delta_writes": 0})
+    battle_model = FakeBattleModel()
+    login_user(1, battle_model)
+    return battle_model
+
+
+def _logout_and_capture(mocker, sessions_collection, battle_model):
+    update_one = mocker.spy(sessions_collection, 'update_one')
+    bulk_write = mocker.spy(sessions_collection, 'bulk_write')
+    expected = battle_model.get_combatants()
+    written = logout_user(1, battle_model)
+    assert load_sessions([1]) == {1: expected}
+    updates = [call.args[1] for call in update_one.call_args_list]
+    for call in bulk_write.call_args_list:
+        updates.extend(operation._doc for operation in call.args[0])
+    return written, [_without_bookkeeping(update) for update in updates]
+
+
+def _without_bookkeeping(update):
+    """Drop the session version and delta counter, which the conflict tests cover."""
+    update = {op: dict(fields) for op, fields in update.items() if op != "$inc"}
+    if "$set" in update:
+        update["$set"] = {field: value for field, value in update["$set"].items()
+                          if field not in ("session_version", "delta_writes")}
+        if not update["$set"]:
+            del update["$set"]
+    return update
+
+
+def test_append_is_written_as_push(mocker, sessions_collection, large_session):
+    """Test that appending to a large session sends only the new combatant."""
+    large_session.prep_combatant({"meal_id": 200, "name": "meal 200"})
+
+    written, updates = _logout_and_capture(mocker, sessions_collection, large_session)
+
+    assert updates == [{"$push": {"combatants": {"$each": [{"meal_id": 200, "name": "meal 200"}]}}}]
+    stats = mongo_session_model.session_write_stats()
+    assert stats['delta'] == 1 and stats['bytes_written'] == written
+    assert written * 50 < stats['full_bytes']
+
+
+def test_removal_and_append_are_pulled_then_pushed(mocker, sessions_collection, large_session):
+    """Test that removed combatants are pulled before new ones are pushed."""
+    large_session.combatants = large_session.combatants[:5] + large_session.combatants[6:] + [{"meal_id": 999}]
+
+    written, updates = _logout_and_capture(mocker, sessions_collection, large_session)
+
+    assert [list(update) for update in updates] == [["$pull"], ["$push"]]
+
+
+def test_changed_combatant_is_set_in_place(mocker, sessions_collection, large_session):
+    """Test that replacing one combatant sets only that position."""
+    large_session.combatants[10] = {"meal_id": 10, "name": "renamed"}
+
+    written, updates = _logout_and_capture(mocker, sessions_collection, large_session)
+
+    assert updates == [{"$set": {"combatants.10": {"meal_id": 10, "name": "renamed"}}}]
+
+
+def test_reorder_compacts_to_full_write(mocker, sessions_collection, large_session):
+    """Test that changes no delta can express are written as the whole list."""
+    large_session.combatants.reverse()
+
+    written, updates = _logout_and_capture(mocker, sessions_collection, large_session)
+
+    assert list(updates[0]["$set"]) == ["combatants"]
+    assert mongo_session_model.session_write_stats()['full'] == 1
+
+
+def test_many_changes_compact_to_full_write(mocker, monkeypatch, sessions_collection, large_session):
+    """Test that deltas over SESSION_DELTA_MAX_ITEMS are written as the whole list."""
+    monkeypatch.setattr(mongo_session_model, 'SESSION_DELTA_MAX_ITEMS', 2)
+    for i in range(3):
+        large_session.prep_combatant({"meal_id": 300 + i})
+
+    written, updates = _logout_and_capture(mocker, sessions_collection, large_session)
+
+    assert list(updates[0]["$set"]) == ["combatants"]
+
+
+def test_repeated_deltas_compact_to_full_write(mocker, monkeypatch, sessions_collection, large_session):
+    """Test that a document is rewritten in full after SESSION_DELTA_MAX_WRITES deltas in a row."""
+    monkeypatch.setattr(mongo_session_model, 'SESSION_DELTA_MAX_WRITES', 2)
+    battle_model = large_session
+    for i in range(3):
+        battle_model.prep_combatant({"meal_id": 300 + i})
+        logout_user(1, battle_model)
+        login_user(1, battle_model)
+        assert len(battle_model.combatants) == 201 + i
+
+    stats = mongo_session_model.session_write_stats()
+    assert (stats['delta'], stats['full']) == (2, 1)
+    assert sessions_collection.find_one({"user_id": 1})["delta_writes"] == 0
+
+
+def test_delta_after_concurrent_write_is_rewritten_in_full(sessions_collection, large_session):
+    """Test that a positional delta never lands on a list another writer has shifted."""
+    sessions_collection.update_one({"user_id": 1}, {"$pull": {"combatants": {"meal_id": 0}},
+                                                    "$set": {"session_version": ObjectId()}})
+    large_session.combatants[10] = {"meal_id": 10, "name": "renamed"}
+    expected = large_session.get_combatants()
+
+    logout_user(1, large_session)
+
+    assert load_sessions([1]) == {1: expected}
+    assert mongo_session_model.session_write_stats()['conflicts'] == 1
+
+
+def test_logout_users_rewrites_conflicting_deltas(sessions_collection, large_session):
+    """Test that a bulk logout writes a session in full when its delta misses."""
+    other = FakeBattleModel()
+    login_user(2, other)
+    other.prep_combatant({"meal_id": 1})
+    sessions_collection.update_one({"user_id": 1}, {"$push": {"combatants": {"meal_id": 999}},
+                                                    "$set": {"session_version": ObjectId()}})
+    large_session.prep_combatant({"meal_id": 200, "name": "meal 200"})
+    expected = large_session.get_combatants()
+
+    assert logout_users({1: large_session, 2: other}) == 2
+
+    assert load_sessions([1, 2]) == {1: expected, 2: [{"meal_id": 1}]}
+    assert mongo_session_model.session_write_stats()['conflicts'] == 1
+
+
+def test_duplicate_combatants_stay_consistent(mocker, sessions_collection):
+    """Test that removing one of two equal combatants does not lose the other."""
+    sessions_collection.insert_one({"user_id": 1, "combatants": [{"meal_id": 1}, {"meal_id": 2}, {"meal_id": 1}],
+                                    "session_version": ObjectId()})
+    battle_model = FakeBattleModel()
+    login_user(1, battle_model)
+    battle_model.combatants = [{"meal_id": 2}, {"meal_id": 1}]
+
+    _logout_and_capture(mocker, sessions_collection, battle_model)
+
+
+def test_random_edits_round_trip(mocker, sessions_collection):
+    """Test that whatever encoding is chosen, the stored session matches the model."""
+    rng = random.Random(7)
+    for _ in range(50):
+        old = [{"meal_id": rng.randrange(8)} for _ in range(rng.randrange(12))]
+        sessions_collection.delete_many({})
+        sessions_collection.insert_one({"user_id": 1, "combatants": old, "session_version": ObjectId()})
+        battle_model = FakeBattleModel()
+        login_user(1, battle_model)
+        for _ in range(rng.randrange(4)):
+            edit = rng.choice(['append', 'remove', 'replace'])
+            if edit == 'append' or not battle_model.combatants:
+                battle_model.combatants.append({"meal_id": rng.randrange(8)})
+            elif edit == 'remove':
+                battle_model.combatants.pop(rng.randrange(len(battle_model.combatants)))
+            else:
+                battle_model.combatants[rng.randrange(len(battle_model.combatants))] = {"meal_id": rng.randrange(8)}
+        expected = battle_model.get_combatants()
+
+        logout_user(1, battle_model)
 
-    mock_update.assert_called_once_with(
-        {"user_id": sample_user_id},
-        {"$set": {"combatants": sample_combatants}},
-        upsert=False
-    )
\ No newline at end of file
+        assert load_sessions([1]) == {1: expected}
@@ -0,0 +1,129 @@
+import pytest
+
+from api_client import CalorieNinjasAPIClient, NutritionCache
+from meal_max.nutrition_routes import projection_cache
+from meal_max.utils.food_table import FoodTable
+
+
+@pytest.fixture
+def mock_api_client(mocker):
+    """Replace the routes' API client with one that has a local-only cache and no food table."""
+    api_client = CalorieNinjasAPIClient(api_key="test-key", cache=NutritionCache(), backoff=0,
+                                        local_foods=FoodTable.from_rows([]))
+    mocker.patch("meal_max.nutrition_routes.api_client", api_client)
+    return api_client
+
+
+def upstream_response(mocker, items, status_code=200):
+    response = mocker.Mock(status_code=status_code, text="")
+    response.json.return_value = {"items": items}
+    return response
+
+
+def apple(calories=95):
+    return {"name": "apple", "calories": calories, "protein_g": 0.5,
+            "carbohydrates_total_g": 25, "sugar_g": 19}
+
+
+##########################################################
+# Batch Nutrition
+##########################################################
+
+def test_nutrition_batch(client, mock_api_client, mocker):
+    """Test that a batch returns one entry per distinct food."""
+    responses = {"apple, unobtainium": [apple()], "apple": [apple()], "unobtainium": []}
+    mocker.patch("requests.Session.get",
+                 side_effect=lambda url, params, timeout: upstream_response(mocker, responses[params["query"]]))
+
+    response = client.post('/nutrition/batch', json={"foods": ["apple", "Apple", "unobtainium"]})
+
+    assert response.status_code == 200
+    assert response.get_json()["results"] == [
+        {"food": "apple", "status": 200, "nutrition": [
+            {"name": "apple", "calories": 95, "protein": 0.5, "carbohydrates": 25, "sugar": 19}
+        ]},
+        {"food": "unobtainium", "status": 404, "error": "No data found"},
+    ]
+
+
+def test_nutrition_batch_bad_item_does_not_fail_batch(client, mock_api_client, mocker):
+    """Test that invalid entries are reported per item."""
+    mocker.patch("requests.Session.get", return_value=upstream_response(mocker, [apple()]))
+
+    response = client.post('/nutrition/batch', json={"foods": ["apple", 42, ""]})
+
+    statuses = [result["status"] for result in response.get_json()["results"]]
+    assert response.status_code == 200
+    assert sorted(statuses) == [200, 400, 400]
+
+
+def test_nutrition_batch_requires_list(client, mock_api_client):
+    """Test that a missing or empty foods list is rejected."""
+    assert client.post('/nutrition/batch', json={}).status_code == 400
+    assert client.post('/nutrition/batch', json={"foods": []}).status_code == 400
+    assert client.post('/nutrition/batch', json={"foods": "apple"}).status_code == 400
+
+
+##########################################################
+# Nutrition Projections
+##########################################################
+
+@pytest.fixture(autouse=True)
+def clear_projection_cache():
+    projection_cache.clear()
+
+
+def test_nutrition_fields_projection(client, mock_api_client, mocker):
+    """Test that ?fields= limits the response to the requested fields."""
+    mocker.patch("requests.Session.get", return_value=upstream_response(mocker, [apple()]))
+
+    response = client.get('/nutrition/apple?fields=protein,calories')
+
+    assert response.status_code == 200
+    assert response.get_json() == [{"name": "apple", "calories": 95, "protein": 0.5}]
+
+
+def test_nutrition_unknown_field(client, mock_api_client):
+    """Test that an unknown field is rejected."""
+    response = client.get('/nutrition/apple?fields=calories,fiber')
+
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "Unknown fields: fiber"}
+
+
+@pytest.mark.parametrize("route, field, value", [
+    ("calories", "calories", 95),
+    ("protein", "protein", 0.5),
+    ("carbohydrates", "carbohydrates", 25),
+    ("sugar", "sugar", 19),
+])
+def test_macro_routes_share_projection(client, mock_api_client, mocker, route, field, value):
+    """Test that the single-macro routes are projections of the same lookup."""
+    mocker.patch("requests.Session.get", return_value=upstream_response(mocker, [apple()]))
+
+    response = client.get(f'/{route}/apple')
+
+    assert response.status_code == 200
+    assert response.get_json() == [{"name": "apple", field: value}]
+
+
+def test_projection_served_from_cached_bytes(client, mock_api_client, mocker):
+    """Test that a repeated projection neither looks up nor re-encodes."""
+    mocker.patch("requests.Session.get", return_value=upstream_response(mocker, [apple()]))
+    first = client.get('/calories/apple')
+    get_nutrition = mocker.spy(mock_api_client, "get_nutrition")
+
+    second = client.get('/calories/Apple')
+
+    assert second.data == first.data
+    get_nutrition.assert_not_called()
+
+
+def test_nutrition_not_found(client, mock_api_client, mocker):
+    """Test that an upstream error is reported as 404."""
+    mocker.patch("requests.Session.get", return_value=mocker.Mock(status_code=404, text="missing"))
+
+    response = client.get('/sugar/unobtainium')
+
+    assert response.status_code == 404
+    assert response.get_json() == {"error": "No data found"}
@@ -0,0 +1,158 @@
+import threading
+
+import pytest
+
+from meal_max.db import User
+from meal_max.utils import password_hasher as password_hasher_module
+from meal_max.utils.password_hasher import HasherBusyError, HasherTimeoutError, PasswordHasher
+
+
+@pytest.fixture
+def blocked_hashing(monkeypatch):
+    """Make every hash wait until the returned event is set."""
+    release = threading.Event()
+    started = threading.Semaphore(0)
+
+    def slow_hash(password, method):
+        started.release()
+        release.wait(5)
+        return f"{method}$salt$hash"
+
+    monkeypatch.setattr(password_hasher_module, 'generate_password_hash', slow_hash)
+    yield release, started
+    release.set()
+
+
+##########################################################
+# Hashing
+##########################################################
+
+def test_hash_and_verify():
+    """Test that hashes use the configured method and verify on the pool."""
+    hasher = PasswordHasher(method='pbkdf2:sha256:1000', workers=1)
+    pwhash = hasher.hash('secret')
+
+    assert pwhash.startswith('pbkdf2:sha256:1000$')
+    assert hasher.verify(pwhash, 'secret')
+    assert not hasher.verify(pwhash, 'wrong')
+    assert hasher.stats()['completed'] == 3
+    hasher.shutdown()
+
+
+def test_needs_rehash_after_method_change():
+    """Test that old hashes keep verifying but are flagged for a rehash."""
+    old_hash = PasswordHasher(method='pbkdf2:sha256:1000').hash('secret')
+    hasher = PasswordHasher(method='pbkdf2:sha256:2000')
+
+    assert hasher.needs_rehash(old_hash)
+    assert hasher.verify(old_hash, 'secret')
+    assert not hasher.needs_rehash(hasher.hash('secret'))
+
+
+def test_needs_rehash_uses_werkzeug_defaults():
+    """Test that a bare method name matches hashes made with its default parameters."""
+    hasher = PasswordHasher(method='scrypt')
+    assert not hasher.needs_rehash('scrypt:32768:8:1$salt$hash')
+    assert hasher.needs_rehash('scrypt:16384:8:1$salt$hash')
+
+
+@pytest.mark.parametrize('method', ['scrypt', 'scrypt:16384:8:1', 'pbkdf2', 'pbkdf2:sha512', 'pbkdf2:sha256:1000'])
+def test_needs_rehash_matches_werkzeug_without_hashing(method, mocker):
+    """Test that the method prefix is parsed, matching the hashes werkzeug makes, without hashing."""
+    real_hash = password_hasher_module.generate_password_hash('secret', method)
+    generate = mocker.spy(password_hasher_module, 'generate_password_hash')
+
+    hasher = PasswordHasher(method=method)
+
+    assert not hasher.needs_rehash(real_hash)
+    generate.assert_not_called()
+
+
+def test_invalid_method_is_rejected():
+    """Test that an unsupported method fails when the hasher is created, not on first login."""
+    with pytest.raises(ValueError):
+        PasswordHasher(method='md5')
+
+
+##########################################################
+# Admission control
+##########################################################
+
+def test_full_queue_is_refused(blocked_hashing):
+    """Test that hashes beyond max_pending are refused immediately."""
+    release, started = blocked_hashing
+    hasher = PasswordHasher(method='pbkdf2:sha256:1000', workers=1, max_pending=2, timeout=5)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(hasher.hash('secret'))) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    assert started.acquire(timeout=5)
+
+    with pytest.raises(HasherBusyError):
+        hasher.hash('secret')
+    assert hasher.stats()['pending'] == 2
+
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert len(results) == 2
+    stats = hasher.stats()
+    assert stats['rejected'] == 1
+    assert stats['pending'] == 0
+    assert stats['p95_ms'] is not None
+    hasher.shutdown()
+
+
+def test_timeout_keeps_slot_until_hash_finishes(blocked_hashing):
+    """Test that an abandoned hash still counts against the queue until it completes."""
+    release, _ = blocked_hashing
+    hasher = PasswordHasher(method='pbkdf2:sha256:1000', workers=1, max_pending=1, timeout=0.05)
+
+    with pytest.raises(HasherTimeoutError):
+        hasher.hash('secret')
+    with pytest.raises(HasherBusyError):
+        hasher.hash('secret')
+
+    release.set()
+    hasher.shutdown()
+    stats = hasher.stats()
+    assert stats['timed_out'] == 1
+    assert stats['pending'] == 0
+
+
+##########################################################
+# Routes
+##########################################################
+
+ACCOUNT = {'username': 'testuser', 'password': 'securepassword123', 'calorie_goal': 2000, 'starting_weight': 150}
+
+
+def test_login_rehashes_with_new_method(client, monkeypatch):
+    """Test that login transparently upgrades a hash made with an older method."""
+    client.post('/create-account', json=ACCOUNT)
+    monkeypatch.setattr('meal_max.db.password_hasher', PasswordHasher(method='pbkdf2:sha256:2000'))
+
+    login = {'username': 'testuser', 'password': 'securepassword123'}
+    assert client.post('/login', json=login).status_code == 200
+    assert User.query.filter_by(username='testuser').first().password_hash.startswith('pbkdf2:sha256:2000$')
+    assert client.post('/login', json=login).status_code == 200
+
+
+def test_saturated_hashing_returns_429(client, password_hasher, mocker):
+    """Test that a full hashing queue is reported as 429 with Retry-After."""
+    mocker.patch.object(password_hasher, 'hash', side_effect=HasherBusyError())
+
+    response = client.post('/create-account', json=ACCOUNT)
+
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == '1'
+
+
+def test_hashing_timeout_returns_503(client, password_hasher, mocker):
+    """Test that a hash that does not finish in time is reported as 503."""
+    client.post('/create-account', json=ACCOUNT)
+    mocker.patch.object(password_hasher, 'verify', side_effect=HasherTimeoutError())
+
+    response = client.post('/login', json={'username': 'testuser', 'password': 'securepassword123'})
+
+    assert response.status_code == 503
@@ -1,7 +1,12 @@
+import os
+import threading
+import time
+from unittest.mock import Mock
+
 import pytest
 import requests
 
-from meal_max.utils.random_utils import get_random
+from meal_max.utils.random_utils import RandomPool, fetch_random_batch, get_random, random_pool
 
 
 RANDOM_NUMBER = 0.42
@@ -50,3 +55,77 @@ def test_get_random_invalid_response(mock_random_org):
 
     with pytest.raises(ValueError, match="Invalid response from random.org: invalid_response"):
         get_random()
+
+def test_fetch_random_batch(mock_random_org):
+    """Test fetching many random numbers in one request."""
+    mock_random_org.text = "0.1\n0.25\n0.9\n"
+
+    assert fetch_random_batch(3) == [0.1, 0.25, 0.9]
+    requests.get.assert_called_once_with("https://www.random.org/decimal-fractions/?num=3&dec=2&col=1&format=plain&rnd=new", timeout=5)
+
+def test_fetch_random_batch_short_response(mock_random_org):
+    """Test that a batch with fewer numbers than requested is rejected."""
+    mock_random_org.text = "0.1\n"
+
+    with pytest.raises(ValueError, match="expected 3 numbers, got 1"):
+        fetch_random_batch(3)
+
+def test_random_pool_serves_buffered_numbers():
+    """Test that the pool serves numbers from its buffer without fetching per call."""
+    fetch = Mock(return_value=[0.1, 0.2, 0.3])
+    pool = RandomPool(batch_size=3, low_water=0, fetch=fetch)
+    assert pool.refill()
+
+    assert [pool.random() for _ in range(3)] == [0.1, 0.2, 0.3]
+    fetch.assert_called_once_with(3, 2)
+    assert pool.stats()["served"] == 3
+    assert pool.stats()["depth"] == 0
+
+def test_random_pool_refills_in_background():
+    """Test that dropping below the low-water mark starts a refill that callers do not wait for."""
+    released = threading.Event()
+
+    def fetch(num, dec):
+        released.wait(5)
+        return [0.5] * num
+
+    pool = RandomPool(batch_size=10, low_water=5, fetch=fetch)
+    first = pool.random()  # Empty buffer: a local number now, a refill in the background.
+
+    assert 0 <= first < 1
+    released.set()
+    deadline = time.monotonic() + 5
+    while pool.stats()["depth"] < 10 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert pool.random() == 0.5
+    assert pool.stats()["fallbacks"] == 1
+
+def test_random_pool_falls_back_when_upstream_fails():
+    """Test that local randomness is used, and random.org left alone for a while, after a failed refill."""
+    fetch = Mock(side_effect=RuntimeError("Request to random.org failed: Connection error"))
+    pool = RandomPool(batch_size=10, low_water=5, retry_interval=60, fetch=fetch)
+    assert not pool.refill()
+
+    numbers = [pool.random() for _ in range(20)]
+
+    assert all(0 <= number < 1 and round(number, 2) == number for number in numbers)
+    fetch.assert_called_once()
+    assert pool.stats()["fallbacks"] == 20
+    assert pool.stats()["refill_failures"] == 1
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason="needs os.fork")
+def test_random_pool_resets_in_forked_child():
+    """Test that a forked worker neither reuses the parent's numbers nor inherits a held refill lock."""
+    random_pool._buffer.extend([0.7] * 5)
+    assert random_pool._refill_lock.acquire(blocking=False)
+    try:
+        pid = os.fork()
+        if pid == 0:
+            clean = random_pool.stats()["depth"] == 0 and random_pool._refill_lock.acquire(blocking=False)
+            os._exit(0 if clean else 1)
+        _, status = os.waitpid(pid, 0)
+    finally:
+        random_pool._refill_lock.release()
+        random_pool._buffer.clear()
+
+    assert os.WIFEXITED(status) and os.WEXITSTATUS(status) == 0
@@ -0,0 +1,59 @@
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from meal_max.db import db, User, CalorieIntake, WeightLog
+from meal_max.reports import _make_app, main, run_report
+
+
+@pytest.fixture
+def database_uri(tmp_path):
+    """A file-backed database (so worker processes can open it) with five users."""
+    uri = f"sqlite:///{tmp_path / 'report.db'}"
+    app = _make_app(uri)
+    with app.app_context():
+        db.create_all()
+        for n in range(5):
+            user = User(username=f"user{n}", password="securepassword123", calorie_goal=2000, starting_weight=80)
+            db.session.add(user)
+            db.session.flush()
+            # user4 has never logged anything.
+            for day in range(10 if n < 4 else 0):
+                log_date = date(2024, 1, 1) + timedelta(days=day)
+                db.session.add(CalorieIntake(user_id=user.id, date=log_date, calories=1900 + 50 * n))
+                db.session.add(WeightLog(user_id=user.id, date=log_date, weight=80 - 0.1 * n * day))
+        db.session.commit()
+        db.session.remove()
+        db.engine.dispose()
+    return uri
+
+
+def test_run_report(database_uri, tmp_path):
+    """Test that chunks processed across workers are reassembled in user order."""
+    output = tmp_path / "report.npz"
+
+    assert run_report(str(output), database_uri, workers=2, chunk_size=2) == 5
+
+    report = np.load(output)
+    assert report['username'].tolist() == [f"user{n}" for n in range(5)]
+    assert report['days_logged'].tolist() == [10, 10, 10, 10, 0]
+    # 1900, 1950 and 2000 are within the goal; 2050 is not.
+    assert report['adherence'][:4].tolist() == [1.0, 1.0, 1.0, 0.0]
+    assert report['mean_daily_calories'][:4].tolist() == [1900, 1950, 2000, 2050]
+    assert np.allclose(report['weight_change'][:4], [0, -0.9, -1.8, -2.7])
+    assert np.allclose(report['weight_slope_per_week'][1:4], [-0.7, -1.4, -2.1])
+    assert np.isnan(report['weight_trend'][4])
+
+
+def test_main_empty_database(tmp_path, capsys):
+    """Test the CLI entry point on a database without users."""
+    uri = f"sqlite:///{tmp_path / 'empty.db'}"
+    with _make_app(uri).app_context():
+        db.create_all()
+    output = tmp_path / "empty.npz"
+
+    main(['--output', str(output), '--database-uri', uri])
+
+    assert "Wrote report for 0 users" in capsys.readouterr().out
+    assert len(np.load(output)['user_id']) == 0
@@ -0,0 +1,207 @@
+from datetime import date
+from unittest.mock import Mock
+
+import fakeredis
+import pytest
+import redis
+from sqlalchemy import event
+
+from meal_max.db import db, User, CalorieIntake, mark_user_changed
+from meal_max.utils.response_cache import ResponseCache
+
+
+##########################################################
+# Cache
+##########################################################
+
+def test_versions_and_etags():
+    """Test that bumping a user changes their ETags and nobody else's."""
+    cache = ResponseCache(redis_client=fakeredis.FakeRedis())
+    first, other = cache.version(1), cache.version(2)
+    before = cache.etag(1, first, 'history', 'limit=10')
+
+    cache.bump([1])
+
+    assert cache.version(1) == first + 1
+    assert cache.version(2) == other
+    assert cache.etag(1, cache.version(1), 'history', 'limit=10') != before
+    assert cache.etag(1, first, 'history', 'limit=10') == before
+    assert cache.etag(1, first, 'history', 'limit=20') != before
+
+
+def test_lost_versions_are_not_reused():
+    """Test that versions seeded after Redis lost them are above every earlier version."""
+    client = fakeredis.FakeRedis()
+    cache = ResponseCache(redis_client=client)
+    cache.bump([1])
+    etag = cache.etag(1, cache.version(1), 'history')
+    cache.set(etag, b'{"old": true}')
+
+    client.flushall()
+    cache.bump([1])
+
+    fresh = cache.etag(1, cache.version(1), 'history')
+    assert fresh != etag
+    assert cache.get(fresh) is None
+
+
+def test_bodies_shared_through_redis():
+    """Test that a body cached by one worker is served to another."""
+    server = fakeredis.FakeServer()
+    cache = ResponseCache(redis_client=fakeredis.FakeRedis(server=server))
+    other_worker = ResponseCache(redis_client=fakeredis.FakeRedis(server=server))
+
+    cache.set('1-0-abc', b'{"ok": true}')
+
+    assert cache.get('1-0-abc') == b'{"ok": true}'
+    assert other_worker.get('1-0-abc') == b'{"ok": true}'
+    assert other_worker.get('1-0-def') is None
+    assert cache.stats()['local_hits'] == 1
+    assert other_worker.stats()['redis_hits'] == 1
+    assert other_worker.stats()['misses'] == 1
+
+
+def test_unreadable_version_bypasses_cache():
+    """Test that a Redis outage disables caching instead of serving stale bodies."""
+    broken_redis = Mock()
+    broken_redis.get.side_effect = redis.ConnectionError("down")
+    broken_redis.pipeline.side_effect = redis.ConnectionError("down")
+    cache = ResponseCache(redis_client=broken_redis)
+
+    assert cache.version(1) is None
+    cache.bump([1])
+
+
+def test_in_process_versions():
+    """Test the single-process mode used without Redis."""
+    cache = ResponseCache()
+    cache.bump([1, 1])
+    assert cache.version(1) == 2
+
+
+##########################################################
+# Routes
+##########################################################
+
+@pytest.fixture
+def sample_user(app):
+    user = User(username="testuser", password="securepassword123", calorie_goal=2000, starting_weight=150)
+    db.session.add(user)
+    db.session.commit()
+    db.session.add(CalorieIntake(user_id=user.id, date=date(2024, 1, 1), calories=1800))
+    db.session.commit()
+    return user
+
+
+@pytest.fixture
+def statements(app):
+    """Counts SQL statements sent to the database."""
+    executed = []
+    listener = lambda *args: executed.append(args[2])
+    event.listen(db.engine, 'before_cursor_execute', listener)
+    yield executed
+    event.remove(db.engine, 'before_cursor_execute', listener)
+
+
+def test_history_not_modified(client, sample_user, statements):
+    """Test that a repeat poll with the ETag gets a 304 without any SQL."""
+    first = client.get('/history/testuser?limit=10')
+    assert first.status_code == 200
+    assert first.headers['ETag']
+
+    statements.clear()
+    second = client.get('/history/testuser?limit=10', headers={'If-None-Match': first.headers['ETag']})
+
+    assert second.status_code == 304
+    assert second.headers['ETag'] == first.headers['ETag']
+    assert statements == []
+
+
+def test_not_modified_without_user_lookup(client, sample_user, statements, user_cache, mocker):
+    """Test that a matching revalidation is answered even when the profile is not cached."""
+    first = client.get('/summary/testuser')
+    user_cache.invalidate('testuser')
+    lookup = mocker.spy(user_cache, 'get')
+
+    statements.clear()
+    second = client.get('/summary/testuser', headers={'If-None-Match': first.headers['ETag']})
+
+    assert second.status_code == 304
+    assert statements == []
+    lookup.assert_not_called()
+
+
+def test_etag_is_bound_to_the_user(client, sample_user):
+    """Test that one user's entity tag never answers for another user."""
+    other = User(username="otheruser", password="securepassword123", calorie_goal=2000, starting_weight=150)
+    db.session.add(other)
+    db.session.commit()
+    first = client.get('/summary/testuser')
+
+    second = client.get('/summary/otheruser', headers={'If-None-Match': first.headers['ETag']})
+
+    assert second.status_code == 200
+    assert second.get_json()['username'] == 'otheruser'
+
+
+def test_deleted_user_is_not_revalidated(client, sample_user):
+    """Test that a deleted user's old entity tag gets a 404, not a 304."""
+    first = client.get('/summary/testuser')
+    client.delete('/delete/testuser')
+
+    second = client.get('/summary/testuser', headers={'If-None-Match': first.headers['ETag']})
+
+    assert second.status_code == 404
+
+
+def test_cached_body_served_without_sql(client, sample_user, statements):
+    """Test that an unconditional repeat request is served from cached bytes."""
+    first = client.get('/history/testuser')
+    statements.clear()
+    second = client.get('/history/testuser')
+
+    assert second.get_data() == first.get_data()
+    assert statements == []
+
+
+def test_intake_invalidates_history(client, sample_user):
+    """Test that logging intake changes the ETag and the served page."""
+    first = client.get('/history/testuser')
+    client.post('/intake', json={'username': 'testuser', 'date': '2024-01-02', 'calories': 1500})
+
+    second = client.get('/history/testuser', headers={'If-None-Match': first.headers['ETag']})
+
+    assert second.status_code == 200
+    assert second.headers['ETag'] != first.headers['ETag']
+    assert len(second.get_json()['history']) == 2
+
+
+def test_goal_update_invalidates_summary(client, sample_user):
+    """Test that a goal change is reflected in the next summary."""
+    first = client.get('/summary/testuser')
+    assert first.get_json()['totals']['calories']['total'] == 1800
+
+    client.put('/goal', json={'username': 'testuser', 'calorie_goal': 1700})
+    second = client.get('/summary/testuser', headers={'If-None-Match': first.headers['ETag']})
+
+    assert second.status_code == 200
+    assert second.get_json()['calorie_goal'] == 1700
+
+
+def test_rollback_does_not_bump(app, sample_user, response_cache):
+    """Test that only committed changes invalidate cached responses."""
+    version = response_cache.version(sample_user.id)
+
+    mark_user_changed(sample_user.id)
+    db.session.rollback()
+    db.session.commit()
+    assert response_cache.version(sample_user.id) == version
+
+    mark_user_changed(sample_user.id)
+    db.session.commit()
+    assert response_cache.version(sample_user.id) == version + 1
+
+
+def test_summary_not_found(client):
+    """Test that unknown users get a 404."""
+    assert client.get('/summary/nobody').status_code == 404
@@ -0,0 +1,126 @@
+from datetime import date
+
+import pytest
+
+from meal_max.db import db, User, CalorieIntake, DailyRollup, WeeklyRollup, WeightLog, rollup_calories, rollup_weight
+from meal_max.models.rollup_model import check_rollups, get_rollups, rebuild_rollups
+
+
+@pytest.fixture
+def sample_user(app):
+    user = User(username="testuser", password="securepassword123", calorie_goal=2000, starting_weight=150)
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def _log_calories(user, log_date, calories):
+    db.session.add(CalorieIntake(user_id=user.id, date=log_date, calories=calories))
+    rollup_calories(user.id, [(log_date, calories)])
+    db.session.commit()
+
+
+def _log_weight(user, log_date, weight):
+    db.session.add(WeightLog(user_id=user.id, date=log_date, weight=weight))
+    rollup_weight(user.id, log_date, weight)
+    db.session.commit()
+
+
+def test_rollups_follow_writes(sample_user):
+    """Test that incremental updates match a full recomputation."""
+    _log_calories(sample_user, date(2024, 1, 1), 1800)
+    _log_calories(sample_user, date(2024, 1, 1), 200)
+    _log_calories(sample_user, date(2024, 1, 3), 1500)
+    _log_weight(sample_user, date(2024, 1, 3), 75.0)
+    _log_weight(sample_user, date(2024, 1, 2), 76.0)
+
+    assert get_rollups(sample_user.id, 'day') == [
+        {'period': '2024-01-01', 'total_calories': 2000, 'entry_count': 2, 'last_weight': None},
+        {'period': '2024-01-02', 'total_calories': 0, 'entry_count': 0, 'last_weight': 76.0},
+        {'period': '2024-01-03', 'total_calories': 1500, 'entry_count': 1, 'last_weight': 75.0},
+    ]
+    # The week keeps the weight from its latest day, not the latest insert.
+    assert get_rollups(sample_user.id, 'week') == [
+        {'period': '2024-01-01', 'total_calories': 3500, 'entry_count': 3, 'last_weight': 75.0},
+    ]
+    assert check_rollups() == []
+
+
+def test_rollups_follow_deletes(sample_user):
+    """Test that removing entries decrements rollups and drops empty days."""
+    _log_calories(sample_user, date(2024, 1, 1), 1800)
+    _log_calories(sample_user, date(2024, 1, 2), 1600)
+
+    log = CalorieIntake.query.filter_by(date=date(2024, 1, 2)).one()
+    db.session.delete(log)
+    rollup_calories(sample_user.id, [(log.date, log.calories)], removed=True)
+    db.session.commit()
+
+    assert [row['period'] for row in get_rollups(sample_user.id, 'day')] == ['2024-01-01']
+    assert get_rollups(sample_user.id, 'week')[0]['total_calories'] == 1800
+    assert check_rollups() == []
+
+
+def test_rebuild_repairs_drift(sample_user):
+    """Test that the checker reports drift and a rebuild repairs it."""
+    _log_calories(sample_user, date(2024, 1, 1), 1800)
+    _log_weight(sample_user, date(2024, 1, 8), 74.0)
+    # Raw rows written behind the rollups' back.
+    db.session.add(CalorieIntake(user_id=sample_user.id, date=date(2024, 1, 1), calories=100))
+    db.session.add(CalorieIntake(user_id=sample_user.id, date=date(2024, 1, 9), calories=900))
+    db.session.commit()
+
+    problems = check_rollups([sample_user.id])
+    assert {(p['granularity'], p['period']) for p in problems} == {
+        ('day', '2024-01-01'), ('day', '2024-01-09'), ('week', '2024-01-01'), ('week', '2024-01-08')
+    }
+    assert problems[0]['expected']['total_calories'] == 1900
+
+    assert rebuild_rollups(batch_size=1) == 5
+    assert check_rollups() == []
+    assert WeeklyRollup.query.filter_by(week_start=date(2024, 1, 8)).one().last_weight_date == date(2024, 1, 8)
+
+
+def test_check_compares_every_rebuilt_column(sample_user):
+    """Test that a wrong last_weight_date is reported even when the weight itself matches."""
+    _log_weight(sample_user, date(2024, 1, 8), 74.0)
+    WeeklyRollup.query.filter_by(user_id=sample_user.id).update({'last_weight_date': date(2024, 1, 9)})
+    db.session.commit()
+
+    problems = check_rollups([sample_user.id])
+
+    assert [(p['granularity'], p['period']) for p in problems] == [('week', '2024-01-08')]
+    assert problems[0]['expected']['last_weight_date'] == date(2024, 1, 8)
+    assert problems[0]['actual']['last_weight_date'] == date(2024, 1, 9)
+
+
+def test_get_rollups_range(sample_user):
+    """Test from/to bounds and granularity validation."""
+    for day in range(1, 6):
+        _log_calories(sample_user, date(2024, 1, day), 1000 * day)
+
+    rows = get_rollups(sample_user.id, 'day', date(2024, 1, 2), date(2024, 1, 3))
+    assert [row['total_calories'] for row in rows] == [2000, 3000]
+    with pytest.raises(ValueError, match="Granularity must be one of"):
+        get_rollups(sample_user.id, 'month')
+
+
+def test_dashboard_route(client, sample_user):
+    """Test that route writes keep rollups in step and the dashboard serves them."""
+    client.post('/intake', json={'username': 'testuser', 'date': '2024-01-01', 'calories': 1800})
+    client.post('/intake/bulk', json={'username': 'testuser', 'entries': [
+        {'date': '2024-01-02', 'calories': 1700},
+        {'date': '2024-01-08', 'calories': 2100},
+    ]})
+
+    body = client.get('/dashboard/testuser?granularity=week').get_json()
+    assert [(p['period'], p['total_calories'], p['entry_count']) for p in body['periods']] == [
+        ('2024-01-01', 3500, 2), ('2024-01-08', 2100, 1)
+    ]
+    assert check_rollups() == []
+
+    assert client.get('/dashboard/testuser?granularity=month').status_code == 400
+    assert client.get('/dashboard/nobody').status_code == 404
+
+    assert client.delete('/delete/testuser').status_code == 200
+    assert DailyRollup.query.count() == 0
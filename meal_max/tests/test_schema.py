@@ -0,0 +1,101 @@
+import re
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import event, inspect
+
+from meal_max.db import db, User, CalorieIntake, DailyRollup, WeeklyRollup, WeightLog, rollup_calories, rollup_weight
+
+
+USER_TABLES = ('users', 'calorie_intake', 'weight_log', 'daily_rollup', 'weekly_rollup')
+
+
+@pytest.fixture
+def sample_user(app):
+    """A user with two weeks of intake and weight logs, written through the rollups."""
+    user = User(username="testuser", password="securepassword123", calorie_goal=2000, starting_weight=150)
+    db.session.add(user)
+    db.session.flush()
+    start = date(2024, 1, 1)
+    for day in range(14):
+        log_date = start + timedelta(days=day)
+        db.session.add(CalorieIntake(user_id=user.id, date=log_date, calories=1800 + day))
+        rollup_calories(user.id, [(log_date, 1800 + day)])
+        if day % 3 == 0:
+            db.session.add(WeightLog(user_id=user.id, date=log_date, weight=150 - day / 10))
+            rollup_weight(user.id, log_date, 150 - day / 10)
+    db.session.commit()
+    return user
+
+
+@pytest.fixture
+def recorded_selects(app):
+    """Collect every SELECT sent to the database, with its parameters."""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(('SELECT', 'WITH')) and not executemany:
+            statements.append((statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    yield statements
+    event.remove(db.engine, 'before_cursor_execute', record)
+
+
+##########################################################
+# Foreign keys
+##########################################################
+
+def test_user_tables_cascade_from_users(app):
+    """Test that every per-user table references users.id with ON DELETE CASCADE."""
+    inspector = inspect(db.engine)
+    for name in USER_TABLES[1:]:
+        foreign_keys = inspector.get_foreign_keys(name)
+        assert [fk['referred_table'] for fk in foreign_keys] == ['users'], name
+        assert foreign_keys[0]['options'].get('ondelete') == 'CASCADE', name
+
+
+def test_delete_user_cascades(client, sample_user):
+    """Test that deleting a user removes their logs and rollups in the database."""
+    db.session.expunge_all()
+    assert client.delete('/delete/testuser').status_code == 200
+
+    for model in (CalorieIntake, WeightLog, DailyRollup, WeeklyRollup):
+        assert db.session.query(model).count() == 0, model.__tablename__
+
+
+##########################################################
+# Indexes
+##########################################################
+
+def test_hot_path_queries_use_indexes(client, sample_user, recorded_selects):
+    """Test that no query on the request hot paths scans a per-user table."""
+    cursor = client.get('/history/testuser?limit=5').get_json()['next_cursor']
+    requests = [
+        client.post('/login', json={'username': 'testuser', 'password': 'securepassword123'}),
+        client.post('/intake', json={'username': 'testuser', 'date': '2024-02-01', 'calories': 1900}),
+        client.post('/intake/bulk', json={'username': 'testuser', 'entries': [
+            {'date': '2024-02-02', 'calories': 1900}, {'date': '2024-01-03', 'calories': 1900}
+        ]}),
+        client.get(f'/history/testuser?limit=5&cursor={cursor}'),
+        client.get('/history/testuser?from=2024-01-05&to=2024-01-09'),
+        client.get('/stats/testuser?granularity=week&from=2024-01-01'),
+        client.get('/dashboard/testuser?granularity=week'),
+        client.get('/trends/testuser'),
+        client.post('/trends-batch', json={'usernames': ['testuser']}),
+        client.get('/summary/testuser'),
+        client.get('/export/testuser'),
+        client.put('/goal', json={'username': 'testuser', 'calorie_goal': 2100}),
+    ]
+    assert all(response.status_code < 400 for response in requests), [r.status_code for r in requests]
+    assert recorded_selects
+
+    scans = []
+    with db.engine.connect() as conn:
+        for statement, parameters in recorded_selects:
+            plan = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+            for row in plan:
+                if re.match(rf"SCAN ({'|'.join(USER_TABLES)})\b", row[-1]):
+                    scans.append((row[-1], statement))
+
+    assert not scans, scans
@@ -0,0 +1,179 @@
+from unittest.mock import Mock
+
+import fakeredis
+import pytest
+import redis
+
+from meal_max import user_routes
+from meal_max.db import User
+from meal_max.utils.session_tokens import SessionStore
+
+
+##########################################################
+# Store
+##########################################################
+
+@pytest.fixture
+def redis_client():
+    return fakeredis.FakeRedis()
+
+
+def test_issue_and_verify(redis_client):
+    """Test that a token is valid for its user only and stored as a digest with a TTL."""
+    store = SessionStore(redis_client=redis_client, ttl=60)
+    token = store.issue("alice")
+
+    assert store.verify(token, "alice")
+    assert not store.verify(token, "bob")
+    assert not store.verify(token + "x", "alice")
+    assert not any(token.encode() in key for key in redis_client.keys())
+    assert 0 < redis_client.ttl(next(iter(redis_client.scan_iter("session:[0-9a-f]*")))) <= 60
+
+
+def test_revoke_and_revoke_all(redis_client):
+    """Test ending one session and every session of a user."""
+    store = SessionStore(redis_client=redis_client)
+    first, second, other = store.issue("alice"), store.issue("alice"), store.issue("bob")
+
+    store.revoke(first)
+    assert not store.verify(first, "alice")
+    assert store.verify(second, "alice")
+
+    store.revoke_all("alice")
+    assert not store.verify(second, "alice")
+    assert store.verify(other, "bob")
+
+
+def test_in_process_sessions_expire():
+    """Test the single-process mode used without Redis."""
+    store = SessionStore(ttl=0)
+    assert not store.verify(store.issue("alice"), "alice")
+
+    store = SessionStore(ttl=60)
+    token = store.issue("alice")
+    assert store.verify(token, "alice")
+    store.revoke_all("alice")
+    assert not store.verify(token, "alice")
+
+
+def test_store_outage_fails_closed():
+    """Test that tokens are rejected while the store is unreachable."""
+    broken_redis = Mock()
+    broken_redis.get.side_effect = redis.ConnectionError("down")
+    assert not SessionStore(redis_client=broken_redis).verify("token", "alice")
+
+
+##########################################################
+# Routes
+##########################################################
+
+@pytest.fixture
+def token(client):
+    client.post('/create-account', json={'username': 'testuser', 'password': 'securepassword123',
+                                         'calorie_goal': 2000, 'starting_weight': 150})
+    response = client.post('/login', json={'username': 'testuser', 'password': 'securepassword123'})
+    assert response.status_code == 200
+    return response.get_json()['token']
+
+
+def _auth(token):
+    return {'Authorization': f'Bearer {token}'}
+
+
+def test_login_rejects_wrong_password(client, token):
+    """Test that login still verifies the password."""
+    response = client.post('/login', json={'username': 'testuser', 'password': 'wrong'})
+    assert response.status_code == 401
+
+
+def test_token_requests_skip_password_hashing(client, token, mocker):
+    """Test that authorized requests never re-hash the password."""
+    check_password = mocker.spy(User, 'check_password')
+
+    for _ in range(3):
+        assert client.get('/history/testuser', headers=_auth(token)).status_code == 200
+
+    assert check_password.call_count == 0
+
+
+def test_invalid_tokens_rejected(client, token):
+    """Test that forged tokens and other users' tokens are refused."""
+    assert client.get('/history/testuser', headers=_auth('forged')).status_code == 401
+    client.post('/create-account', json={'username': 'other', 'password': 'pw', 'calorie_goal': 1, 'starting_weight': 1})
+    assert client.get('/history/other', headers=_auth(token)).status_code == 401
+
+
+def test_trends_batch_authorizes_every_user(client, token, monkeypatch):
+    """Test that a batch trends request may only cover users the caller may act for."""
+    client.post('/create-account', json={'username': 'other', 'password': 'pw', 'calorie_goal': 1, 'starting_weight': 1})
+
+    assert client.post('/trends-batch', headers=_auth(token), json={'usernames': ['testuser']}).status_code == 200
+    assert client.post('/trends-batch', headers=_auth(token),
+                       json={'usernames': ['testuser', 'other']}).status_code == 401
+    monkeypatch.setattr(user_routes, 'SESSION_AUTH_REQUIRED', True)
+    assert client.post('/trends-batch', json={'usernames': ['testuser']}).status_code == 401
+
+
+def test_session_required(client, token, monkeypatch):
+    """Test that SESSION_AUTH_REQUIRED rejects requests without a token."""
+    monkeypatch.setattr(user_routes, 'SESSION_AUTH_REQUIRED', True)
+
+    assert client.get('/history/testuser').status_code == 401
+    assert client.get('/history/testuser', headers=_auth(token)).status_code == 200
+
+
+def test_update_password_requires_current_password(client, token):
+    """Test that a session token alone cannot change the password."""
+    response = client.put('/update-password', headers=_auth(token),
+                          json={'username': 'testuser', 'new_password': 'newpassword456'})
+
+    assert response.status_code == 400
+    assert client.post('/login', json={'username': 'testuser', 'password': 'securepassword123'}).status_code == 200
+
+
+def test_update_password_revokes_sessions(client, token):
+    """Test that a password change ends existing sessions."""
+    response = client.put('/update-password', headers=_auth(token),
+                          json={'username': 'testuser', 'current_password': 'securepassword123',
+                                'new_password': 'newpassword456'})
+
+    assert response.status_code == 200
+    assert client.get('/history/testuser', headers=_auth(token)).status_code == 401
+    assert client.post('/login', json={'username': 'testuser', 'password': 'newpassword456'}).status_code == 200
+
+
+def test_update_password_with_current_password(client, token):
+    """Test the password-authorized path, including a wrong current password."""
+    body = {'username': 'testuser', 'current_password': 'wrong', 'new_password': 'newpassword456'}
+    assert client.put('/update-password', json=body).status_code == 401
+
+    body['current_password'] = 'securepassword123'
+    assert client.put('/update-password', json=body).status_code == 200
+
+
+def test_logout(client, token):
+    """Test that logging out ends the session."""
+    assert client.post('/logout', headers=_auth(token)).status_code == 200
+    assert client.get('/history/testuser', headers=_auth(token)).status_code == 401
+    assert client.post('/logout').status_code == 401
+
+
+def test_revocation_failure_keeps_password(client, token, session_store, mocker):
+    """Test that a password change or deletion is refused when old sessions cannot be revoked."""
+    mocker.patch.object(session_store, 'revoke_all', side_effect=redis.ConnectionError("down"))
+
+    response = client.put('/update-password', json={'username': 'testuser', 'current_password': 'securepassword123',
+                                                     'new_password': 'newpassword456'})
+    assert response.status_code == 503
+    assert client.delete('/delete/testuser').status_code == 503
+
+    mocker.stopall()
+    assert client.post('/login', json={'username': 'testuser', 'password': 'securepassword123'}).status_code == 200
+
+
+def test_revoke_all_raises_when_store_is_down():
+    """Test that revoke_all reports a failure instead of hiding it."""
+    broken_redis = Mock()
+    broken_redis.smembers.side_effect = redis.ConnectionError("down")
+    with pytest.raises(redis.ConnectionError):
+        SessionStore(redis_client=broken_redis).revoke_all("alice")
@@ -0,0 +1,83 @@
+from datetime import date, timedelta
+
+import pytest
+
+from meal_max.db import db, User, CalorieIntake, WeightLog
+from meal_max.models.stats_model import get_period_stats, summarize_periods
+
+
+@pytest.fixture
+def user_with_logs(app):
+    """A user with 2000 kcal goal and logs from Mon 2024-01-01 to Sun 2024-01-14."""
+    user = User(username="statsuser", password="securepassword123", calorie_goal=2000, starting_weight=80)
+    db.session.add(user)
+    db.session.commit()
+
+    start = date(2024, 1, 1)
+    for day in range(14):
+        db.session.add(CalorieIntake(user_id=user.id, date=start + timedelta(days=day), calories=1800 + 50 * day))
+        if day % 2 == 0:
+            db.session.add(WeightLog(user_id=user.id, date=start + timedelta(days=day), weight=80 - 0.5 * day / 2))
+    # A second entry on the first day counts towards that day's total.
+    db.session.add(CalorieIntake(user_id=user.id, date=start, calories=300))
+    db.session.commit()
+    return user
+
+
+def test_daily_stats_sum_entries_per_day(user_with_logs):
+    """Test that daily periods total every entry logged that day."""
+    periods = get_period_stats(user_with_logs.id, 2000, 'day')
+
+    assert len(periods) == 14
+    assert periods[0]['period'] == '2024-01-01'
+    assert periods[0]['calories']['total'] == 2100
+    assert periods[0]['calories']['days_over_goal'] == 1
+    assert periods[1]['weight'] is None
+
+
+def test_weekly_stats(user_with_logs):
+    """Test weekly sums, means, goal adherence and weight deltas."""
+    first, second = get_period_stats(user_with_logs.id, 2000, 'week')
+
+    assert first['period'] == '2024-01-01'
+    assert second['period'] == '2024-01-08'
+    # Week one: 1800..2100 plus the extra 300 on day one.
+    assert first['calories'] == {
+        'total': sum(1800 + 50 * day for day in range(7)) + 300,
+        'mean': round((sum(1800 + 50 * day for day in range(7)) + 300) / 7, 2),
+        'min': 1850,
+        'max': 2100,
+        'days_logged': 7,
+        'days_over_goal': 3,
+    }
+    assert second['calories']['days_over_goal'] == 7
+    assert first['weight']['start'] == 80
+    assert first['weight']['end'] == 78.5
+    assert first['weight']['delta'] == -1.5
+    assert first['weight']['entries'] == 4
+
+
+def test_monthly_stats_with_range(user_with_logs):
+    """Test that from/to bound the rows that are aggregated."""
+    (month,) = get_period_stats(user_with_logs.id, 2000, 'month', date(2024, 1, 3), date(2024, 1, 4))
+
+    assert month['period'] == '2024-01-01'
+    assert month['calories']['total'] == 1900 + 1950
+    assert month['weight']['entries'] == 1
+
+
+def test_summarize_periods(user_with_logs):
+    """Test that summarized weekly periods match the all-time figures."""
+    totals = summarize_periods(get_period_stats(user_with_logs.id, 2000, 'week'))
+
+    assert totals['calories']['total'] == sum(1800 + 50 * day for day in range(14)) + 300
+    assert totals['calories']['days_logged'] == 14
+    assert totals['weight']['start'] == 80
+    assert totals['weight']['end'] == 77
+    assert totals['weight']['entries'] == 7
+
+
+def test_invalid_granularity(app):
+    """Test that unsupported granularities are rejected."""
+    with pytest.raises(ValueError, match="Granularity must be one of"):
+        get_period_stats(1, 2000, 'year')
@@ -0,0 +1,117 @@
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from meal_max.db import db, User, CalorieIntake, WeightLog
+from meal_max.models.trends_model import compute_trends, ewma
+
+
+START = date(2024, 1, 1)
+
+
+def _make_user(username, calorie_goal=2000):
+    user = User(username=username, password="securepassword123", calorie_goal=calorie_goal, starting_weight=80)
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+@pytest.fixture
+def losing_user(app):
+    """Loses 0.1 kg a day for 60 days and eats 1800-2199 kcal, one log every day."""
+    user = _make_user("loser")
+    db.session.add_all(
+        [WeightLog(user_id=user.id, date=START + timedelta(days=day), weight=80 - 0.1 * day) for day in range(60)]
+        + [CalorieIntake(user_id=user.id, date=START + timedelta(days=day), calories=1800 + (day * 37) % 400)
+           for day in range(60)]
+    )
+    db.session.commit()
+    return user
+
+
+def test_ewma_matches_recurrence():
+    """Test the blocked closed form against the plain recurrence, across block boundaries."""
+    values = np.random.default_rng(0).normal(75, 2, 3000)
+    for span in (1, 3, 30):
+        alpha = 2 / (span + 1)
+        expected = [values[0]]
+        for value in values[1:]:
+            expected.append(alpha * value + (1 - alpha) * expected[-1])
+        assert np.allclose(ewma(values, span), expected)
+    assert len(ewma(np.array([]))) == 0
+
+
+def test_weight_trend_and_projection(losing_user):
+    """Test the regression slope and projected goal date for a steady loss."""
+    trend = compute_trends({losing_user.id: 2000}, {losing_user.id: 70.0})[losing_user.id]['weight']
+
+    assert trend['slope_per_week'] == pytest.approx(-0.7)
+    assert len(trend['ewma']) == 60
+    # The smoothed trend lags the raw series a little on a steady decline.
+    assert trend['latest_trend'] > trend['values'][-1]
+    projected = date.fromisoformat(trend['projected_goal_date'])
+    assert START + timedelta(days=90) <= projected <= START + timedelta(days=110)
+
+
+def test_projection_none_when_moving_away(losing_user):
+    """Test that no goal date is projected when the trend heads away from the target."""
+    trend = compute_trends({losing_user.id: 2000}, {losing_user.id: 90.0})[losing_user.id]['weight']
+    assert trend['projected_goal_date'] is None
+
+
+def test_calorie_rolling_means_and_adherence(losing_user):
+    """Test rolling means against a naive calendar-window computation."""
+    trend = compute_trends({losing_user.id: 2000})[losing_user.id]['calories']
+    totals = np.array(trend['totals'], dtype=float)
+
+    expected_7 = [totals[max(0, i - 6):i + 1].mean() for i in range(len(totals))]
+    expected_30 = [totals[max(0, i - 29):i + 1].mean() for i in range(len(totals))]
+    assert np.allclose(trend['rolling_7'], expected_7, atol=0.01)
+    assert np.allclose(trend['rolling_30'], expected_30, atol=0.01)
+    assert trend['adherence'] == pytest.approx(np.mean(totals <= 2000), abs=0.001)
+
+
+def test_batch_matches_single_user(losing_user):
+    """Test that batch results equal per-user results, and users without logs get None."""
+    other = _make_user("other", calorie_goal=1500)
+    empty = _make_user("empty")
+    db.session.add_all([
+        WeightLog(user_id=other.id, date=START, weight=60),
+        CalorieIntake(user_id=other.id, date=START, calories=1600),
+        CalorieIntake(user_id=other.id, date=START + timedelta(days=40), calories=1400),
+    ])
+    db.session.commit()
+
+    goals = {losing_user.id: 2000, other.id: 1500, empty.id: 2000}
+    batch = compute_trends(goals, include_series=False)
+
+    for user_id, goal in goals.items():
+        single = compute_trends({user_id: goal}, include_series=False)[user_id]
+        assert batch[user_id] == single
+    assert batch[empty.id] == {'weight': None, 'calories': None}
+    assert batch[other.id]['weight']['slope_per_week'] is None
+    # Days 40 apart never share a rolling window.
+    assert batch[other.id]['calories']['latest_rolling_30'] == 1400
+    assert batch[other.id]['calories']['adherence'] == 0.5
+    assert 'ewma' not in batch[losing_user.id]['weight']
+
+
+def test_trends_routes(client, losing_user):
+    """Test the single-user and batch trend routes."""
+    body = client.get('/trends/loser?target_weight=70').get_json()
+    assert body['weight']['projected_goal_date'] is not None
+    assert len(body['calories']['rolling_7']) == 60
+
+    assert client.get('/trends/loser?target_weight=abc').status_code == 400
+    assert client.get('/trends/nobody').status_code == 404
+
+    body = client.post('/trends-batch', json={'usernames': ['loser', 'nobody'],
+                                              'target_weights': {'loser': 70}}).get_json()
+    assert body['not_found'] == ['nobody']
+    assert body['trends']['loser']['weight']['projected_goal_date'] is not None
+    assert 'totals' not in body['trends']['loser']['calories']
+
+    assert client.post('/trends-batch', json={'usernames': []}).status_code == 400
+    assert client.post('/trends-batch', json={'usernames': ['loser'],
+                                              'target_weights': {'loser': 'x'}}).status_code == 400
@@ -0,0 +1,179 @@
+import json
+from unittest.mock import Mock
+
+import fakeredis
+import pytest
+import redis
+
+from meal_max import user_routes
+from meal_max.db import db, User
+from meal_max.models.user_model import Users
+from meal_max.utils.user_cache import UserProfile, UserProfileCache
+
+
+PROFILE = UserProfile(id=1, username="testuser", calorie_goal=2000, starting_weight=150.0)
+
+
+@pytest.fixture
+def redis_server():
+    return fakeredis.FakeServer()
+
+
+@pytest.fixture
+def loader():
+    return Mock(side_effect=lambda username: PROFILE if username == "testuser" else None)
+
+
+##########################################################
+# Cache
+##########################################################
+
+def test_local_then_redis_hits(redis_server, loader):
+    """Test that the loader runs once and other workers are served by Redis."""
+    cache = UserProfileCache(redis_client=fakeredis.FakeRedis(server=redis_server))
+    other_worker = UserProfileCache(redis_client=fakeredis.FakeRedis(server=redis_server))
+
+    assert cache.get("testuser", loader) == PROFILE
+    assert cache.get("testuser", loader) == PROFILE
+    assert other_worker.get("testuser", loader) == PROFILE
+
+    assert loader.call_count == 1
+    assert cache.stats()["local_hits"] == 1
+    assert other_worker.stats()["redis_hits"] == 1
+
+
+def test_unknown_users_are_not_cached(loader):
+    """Test that a miss for an unknown user is retried, so new accounts show up at once."""
+    cache = UserProfileCache()
+
+    assert cache.get("nobody", loader) is None
+    assert cache.get("nobody", loader) is None
+    assert loader.call_count == 2
+
+
+def test_invalidate_drops_both_tiers(redis_server, loader):
+    """Test that invalidate drops the profile in both tiers and the next lookup reloads it."""
+    cache = UserProfileCache(redis_client=fakeredis.FakeRedis(server=redis_server))
+    cache.get("testuser", loader)
+
+    cache.invalidate("testuser")
+    assert not fakeredis.FakeRedis(server=redis_server).exists("user:testuser")
+    cache.get("testuser", loader)
+    assert loader.call_count == 2
+
+
+def test_load_racing_a_write_is_not_cached(redis_server):
+    """Test that a profile loaded before a concurrent write is not stored after the writer invalidated it."""
+    cache = UserProfileCache(redis_client=fakeredis.FakeRedis(server=redis_server))
+    writer = UserProfileCache(redis_client=fakeredis.FakeRedis(server=redis_server))
+
+    def load_then_lose_the_race(username):
+        # The writer commits and invalidates after this reader has read the old row.
+        writer.invalidate(username)
+        return PROFILE
+
+    assert cache.get("testuser", load_then_lose_the_race) == PROFILE
+    assert not fakeredis.FakeRedis(server=redis_server).exists("user:testuser")
+    assert cache.stats()["local_size"] == 0
+
+
+def test_fill_does_not_overwrite(redis_server, loader):
+    """Test that a miss only adds a profile, leaving one another reader stored first."""
+    client = fakeredis.FakeRedis(server=redis_server)
+    cache = UserProfileCache(redis_client=client)
+
+    def load_while_another_reader_fills(username):
+        client.set("user:testuser", json.dumps(PROFILE._replace(calorie_goal=1800)._asdict()))
+        return PROFILE
+
+    cache.get("testuser", load_while_another_reader_fills)
+    assert json.loads(client.get("user:testuser"))["calorie_goal"] == 1800
+
+
+def test_redis_errors_fall_back_to_loader(loader):
+    """Test that an unavailable Redis degrades to database lookups."""
+    broken_redis = Mock()
+    broken_redis.get.side_effect = redis.ConnectionError("down")
+    broken_redis.pipeline.side_effect = redis.ConnectionError("down")
+    cache = UserProfileCache(redis_client=broken_redis, local_ttl=0)
+
+    assert cache.get("testuser", loader) == PROFILE
+    assert cache.get("testuser", loader) == PROFILE
+    assert loader.call_count == 2
+
+
+def test_local_tier_is_bounded(loader):
+    """Test that the in-process LRU evicts the least recently used profile."""
+    cache = UserProfileCache(max_entries=2)
+    for n in range(3):
+        cache.get(f"user{n}", lambda username: PROFILE._replace(username=username))
+
+    assert cache.stats()["local_size"] == 2
+    assert cache.get("user0", loader) is None
+
+
+##########################################################
+# Routes
+##########################################################
+
+@pytest.fixture
+def sample_user(app):
+    user = User(username="testuser", password="securepassword123", calorie_goal=2000, starting_weight=150)
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def test_repeat_requests_skip_user_query(client, sample_user, mocker):
+    """Test that only the first request for a user reads the profile from the database."""
+    load_profile = mocker.spy(user_routes, '_load_profile')
+
+    for _ in range(3):
+        assert client.get('/history/testuser').status_code == 200
+
+    assert load_profile.call_count == 1
+    assert user_routes.user_cache.stats()["hits"] == 2
+
+
+def test_goal_update_invalidates(client, sample_user):
+    """Test that a goal change is visible to the next cached lookup."""
+    client.get('/history/testuser')
+    client.put('/goal', json={'username': 'testuser', 'calorie_goal': 1800})
+
+    assert client.get('/history/testuser').get_json()['calorie_goal'] == 1800
+
+
+def test_delete_invalidates(client, sample_user):
+    """Test that a deleted user is no longer served from the cache."""
+    client.get('/history/testuser')
+    client.delete('/delete/testuser')
+
+    assert client.get('/history/testuser').status_code == 404
+
+
+def test_model_writes_invalidate(app, sample_user, user_cache):
+    """Test that account changes made through the model API drop the cached profile too."""
+    user_cache.get("testuser", user_routes._load_profile)
+    Users.update_password("testuser", "newpassword")
+    assert user_cache.stats()["local_size"] == 0
+
+    user_cache.get("testuser", user_routes._load_profile)
+    Users.delete_user("testuser")
+    assert user_cache.get("testuser", user_routes._load_profile) is None
+
+
+@pytest.mark.parametrize("path, payload", [
+    ('/intake', {'date': '2024-01-01', 'calories': 500}),
+    ('/intake/bulk', {'entries': [{'date': '2024-01-01', 'calories': 500}]}),
+])
+def test_write_for_user_deleted_by_another_worker(client, sample_user, path, payload):
+    """Test that a stale cached profile of a deleted user ends in a 404, not a foreign key error."""
+    client.get('/history/testuser')
+    # Another worker deletes the user; this worker's profile cache still holds it.
+    db.session.execute(User.__table__.delete().where(User.id == sample_user.id))
+    db.session.commit()
+
+    response = client.post(path, json={'username': 'testuser', **payload})
+
+    assert response.status_code == 404
+    assert user_routes.user_cache.stats()["local_size"] == 0
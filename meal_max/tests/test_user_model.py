@@ -1,5 +1,6 @@
 import pytest
 
+from meal_max.db import User
 from meal_max.models.user_model import Users
 
 
@@ -18,11 +19,12 @@ def sample_user():
 def test_create_user(session, sample_user):
     """Test creating a new user with a unique username."""
     Users.create_user(**sample_user)
-    user = session.query(Users).filter_by(username=sample_user["username"]).first()
+    user = session.query(User).filter_by(username=sample_user["username"]).first()
     assert user is not None, "User should be created in the database."
     assert user.username == sample_user["username"], "Username should match the input."
     assert len(user.salt) == 32, "Salt should be 32 characters (hex)."
-    assert len(user.password) == 64, "Password should be a 64-character SHA-256 hash."
+    assert user.password_hash.startswith("pbkdf2:sha256:1000$"), "Password should be hashed with the configured method."
+    assert user.calorie_goal == 2000, "Calorie goal should default to the reference intake."
 
 def test_create_duplicate_user(session, sample_user):
     """Test attempting to create a user with a duplicate username."""
@@ -74,7 +76,7 @@ def test_delete_user(session, sample_user):
     """Test deleting an existing user."""
     Users.create_user(**sample_user)
     Users.delete_user(sample_user["username"])
-    user = session.query(Users).filter_by(username=sample_user["username"]).first()
+    user = session.query(User).filter_by(username=sample_user["username"]).first()
     assert user is None, "User should be deleted from the database."
 
 def test_delete_user_not_found(session):
@@ -97,7 +99,7 @@ def test_get_id_by_username(session, sample_user):
     user_id = Users.get_id_by_username(sample_user["username"])
 
     # Verify the ID is correct
-    user = session.query(Users).filter_by(username=sample_user["username"]).first()
+    user = session.query(User).filter_by(username=sample_user["username"]).first()
     assert user is not None, "User should exist in the database."
     assert user.id == user_id, "Retrieved ID should match the user's ID."
 
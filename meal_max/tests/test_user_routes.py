@@ -0,0 +1,251 @@
+import json
+import time
+from datetime import date, timedelta
+
+import pytest
+
+from meal_max.db import db, User, CalorieIntake, WeightLog
+
+
+@pytest.fixture
+def sample_user(app):
+    user = User(username="testuser", password="securepassword123", calorie_goal=2000, starting_weight=150)
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+@pytest.fixture
+def sample_history(sample_user):
+    """Ten days of intake starting 2024-01-01, 1000 + 10 * day calories each."""
+    start = date(2024, 1, 1)
+    db.session.add_all([
+        CalorieIntake(user_id=sample_user.id, date=start + timedelta(days=day), calories=1000 + 10 * day)
+        for day in range(10)
+    ])
+    db.session.commit()
+    return sample_user
+
+
+##########################################################
+# History
+##########################################################
+
+def test_get_history_paginates(client, sample_history):
+    """Test that following next_cursor walks every row exactly once, in order."""
+    dates = []
+    cursor = None
+    pages = 0
+    while True:
+        url = '/history/testuser?limit=4' + (f'&cursor={cursor}' if cursor else '')
+        body = client.get(url).get_json()
+        dates.extend(entry['date'] for entry in body['history'])
+        cursor = body['next_cursor']
+        pages += 1
+        if cursor is None:
+            break
+
+    assert pages == 3
+    assert dates == [(date(2024, 1, 1) + timedelta(days=day)).isoformat() for day in range(10)]
+
+
+def test_get_history_date_range(client, sample_history):
+    """Test that from/to bound the returned rows inclusively."""
+    body = client.get('/history/testuser?from=2024-01-03&to=2024-01-05').get_json()
+
+    assert body['history'] == [
+        {'date': '2024-01-03', 'calories': 1020},
+        {'date': '2024-01-04', 'calories': 1030},
+        {'date': '2024-01-05', 'calories': 1040},
+    ]
+    assert body['next_cursor'] is None
+    assert body['calorie_goal'] == 2000
+
+
+def test_get_history_same_day_entries(client, sample_user):
+    """Test that entries sharing a date are split across pages by id."""
+    db.session.add_all([CalorieIntake(user_id=sample_user.id, date=date(2024, 1, 1), calories=c)
+                        for c in (100, 200, 300)])
+    db.session.commit()
+
+    first = client.get('/history/testuser?limit=2').get_json()
+    second = client.get(f"/history/testuser?limit=2&cursor={first['next_cursor']}").get_json()
+
+    assert [e['calories'] for e in first['history'] + second['history']] == [100, 200, 300]
+
+
+def test_get_history_validation(client, sample_user):
+    """Test that bad limits, dates and cursors are rejected."""
+    assert client.get('/history/testuser?limit=0').status_code == 400
+    assert client.get('/history/testuser?limit=100000').status_code == 400
+    assert client.get('/history/testuser?from=01/02/2024').status_code == 400
+    assert client.get('/history/testuser?cursor=not-a-cursor').status_code == 400
+
+
+def test_get_history_user_not_found(client, app):
+    """Test that an unknown user is a 404."""
+    assert client.get('/history/nobody').status_code == 404
+
+
+def test_history_query_uses_index(app):
+    """Test that the page query is served by the (user_id, date) index."""
+    plan = db.session.execute(db.text(
+        "EXPLAIN QUERY PLAN SELECT id, date, calories FROM calorie_intake "
+        "WHERE user_id = 1 AND date >= '2024-01-01' ORDER BY date, id LIMIT 101"
+    )).all()
+
+    assert any('ix_calorie_intake_user_id_date' in row[-1] for row in plan)
+
+
+##########################################################
+# Export
+##########################################################
+
+@pytest.fixture
+def sample_weights(sample_history):
+    db.session.add_all([
+        WeightLog(user_id=sample_history.id, date=date(2024, 1, 2), weight=150.5),
+        WeightLog(user_id=sample_history.id, date=date(2024, 1, 9), weight=149.0),
+    ])
+    db.session.commit()
+    return sample_history
+
+
+def test_export_ndjson(client, sample_weights, mocker):
+    """Test that the NDJSON export merges intake and weight rows by date."""
+    mocker.patch("meal_max.user_routes.EXPORT_BATCH_SIZE", 3)
+
+    response = client.get('/export/testuser')
+
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    records = [json.loads(line) for line in response.data.decode().splitlines()]
+    assert len(records) == 12
+    assert [record['date'] for record in records] == sorted(record['date'] for record in records)
+    assert records[1] == {'type': 'intake', 'date': '2024-01-02', 'calories': 1010}
+    assert records[2] == {'type': 'weight', 'date': '2024-01-02', 'weight': 150.5}
+
+
+def test_export_csv(client, sample_weights):
+    """Test that the CSV export has a header and one line per row."""
+    response = client.get('/export/testuser?format=csv')
+
+    lines = response.data.decode().splitlines()
+    assert response.mimetype == 'text/csv'
+    assert lines[0] == 'type,date,calories,weight'
+    assert lines[1] == 'intake,2024-01-01,1000,'
+    assert 'weight,2024-01-09,,149.0' in lines
+    assert len(lines) == 13
+
+
+def test_export_is_streamed(client, sample_weights):
+    """Test that the export is sent as a stream rather than one buffered body."""
+    response = client.get('/export/testuser', buffered=False)
+
+    assert response.is_streamed
+    first_chunk = next(response.response)
+    assert first_chunk
+    response.close()
+
+
+def test_export_validation(client, sample_user):
+    """Test that unknown formats and users are rejected."""
+    assert client.get('/export/testuser?format=xml').status_code == 400
+    assert client.get('/export/nobody').status_code == 404
+
+
+##########################################################
+# Intake
+##########################################################
+
+@pytest.mark.parametrize('calories, status', [('500', 201), ('lots', 400), ('-5', 400), (12.5, 400), (True, 400)])
+def test_intake_calories_are_coerced_or_rejected(client, sample_user, calories, status):
+    """Test that a string of digits is accepted as calories and anything else is a 400."""
+    response = client.post('/intake', json={'username': 'testuser', 'date': '2024-01-01', 'calories': calories})
+
+    assert response.status_code == status
+    logged = CalorieIntake.query.filter_by(user_id=sample_user.id).all()
+    assert [intake.calories for intake in logged] == ([500] if status == 201 else [])
+
+
+##########################################################
+# Bulk intake
+##########################################################
+
+def test_bulk_intake_coerces_calories(client, sample_user):
+    """Test that bulk entries get the same calorie check as single intakes."""
+    response = client.post('/intake/bulk', json={'username': 'testuser', 'entries': [
+        {'date': '2024-01-01', 'calories': '500'},
+        {'date': '2024-01-02', 'calories': 'lots'},
+    ]})
+
+    assert [r['status'] for r in response.get_json()['results']] == ['created', 'invalid']
+    assert CalorieIntake.query.filter_by(user_id=sample_user.id).one().calories == 500
+
+
+def test_bulk_intake_statuses(client, sample_history):
+    """Test per-row statuses for new, existing, repeated and invalid entries."""
+    response = client.post('/intake/bulk', json={'username': 'testuser', 'entries': [
+        {'date': '2024-02-01', 'calories': 1800},
+        {'date': '2024-01-05', 'calories': 1500},
+        {'date': '2024-02-01', 'calories': 1900},
+        {'date': '02/03/2024', 'calories': 1700},
+        {'date': '2024-02-04', 'calories': -5},
+        'not an entry',
+    ]})
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert [r['status'] for r in body['results']] == [
+        'created', 'duplicate', 'duplicate', 'invalid', 'invalid', 'invalid'
+    ]
+    assert (body['created'], body['duplicate'], body['invalid']) == (1, 2, 3)
+    assert CalorieIntake.query.filter_by(user_id=sample_history.id, date=date(2024, 2, 1)).one().calories == 1800
+    assert CalorieIntake.query.filter_by(user_id=sample_history.id, date=date(2024, 1, 5)).one().calories == 1040
+
+
+def test_bulk_intake_validation(client, sample_user, monkeypatch):
+    """Test that missing users, empty bodies and oversized batches are rejected."""
+    monkeypatch.setattr('meal_max.user_routes.BULK_INTAKE_MAX_ROWS', 2)
+    entries = [{'date': '2024-01-01', 'calories': 100}]
+
+    assert client.post('/intake/bulk', json={'username': 'nobody', 'entries': entries}).status_code == 404
+    assert client.post('/intake/bulk', json={'username': 'testuser', 'entries': []}).status_code == 400
+    assert client.post('/intake/bulk', json={'username': 'testuser', 'entries': entries * 3}).status_code == 400
+
+
+def test_bulk_intake_large_backfill(client, sample_user):
+    """Test that a multi-year backfill is written in one fast request."""
+    start = date(1970, 1, 1)
+    entries = [{'date': (start + timedelta(days=day)).isoformat(), 'calories': 2000} for day in range(20000)]
+
+    started = time.perf_counter()
+    response = client.post('/intake/bulk', json={'username': 'testuser', 'entries': entries})
+    elapsed = time.perf_counter() - started
+
+    assert response.status_code == 200
+    assert response.get_json()['created'] == 20000
+    assert CalorieIntake.query.filter_by(user_id=sample_user.id).count() == 20000
+    assert elapsed < 2
+
+
+##########################################################
+# Stats
+##########################################################
+
+def test_get_stats_weekly(client, sample_history):
+    """Test that stats are returned once per period, not once per row."""
+    body = client.get('/stats/testuser?granularity=week').get_json()
+
+    assert body['granularity'] == 'week'
+    assert body['calorie_goal'] == 2000
+    assert [period['period'] for period in body['periods']] == ['2024-01-01', '2024-01-08']
+    assert body['periods'][0]['calories']['total'] == sum(1000 + 10 * day for day in range(7))
+    assert body['periods'][1]['calories']['days_logged'] == 3
+
+
+def test_get_stats_validation(client, sample_user):
+    """Test that bad granularities, dates and users are rejected."""
+    assert client.get('/stats/testuser?granularity=year').status_code == 400
+    assert client.get('/stats/testuser?from=2024/01/01').status_code == 400
+    assert client.get('/stats/nobody').status_code == 404